@@ -3,6 +3,7 @@ from contacts.models import (
     ContactGroup,
     OrganizationDepartment,
     EmailAddress,
+    EmailDomain,
     PhoneNumber,
     URL,
     Organization,
@@ -36,6 +37,7 @@ class OrganizationAdmin(admin.ModelAdmin):
 admin.site.register(ContactGroup)
 admin.site.register(OrganizationDepartment)
 admin.site.register(EmailAddress)
+admin.site.register(EmailDomain)
 admin.site.register(PhoneNumber)
 admin.site.register(Place)
 admin.site.register(URL)
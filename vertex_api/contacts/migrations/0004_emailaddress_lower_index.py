@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0003_telecomprovider'),
+    ]
+
+    operations = [
+        # case-insensitive lookups of inbound mail senders, see service.senders
+        migrations.RunSQL(
+            'CREATE INDEX contacts_emailaddress_lower_idx '
+            'ON contacts_emailaddress (lower(email_address))',
+            'DROP INDEX contacts_emailaddress_lower_idx',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0004_emailaddress_lower_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='language',
+            field=models.CharField(blank=True, choices=[('en', 'English'), ('fr', 'French')], help_text='The language of the emails sent to this person. They are sent in every language when left blank.', max_length=10, verbose_name='Language'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0005_person_language'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailDomain',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, null=True, verbose_name='modified at')),
+                ('domain_name', models.CharField(max_length=255, unique=True, verbose_name='domain name')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='email_domains', to='contacts.Organization', verbose_name='organization')),
+            ],
+            options={
+                'verbose_name': 'email domain',
+                'verbose_name_plural': 'email domains',
+            },
+        ),
+        # case-insensitive lookups of inbound mail senders, see service.senders
+        migrations.RunSQL(
+            'CREATE INDEX contacts_emaildomain_lower_idx '
+            'ON contacts_emaildomain (lower(domain_name))',
+            'DROP INDEX contacts_emaildomain_lower_idx',
+        ),
+    ]
@@ -2,6 +2,7 @@
 from .contactgroup import ContactGroup
 from .organizationdepartment import OrganizationDepartment
 from .emailaddress import EmailAddress
+from .emaildomain import EmailDomain
 from .phonenumber import PhoneNumber
 from .url import URL
 from .place import Place
@@ -0,0 +1,29 @@
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+from vertex.models import AbstractDatedModel
+
+
+class EmailDomain(AbstractDatedModel):
+    """
+    A domain name owned by an organization, so that mail from unknown addresses of the domain
+    can be attributed to it.
+    """
+    class Meta:
+        verbose_name = _('email domain')
+        verbose_name_plural = _('email domains')
+        app_label = 'contacts'
+
+    domain_name = models.CharField(
+        _('domain name'),
+        max_length=255,
+        unique=True
+    )
+    organization = models.ForeignKey(
+        'contacts.Organization',
+        related_name='email_domains',
+        verbose_name=_('organization')
+    )
+
+    def __str__(self):
+        return self.domain_name
@@ -145,6 +145,15 @@ class Person(AbstractDatedModel):
 
     custom_avatar_url = models.URLField(blank=True)
 
+    language = models.CharField(
+        _('Language'),
+        max_length=10,
+        blank=True,
+        choices=settings.LANGUAGES,
+        help_text=_('The language of the emails sent to this person. They are sent in every '
+                    'language when left blank.'),
+    )
+
     notes = models.TextField(
         blank=True,
         null=True
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class IpamConfig(AppConfig):
     name = 'ipam'
     icon = '<i class="material-icons">compare_arrows</i>'
+
+    def ready(self):
+        import ipam.signals
+        import vertex.checks
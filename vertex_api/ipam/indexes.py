@@ -0,0 +1,102 @@
+# In-memory indexes
+#
+# Some IPAM lookups (the parent of an address, the range containing an address...) are much cheaper
+# to answer from a structure held in memory than from the database. ProcessIndex holds the
+# bookkeeping shared by those indexes: they are loaded lazily on first use and kept up to date
+# incrementally by signal handlers. Writes made inside a transaction that is later rolled back are
+# detected on the next lookup and cause a reload. Unless IPAM_SUBNET_INDEX_SHARED is disabled, a
+# generation counter kept in the Django cache, shared between processes (see vertex.checks), lets
+# every process know when another one committed a change, so that it can reload its own copy.
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+class ProcessIndex(object):
+    """
+    Base class of the per-process indexes. Subclasses implement _load_entries(), which must set
+    _entries to something other than None, and call _track_write() whenever they apply a change.
+    """
+    generation_cache_key = None
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = None
+        self._generation = None
+        # on_commit callbacks of the transactions which modified the index and haven't committed
+        self._pending_commits = set()
+        self._pending_savepoints = None
+        self._commit_hooks = None
+
+    @property
+    def shared(self):
+        return settings.IPAM_SUBNET_INDEX_SHARED
+
+    @property
+    def loaded(self):
+        return self._entries is not None
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = None
+
+    def _load_entries(self):
+        raise NotImplementedError
+
+    def _load(self):
+        if self.shared:
+            cache.add(self.generation_cache_key, 0, timeout=None)
+            self._generation = cache.get(self.generation_cache_key)
+        self._load_entries()
+
+    def _ensure_loaded(self):
+        self._discard_rolled_back_writes()
+
+        if self.shared and self.loaded:
+            if cache.get(self.generation_cache_key) != self._generation:
+                self._entries = None
+
+        if not self.loaded:
+            self._load()
+
+    def _discard_rolled_back_writes(self):
+        """
+        Django drops the on_commit callbacks registered inside a transaction or a savepoint when it
+        is rolled back, replacing its list of callbacks in the process. If one of ours went missing,
+        the index holds changes the database doesn't have anymore.
+        """
+        if not self._pending_commits:
+            return
+        connection = transaction.get_connection()
+        if connection.run_on_commit is self._commit_hooks:
+            return
+
+        registered = set(func for sids, func in connection.run_on_commit)
+        if not self._pending_commits.issubset(registered):
+            self._pending_commits = set()
+            self._entries = None
+        self._commit_hooks = connection.run_on_commit
+
+    def _track_write(self):
+        connection = transaction.get_connection()
+        savepoints = tuple(connection.savepoint_ids)
+        if self._pending_commits and savepoints == self._pending_savepoints:
+            return  # the callback registered for this savepoint covers this write as well
+
+        def committed():
+            with self._lock:
+                self._pending_commits.discard(committed)
+                if self.shared and not self._pending_commits:
+                    cache.add(self.generation_cache_key, 0, timeout=None)
+                    generation = cache.incr(self.generation_cache_key)
+                    if self._generation is not None and generation == self._generation + 1:
+                        self._generation = generation
+                    else:  # someone else committed in between, our copy is out of date
+                        self._entries = None
+
+        self._pending_commits.add(committed)
+        self._pending_savepoints = savepoints
+        transaction.on_commit(committed)
+        self._commit_hooks = connection.run_on_commit
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ipam.models import IPAddress, VRF
+from ipam.subnet_index import ANY_VRF
+
+
+class Command(BaseCommand):
+    help = ("Report the IP addresses found more than once in the same VRF or in the global "
+            "table.")
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group()
+        scope.add_argument('--vrf', metavar='RD', help="Only audit the VRF with this route "
+                                                       "distinguisher")
+        scope.add_argument('--global', action='store_true', dest='global_table',
+                           help="Only audit the global table")
+        parser.add_argument('--sync-scopes', action='store_true',
+                            help="Recompute which addresses must be unique first, e.g. after "
+                                 "changing ENFORCE_GLOBAL_UNIQUE")
+
+    def handle(self, *args, **options):
+        if options['sync_scopes']:
+            updated = IPAddress.objects.sync_unique_scopes()
+            self.stdout.write("{} address(es) updated".format(updated))
+
+        vrf = ANY_VRF
+        if options['global_table']:
+            vrf = None
+        elif options['vrf']:
+            try:
+                vrf = VRF.objects.get(rd=options['vrf'])
+            except VRF.DoesNotExist:
+                raise CommandError("No VRF with route distinguisher {}".format(options['vrf']))
+
+        groups = IPAddress.objects.duplicate_groups(vrf)
+        names = dict(VRF.objects.filter(
+            pk__in=set(group['vrf'] for group in groups)
+        ).values_list('pk', 'rd'))
+        for group in groups:
+            self.stdout.write("{} in {}: {}".format(
+                group['address'],
+                "VRF {}".format(names[group['vrf']]) if group['vrf'] else "global table",
+                ", ".join("id {}".format(pk) for pk in group['ids'])
+            ))
+        self.stdout.write("{} duplicated address(es)".format(len(groups)))
@@ -0,0 +1,68 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ipam.models import IPAddress
+
+
+class Command(BaseCommand):
+    help = ("Import IP addresses in bulk from a CSV file (with a header row) or from newline "
+            "delimited JSON objects. Rows which can't be imported are reported and skipped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help="File to read the addresses from, '-' for standard input")
+        parser.add_argument('--format', choices=('csv', 'ndjson'),
+                            help="Input format, guessed from the file extension if omitted")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of addresses resolved and inserted at once")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format']
+        if input_format is None:
+            if path.endswith('.csv'):
+                input_format = 'csv'
+            elif path.endswith(('.json', '.ndjson', '.jsonl')):
+                input_format = 'ndjson'
+            else:
+                raise CommandError("Can't guess the input format, please use --format")
+
+        stream = sys.stdin if path == '-' else open(path, newline='')
+        try:
+            if input_format == 'csv':
+                rows = self._read_csv(stream)
+            else:
+                rows = self._read_ndjson(stream)
+            result = IPAddress.objects.bulk_import(rows, batch_size=options['batch_size'],
+                                                   numbered=True)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for line_number, row, message in result.errors:
+            self.stderr.write("Line {}: {} ({})".format(line_number, message, row))
+        self.stdout.write(str(result))
+
+    def _read_csv(self, stream):
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # the line the row ends on, quoted values possibly spanning several lines
+            yield reader.line_num, row
+
+    def _read_ndjson(self, stream):
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                self.stderr.write("Line {}: invalid JSON ({})".format(line_number, e))
+                continue
+            if not isinstance(row, dict):
+                self.stderr.write("Line {}: expected a JSON object".format(line_number))
+                continue
+            yield line_number, row
@@ -1,16 +1,574 @@
-from django.db import transaction
+from ipaddress import ip_network
+from itertools import islice
+
+import netaddr
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.exceptions import ValidationError
+from django.db import models, transaction, connection, DatabaseError
+from django.db.models import Case, Count, F, Func, Value, When
+from django.db.models.functions import Concat, Substr
 from netfields import NetManager
 
-from ipam.models import IPAddress
+from ipam.range_index import IntervalList, address_value, range_index
+from ipam.subnet_index import ANY_VRF, subnet_index
+
+
+# Ancestor path of the subnets which have no supernet
+ROOT_PATH = '/'
+
+# IPAddress.unique_scope of the addresses of the global table, when ENFORCE_GLOBAL_UNIQUE is set
+GLOBAL_UNIQUE_SCOPE = 0
+
+# IPAddress fields which can be provided when importing addresses in bulk
+IMPORT_FIELDS = ('address', 'status', 'role', 'interface', 'description', 'notes')
+
+# Free intervals of a subnet, found by sorting every interval which can't be allocated (the network
+# and broadcast addresses, the addresses in use, the direct children and the managed ranges) and
+# keeping the space between the end of the intervals before each one and its start.
+FREE_ADDRESS_GAPS_SQL = """
+SELECT gap_first, gap_last FROM (
+    SELECT max(last) OVER (
+               ORDER BY first ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+           ) + 1 AS gap_first,
+           first - 1 AS gap_last
+    FROM (
+        SELECT host(network(%(cidr)s::cidr))::inet AS first,
+               host(network(%(cidr)s::cidr))::inet AS last
+        UNION ALL
+        SELECT host(broadcast(%(cidr)s::cidr))::inet, host(broadcast(%(cidr)s::cidr))::inet
+        UNION ALL
+        SELECT host(address)::inet, host(address)::inet
+        FROM {ipaddress} WHERE subnet_id = %(subnet)s
+        UNION ALL
+        SELECT host(network(cidr))::inet, host(broadcast(cidr))::inet
+        FROM {subnet} WHERE supernet_id = %(subnet)s
+        UNION ALL
+        SELECT host(ip_range.range_begin)::inet, host(ip_range.range_end)::inet
+        FROM {iprange} ip_range INNER JOIN {iprangerole} ip_range_role
+            ON ip_range.role_id = ip_range_role.id
+        WHERE ip_range.subnet_id = %(subnet)s AND ip_range_role.managed
+    ) blocked
+) gaps
+WHERE gap_first <= gap_last
+ORDER BY gap_first
+LIMIT %(limit)s
+"""
+
+
+class BulkImportResult(object):
+    """
+    The outcome of an IPAddressManager.bulk_import() call: the number of addresses created and
+    a list of (row number, row, error message) tuples for the rows which were rejected.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.errors = list()
+
+    def add_error(self, row_number, row, message):
+        self.errors.append((row_number, row, message))
+
+    def __str__(self):
+        return "{} address(es) created, {} row(s) rejected".format(self.created, len(self.errors))
+
+
+class IPAddressManager(NetManager):
+
+    def bulk_import(self, rows, batch_size=1000, numbered=False):
+        """
+        Create IP addresses from an iterable of dicts whose keys are in IMPORT_FIELDS, or of
+        (row number, dict) pairs if `numbered`, e.g. to report the line numbers of a file.
+
+        Unlike IPAddress.save(), the parents of a whole batch are resolved at once from the subnet
+        index, reserved addresses are rejected by comparing integers and the remaining addresses
+        are written with a single bulk_create per batch. A row which can't be imported is reported
+        in the returned BulkImportResult rather than aborting the import.
+        """
+        result = BulkImportResult()
+        rows = iter(rows) if numbered else enumerate(rows, start=1)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            self._import_batch(batch, result)
+        return result
+
+    def _import_batch(self, batch, result):
+        candidates = list()
+        for row_number, row in batch:
+            try:
+                candidates.append((row_number, row, self._address_from_row(row)))
+            except (ValidationError, ValueError, netaddr.AddrFormatError) as e:
+                result.add_error(row_number, row, _error_message(e))
+
+        candidates.sort(key=lambda candidate: (candidate[2].version, int(candidate[2].address)))
+        parents = subnet_index.find_address_parents(
+            candidate[2].address for candidate in candidates
+        )
+
+        addresses = list()
+        for (row_number, row, address), parent in zip(candidates, parents):
+            if parent is None:
+                result.add_error(row_number, row,
+                                 "No parent subnet found for address {}".format(address.address))
+                continue
+
+            subnet_pk, cidr, vrf_id = parent
+            value = int(address.address)
+            if value in (int(cidr.network_address), int(cidr.broadcast_address)):
+                result.add_error(
+                    row_number, row,
+                    "Address {} clashes with reserved addresses for subnet {}".format(
+                        address.address, cidr)
+                )
+                continue
+
+            address.subnet_id = subnet_pk
+            address.unique_scope = vrf_id
+            addresses.append((row_number, row, address))
+
+        # unique_scope holds the VRF id until we know which VRFs enforce unique addresses
+        scopes = self.unique_scopes(set(address.unique_scope for _, _, address in addresses))
+        for row_number, row, address in addresses:
+            address.unique_scope = scopes[address.unique_scope]
+
+        duplicates = self.find_duplicates([address for _, _, address in addresses])
+        for position in sorted(duplicates):
+            row_number, row, address = addresses[position]
+            result.add_error(row_number, row, duplicates[position])
+        addresses = [address for position, address in enumerate(addresses)
+                     if position not in duplicates]
+
+        self._insert(addresses, result)
+
+    def _insert(self, addresses, result):
+        try:
+            with transaction.atomic():
+                self.bulk_create([address for row_number, row, address in addresses])
+        except DatabaseError:
+            # find out which rows are at fault by inserting them one at a time
+            for row_number, row, address in addresses:
+                try:
+                    with transaction.atomic():
+                        self.bulk_create([address])
+                except DatabaseError as e:
+                    result.add_error(row_number, row, str(e))
+                else:
+                    result.created += 1
+        else:
+            result.created += len(addresses)
+
+    def unique_scope(self, vrf):
+        """
+        Return the unique_scope of the addresses of `vrf`, None standing for the global table.
+        """
+        if vrf is None:
+            return GLOBAL_UNIQUE_SCOPE if settings.ENFORCE_GLOBAL_UNIQUE else None
+        return vrf.pk if vrf.enforce_unique else None
+
+    def unique_scopes(self, vrf_ids):
+        """
+        Return a dict of the unique_scope of the addresses of each of `vrf_ids`, in a single query.
+        """
+        from ipam.models import VRF
+
+        enforcing = set(VRF.objects.filter(
+            pk__in=[vrf_id for vrf_id in vrf_ids if vrf_id is not None], enforce_unique=True
+        ).values_list('pk', flat=True))
+        scopes = dict((vrf_id, vrf_id if vrf_id in enforcing else None) for vrf_id in vrf_ids)
+        scopes[None] = self.unique_scope(None)
+        return scopes
+
+    def update_unique_scopes(self, vrf, **filters):
+        """
+        Set the unique_scope of the addresses matching `filters`, which all belong to `vrf`.
+        """
+        scope = self.unique_scope(vrf)
+        queryset = self.get_queryset().filter(**filters)
+        if scope is None:
+            queryset = queryset.filter(unique_scope__isnull=False)
+        else:
+            queryset = queryset.exclude(unique_scope=scope)
+        return queryset.update(unique_scope=scope)
+
+    def sync_unique_scopes(self):
+        """
+        Recompute the unique_scope of every address, e.g. after ENFORCE_GLOBAL_UNIQUE was changed.
+        Return the number of addresses updated.
+        """
+        from ipam.models import VRF
+
+        with transaction.atomic():
+            updated = self.update_unique_scopes(None, subnet__vrf__isnull=True)
+            for vrf in VRF.objects.all():
+                updated += self.update_unique_scopes(vrf, subnet__vrf=vrf)
+        return updated
+
+    def duplicate_groups(self, vrf=ANY_VRF):
+        """
+        Audit the addresses found more than once in the same VRF or in the global table, whether
+        uniqueness is enforced there or not, with a single grouped query. Return a list of dicts
+        holding the 'vrf' id (None for the global table), the 'address' and the 'ids' of its
+        copies. `vrf` restricts the audit to a VRF, None standing for the global table.
+        """
+        queryset = self.get_queryset()
+        if vrf is None:
+            queryset = queryset.filter(subnet__vrf__isnull=True)
+        elif vrf is not ANY_VRF:
+            queryset = queryset.filter(subnet__vrf=vrf)
+
+        groups = queryset.annotate(host=_host(), vrf_id=F('subnet__vrf')).values(
+            'vrf_id', 'host'
+        ).annotate(
+            count=Count('pk'), ids=ArrayAgg('pk')
+        ).filter(count__gt=1).order_by('vrf_id', 'host')
+
+        return [
+            {'vrf': group['vrf_id'], 'address': group['host'], 'ids': sorted(group['ids'])}
+            for group in groups
+        ]
+
+    def duplicates(self, address):
+        """
+        Return the other addresses sharing the unique_scope and host of `address`, i.e. those the
+        partial unique index rejects it for. There are none when its scope allows duplicates.
+        """
+        if address.unique_scope is None:
+            return self.get_queryset().none()
+        return self.get_queryset().annotate(host=_host()).filter(
+            unique_scope=address.unique_scope,
+            host=str(address.address).split('/')[0]
+        ).exclude(pk=address.pk)
+
+    def find_duplicates(self, addresses):
+        """
+        Check a batch of addresses whose unique_scope is set against the existing addresses and
+        each other, in a single query. Return a dict mapping the position of each duplicate in
+        `addresses` to an error message.
+        """
+        duplicates = dict()
+        positions = dict()
+        for position, address in enumerate(addresses):
+            if address.unique_scope is None:
+                continue
+            key = (address.unique_scope, str(address.address).split('/')[0])
+            if key in positions:
+                duplicates[position] = _duplicate_message(key, "repeated in this batch")
+            else:
+                positions[key] = position
+
+        if positions:
+            existing = self.get_queryset().annotate(host=_host()).filter(
+                unique_scope__in=set(scope for scope, host in positions),
+                host__in=set(host for scope, host in positions)
+            ).values_list('unique_scope', 'host', 'pk')
+            for scope, host, pk in existing:
+                position = positions.get((scope, host))
+                if position is not None and addresses[position].pk != pk:
+                    duplicates[position] = _duplicate_message((scope, host), "id {}".format(pk))
+
+        return duplicates
+
+    def _address_from_row(self, row):
+        # csv.DictReader puts the values beyond the header under None
+        if None in row:
+            raise ValueError("More values than fields: {}".format(row[None]))
+        unknown_fields = set(row) - set(IMPORT_FIELDS)
+        if unknown_fields:
+            raise ValueError("Unknown field(s): {}".format(", ".join(sorted(unknown_fields))))
+        if not row.get('address'):
+            raise ValueError("An address is required")
+
+        values = dict()
+        for name, value in row.items():
+            field = self.model._meta.get_field(name)
+            if value == '' and field.null:
+                value = None
+            if name == 'interface':
+                values['interface_id'] = field.target_field.to_python(value)
+            elif name == 'address':
+                values['address'] = netaddr.IPAddress(str(value).split('/')[0])
+            else:
+                values[name] = field.clean(value, None)
+
+        address = self.model(**values)
+        address.version = address.address.version
+        return address
+
+
+class IPRangeManager(NetManager):
+
+    def child_subnet_intervals(self, subnet_ids):
+        """
+        Return, for each of `subnet_ids`, an IntervalList of its direct children whose payloads are
+        their CIDRs, in a single query.
+        """
+        from ipam.models import Subnet
+
+        intervals = dict((subnet_id, list()) for subnet_id in subnet_ids)
+        children = Subnet.objects.filter(supernet_id__in=list(intervals)).values_list(
+            'supernet_id', 'cidr'
+        )
+        for supernet_id, cidr in children:
+            cidr = ip_network(str(cidr))
+            intervals[supernet_id].append(
+                (int(cidr.network_address), int(cidr.broadcast_address), str(cidr))
+            )
+        return dict((subnet_id, IntervalList(children))
+                    for subnet_id, children in intervals.items())
+
+    def validate_ranges(self, ranges):
+        """
+        Check many proposed (unsaved or modified) ranges at once, against their subnets, the
+        children of their subnets, the existing ranges and each other. Return a list of
+        (position, range, error message) tuples, one for each problem found.
+        """
+        from ipam.models import Subnet
+
+        ranges = list(ranges)
+        errors = list()
+        subnet_ids = set(ip_range.subnet_id for ip_range in ranges
+                         if ip_range.subnet_id is not None)
+        subnets = dict(
+            (pk, ip_network(str(cidr))) for pk, cidr in
+            Subnet.objects.filter(pk__in=subnet_ids).values_list('pk', 'cidr')
+        )
+        children = self.child_subnet_intervals(subnet_ids)
+        # ranges modified in this batch are checked against their new bounds, with the others
+        modified = set(ip_range.pk for ip_range in ranges if ip_range.pk)
+
+        proposed = dict()
+        for position, ip_range in enumerate(ranges):
+            if ip_range.subnet_id is None:
+                errors.append((position, ip_range, "Range {} has no subnet".format(ip_range)))
+                continue
+            cidr = subnets.get(ip_range.subnet_id)
+            if cidr is None:
+                errors.append((position, ip_range, "Range {} belongs to unknown subnet {}".format(
+                    ip_range, ip_range.subnet_id)))
+                continue
+
+            first, last = address_value(ip_range.range_begin), address_value(ip_range.range_end)
+            if first > last:
+                errors.append((position, ip_range, "Proposed range is reversed"))
+                continue
+            if first < int(cidr.network_address) or last > int(cidr.broadcast_address):
+                errors.append((position, ip_range,
+                               "Range {} is outside of subnet {}".format(ip_range, cidr)))
+                continue
+
+            clashing_subnets = children[ip_range.subnet_id].overlapping(first, last)
+            if clashing_subnets:
+                errors.append((position, ip_range, "Range {} clashes with subnet(s) {}".format(
+                    ip_range, ", ".join(sorted(clashing_subnets)))))
+
+            overlapping_ranges = [
+                pk for pk in range_index.overlapping_ranges(ip_range.subnet_id, first, last)
+                if pk not in modified
+            ]
+            if overlapping_ranges:
+                errors.append((position, ip_range,
+                               "Range {} overlaps existing range(s) {}".format(
+                                   ip_range, ", ".join(str(pk) for pk in overlapping_ranges))))
+
+            proposed.setdefault(ip_range.subnet_id, list()).append((first, last, position))
+
+        # sweep the proposed ranges of each subnet in order to find the ones overlapping each other
+        for intervals in proposed.values():
+            intervals.sort()
+            widest = None
+            for first, last, position in intervals:
+                if widest is not None and first <= widest[1]:
+                    errors.append((position, ranges[position],
+                                   "Range {} overlaps proposed range {}".format(
+                                       ranges[position], ranges[widest[2]])))
+                if widest is None or last > widest[1]:
+                    widest = (first, last, position)
+
+        errors.sort(key=lambda error: error[0])
+        return errors
 
 
 class SubnetManager(NetManager):
 
     def cleanup_and_delete(self, obj):
+        from ipam.models import IPAddress
+
         with transaction.atomic():
+            ancestor_path = self.get_queryset().filter(pk=obj.pk).values_list(
+                'ancestor_path', flat=True
+            ).get()
             self.get_queryset().filter(supernet=obj).update(supernet=obj.supernet)
+            self.replace_path_prefix(ancestor_path + '{}/'.format(obj.pk), ancestor_path)
             IPAddress.objects.filter(subnet=obj).update(subnet=obj.supernet)
             obj.delete()
 
+    def free_address_gaps(self, subnet, limit):
+        """
+        Return up to `limit` (first, last) netaddr.IPAddress tuples delimiting the intervals of
+        `subnet` in which addresses can be allocated, in a single query.
+        """
+        from ipam.models import IPAddress, IPRange, IPRangeRole
+
+        sql = FREE_ADDRESS_GAPS_SQL.format(
+            ipaddress=IPAddress._meta.db_table,
+            subnet=self.model._meta.db_table,
+            iprange=IPRange._meta.db_table,
+            iprangerole=IPRangeRole._meta.db_table,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {'cidr': str(subnet.cidr), 'subnet': subnet.pk, 'limit': limit})
+            return [(_inet(first), _inet(last)) for first, last in cursor.fetchall()]
+
+    def allocate_addresses(self, subnet, count, **fields):
+        """
+        Create `count` IP addresses in the first free addresses of `subnet`, with `fields`.
+
+        The subnet row is locked for the duration of the transaction, so that concurrent
+        allocations from the same subnet are serialised while other subnets, and the rest of the
+        IP address table, remain available. Addresses created without going through this method
+        don't take this lock.
+        """
+        from ipam.models import IPAddress
+
+        with transaction.atomic():
+            subnet = self.get_queryset().select_for_update().get(pk=subnet.pk)
+            unique_scope = IPAddress.objects.unique_scope(subnet.vrf)
+
+            addresses = list()
+            for first, last in self.free_address_gaps(subnet, count):
+                address = first
+                while address <= last and len(addresses) < count:
+                    addresses.append(IPAddress(
+                        address=address, version=address.version, subnet=subnet,
+                        unique_scope=unique_scope, **fields
+                    ))
+                    address += 1
+
+            if len(addresses) < count:
+                raise ValueError("Not enough free addresses in subnet {} to allocate {}".format(
+                    subnet, count))
+
+            return IPAddress.objects.bulk_create(addresses)
+
     def subnet_descendants(self, cidr):
         return self.get_queryset().filter(cidr__net_contained=cidr)
+
+    def path_below(self, subnet):
+        """
+        Return the ancestor path of the children of `subnet`, as currently stored.
+        """
+        if subnet is None:
+            return ROOT_PATH
+        ancestor_path = self.get_queryset().filter(pk=subnet.pk).values_list(
+            'ancestor_path', flat=True
+        ).get()
+        return '{}{}/'.format(ancestor_path, subnet.pk)
+
+    def replace_path_prefix(self, old_prefix, new_prefix, within=None):
+        """
+        Move whole subtrees in a single UPDATE, by replacing the leading `old_prefix` of the
+        ancestor paths which start with it by `new_prefix`. When `within` is given, only the
+        subnets contained in this CIDR are updated.
+        """
+        queryset = self.get_queryset().filter(ancestor_path__startswith=old_prefix)
+        if within is not None:
+            queryset = queryset.filter(cidr__net_contained=within)
+        return queryset.update(ancestor_path=Concat(
+            Value(new_prefix, output_field=models.CharField()),
+            Substr('ancestor_path', len(old_prefix) + 1),
+            output_field=models.CharField()
+        ))
+
+    def rebuild_tree(self, vrf=None, batch_size=500):
+        """
+        Recompute the supernet and the ancestor path of every subnet in a single sorted sweep, and
+        return the number of subnets which were updated.
+
+        Subnets are streamed in CIDR order, so that a subnet always comes after the subnets
+        containing it; a stack holds the chain of subnets containing the current one, and its top
+        is the current subnet's supernet. When `vrf` is given, only the subnets of this VRF are
+        rewired (their supernet may still belong to another VRF, as with Subnet.find_parent()).
+        """
+        vrf_id = getattr(vrf, 'pk', vrf)
+        rewired = 0
+        changes = dict()
+        stack = list()
+
+        with transaction.atomic():
+            rows = self.get_queryset().order_by('cidr').values_list(
+                'pk', 'cidr', 'supernet_id', 'ancestor_path', 'vrf_id'
+            )
+            for pk, cidr, supernet_id, ancestor_path, subnet_vrf_id in rows.iterator():
+                cidr = ip_network(cidr)
+                first, last = int(cidr.network_address), int(cidr.broadcast_address)
+
+                while stack and not (stack[-1][0] == cidr.version and
+                                     stack[-1][1] <= first and last <= stack[-1][2]):
+                    stack.pop()
+                parent = stack[-1][3] if stack else None
+                path = stack[-1][4] if stack else ROOT_PATH
+                stack.append((cidr.version, first, last, pk, '{}{}/'.format(path, pk)))
+
+                if (parent, path) != (supernet_id, ancestor_path) and (
+                        vrf is None or subnet_vrf_id == vrf_id):
+                    changes[pk] = (parent, path)
+                    if len(changes) >= batch_size:
+                        rewired += self._set_supernets(changes)
+                        changes = dict()
+
+            if changes:
+                rewired += self._set_supernets(changes)
+
+        return rewired
+
+    def _set_supernets(self, changes):
+        return self.get_queryset().filter(pk__in=list(changes)).update(
+            supernet=Case(
+                *[When(pk=pk, then=Value(parent)) for pk, (parent, path) in changes.items()],
+                output_field=models.IntegerField()
+            ),
+            ancestor_path=Case(
+                *[When(pk=pk, then=Value(path)) for pk, (parent, path) in changes.items()],
+                output_field=models.CharField()
+            )
+        )
+
+    def bulk_insert_cidrs(self, cidrs, batch_size=None, **fields):
+        """
+        Create a subnet for each of `cidrs`, all of them sharing `fields`, with as few INSERTs as
+        possible. The tree is only repaired once, after all the subnets have been inserted.
+        """
+        subnets = list()
+        for cidr in cidrs:
+            cidr = ip_network(str(cidr))
+            subnets.append(self.model(cidr=cidr, version=cidr.version, **fields))
+
+        with transaction.atomic():
+            subnets = self.bulk_create(subnets, batch_size=batch_size)
+            subnet_index.subnets_changed()
+            self.rebuild_tree()
+
+        return subnets
+
+
+def _host(field='address'):
+    return Func(F(field), function='host', output_field=models.CharField())
+
+
+def _duplicate_message(key, duplicate):
+    scope, host = key
+    return "Duplicate IP address found in {}: {} ({})".format(
+        "global table" if scope == GLOBAL_UNIQUE_SCOPE else "VRF {}".format(scope), host, duplicate
+    )
+
+
+def _inet(value):
+    return netaddr.IPAddress(str(value).split('/')[0])
+
+
+def _error_message(error):
+    if isinstance(error, ValidationError):
+        return "; ".join(error.messages)
+    return str(error)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from ipaddress import ip_network
+
+from django.db import migrations, models
+
+
+def compute_ancestor_paths(apps, schema_editor):
+    Subnet = apps.get_model('ipam', 'Subnet')
+
+    stack = list()
+    for pk, cidr in Subnet.objects.order_by('cidr').values_list('pk', 'cidr').iterator():
+        cidr = ip_network(cidr)
+        first, last = int(cidr.network_address), int(cidr.broadcast_address)
+        while stack and not (stack[-1][0] == cidr.version and
+                             stack[-1][1] <= first and last <= stack[-1][2]):
+            stack.pop()
+        path = stack[-1][3] if stack else '/'
+        Subnet.objects.filter(pk=pk).update(ancestor_path=path)
+        stack.append((cidr.version, first, last, '{}{}/'.format(path, pk)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipam', '0005_auto_20180119_2218'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subnet',
+            name='ancestor_path',
+            field=models.CharField(db_index=True, default='/', editable=False, max_length=2000),
+        ),
+        migrations.RunPython(compute_ancestor_paths, migrations.RunPython.noop),
+    ]
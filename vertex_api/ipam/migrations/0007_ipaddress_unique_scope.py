@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+
+# must match ipam.managers.GLOBAL_UNIQUE_SCOPE
+GLOBAL_UNIQUE_SCOPE = 0
+
+
+def set_unique_scopes(apps, schema_editor):
+    """
+    Only the first copy of each duplicated address gets a scope, so that the unique index can be
+    created; the other copies are reported by `manage.py find_duplicate_ips`.
+    """
+    IPAddress = apps.get_model('ipam', 'IPAddress')
+    VRF = apps.get_model('ipam', 'VRF')
+
+    scopes = [(vrf.pk, {'subnet__vrf': vrf}) for vrf in VRF.objects.filter(enforce_unique=True)]
+    if settings.ENFORCE_GLOBAL_UNIQUE:
+        scopes.append((GLOBAL_UNIQUE_SCOPE, {'subnet__vrf__isnull': True}))
+
+    for scope, filters in scopes:
+        seen = set()
+        pks = list()
+        addresses = IPAddress.objects.filter(**filters).order_by('pk').values_list('pk', 'address')
+        for pk, address in addresses.iterator():
+            host = str(address).split('/')[0]
+            if host not in seen:
+                seen.add(host)
+                pks.append(pk)
+        for start in range(0, len(pks), 1000):
+            IPAddress.objects.filter(pk__in=pks[start:start + 1000]).update(unique_scope=scope)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipam', '0006_subnet_ancestor_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ipaddress',
+            name='unique_scope',
+            field=models.IntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(set_unique_scopes, migrations.RunPython.noop),
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX ipam_ipaddress_unique_scope_host ON ipam_ipaddress "
+            "(unique_scope, host(address)) WHERE unique_scope IS NOT NULL",
+            "DROP INDEX ipam_ipaddress_unique_scope_host"
+        ),
+    ]
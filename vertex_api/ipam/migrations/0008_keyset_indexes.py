@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipam', '0007_ipaddress_unique_scope'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ipaddress',
+            index=models.Index(fields=['version', 'address', 'id'], name='ipam_ipaddr_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='iprange',
+            index=models.Index(fields=['version', 'range_begin', 'id'], name='ipam_iprange_keyset_idx'),
+        ),
+    ]
@@ -1,10 +1,12 @@
-from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
 from django.utils.functional import cached_property
 
 from ipam.constants import AV_CHOICES, IPADDRESS_STATUS_CHOICES, IPADDRESS_STATUS_ACTIVE, \
     IPADDRESS_ROLE_CHOICES, STATUS_CHOICE_CSS, ROLE_CHOICE_CSS
+from ipam.managers import IPAddressManager
+from ipam.range_index import range_index
+from ipam.subnet_index import subnet_index
 from vertex.models import AbstractDatedModel
 from netfields import InetAddressField
 import netaddr
@@ -23,6 +25,8 @@ class IPAddress(AbstractDatedModel):
     Device can use either the inside or outside IP as its primary IP.
     """
 
+    objects = IPAddressManager()
+
     subnet = models.ForeignKey('ipam.Subnet', editable=False)
     address = InetAddressField()
     version = models.PositiveSmallIntegerField(choices=AV_CHOICES, editable=False)
@@ -47,6 +51,11 @@ class IPAddress(AbstractDatedModel):
     description = models.CharField(max_length=200, blank=True)
     notes = models.TextField(blank=True)
 
+    # Where this address must be unique: the pk of its VRF, GLOBAL_UNIQUE_SCOPE for the global
+    # table, or None when duplicates are allowed. Backs a partial unique index on
+    # (unique_scope, host(address)).
+    unique_scope = models.IntegerField(null=True, editable=False)
+
     def save(self, *args, **kwargs):
 
         if not isinstance(self.address, netaddr.IPAddress):
@@ -66,11 +75,21 @@ class IPAddress(AbstractDatedModel):
                 "Address {} clashes with reserved addresses for subnet {}".format(self.address,
                                                                                   self.subnet))
 
+        self.unique_scope = IPAddress.objects.unique_scope(self.subnet.vrf)
+
         super(IPAddress, self).save(*args, **kwargs)
 
     def find_parent(self):
-        from .subnet import Subnet
-        return Subnet.objects.filter(cidr__net_contains=self.address).order_by('-cidr').first()
+        return subnet_index.find_address_parent(self.address)
+
+    def find_range(self):
+        """
+        Return the range of our subnet which contains this address, or None.
+        """
+        from ipam.models import IPRange
+
+        pk = range_index.find_range(self.subnet_id, self.address)
+        return IPRange.objects.get(pk=pk) if pk is not None else None
 
     @property
     def is_reserved_address(self):
@@ -86,6 +105,10 @@ class IPAddress(AbstractDatedModel):
 
     class Meta:
         ordering = ['version', 'address']
+        indexes = [
+            # keyset pagination
+            models.Index(fields=['version', 'address', 'id'], name='ipam_ipaddr_keyset_idx'),
+        ]
         verbose_name = 'IP address'
         verbose_name_plural = 'IP addresses'
 
@@ -97,8 +120,7 @@ class IPAddress(AbstractDatedModel):
         return str(self.address)
 
     def get_duplicates(self):
-        return IPAddress.objects.filter(subnet=self.subnet,
-                                        address=self.address).exclude(pk=self.pk)
+        return IPAddress.objects.duplicates(self)
 
     def clean(self):
 
@@ -111,17 +133,16 @@ class IPAddress(AbstractDatedModel):
                     'address': "No parent subnet found for this address"
                 })
 
-            # Enforce unique IP space (if applicable)
-            if (self.vrf is None and settings.ENFORCE_GLOBAL_UNIQUE) or (
-                    self.vrf and self.vrf.enforce_unique):
-                duplicate_ips = self.get_duplicates()
-                if duplicate_ips:
-                    raise ValidationError({
-                        'address': "Duplicate IP address found in {}: {}".format(
-                            "VRF {}".format(self.vrf) if self.vrf else "global table",
-                            duplicate_ips.first(),
-                        )
-                    })
+            # Enforce unique IP space (if applicable), as the partial unique index does
+            self.unique_scope = IPAddress.objects.unique_scope(self.vrf)
+            duplicate_ip = self.get_duplicates().first()
+            if duplicate_ip is not None:
+                raise ValidationError({
+                    'address': "Duplicate IP address found in {}: {}".format(
+                        "VRF {}".format(self.vrf) if self.vrf else "global table",
+                        duplicate_ip,
+                    )
+                })
 
     @property
     def device(self):
@@ -15,6 +15,8 @@ from django.db import models
 from netaddr import IPNetwork
 
 from ipam.constants import AV_CHOICES
+from ipam.managers import IPRangeManager
+from ipam.range_index import address_value, range_index
 from vertex.models import AbstractDatedModel
 from netfields import InetAddressField
 
@@ -40,6 +42,8 @@ class IPRangeRole(models.Model):
 
 
 class IPRange(AbstractDatedModel):
+    objects = IPRangeManager()
+
     subnet = models.ForeignKey('ipam.Subnet')
     range_begin = InetAddressField(store_prefix_length=False)
     range_end = InetAddressField(store_prefix_length=False)
@@ -51,11 +55,17 @@ class IPRange(AbstractDatedModel):
     description = models.CharField(max_length=200, blank=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            # keyset pagination
+            models.Index(fields=['version', 'range_begin', 'id'], name='ipam_iprange_keyset_idx'),
+        ]
+
     def clean(self):
         field_errors = {}
 
         # range is reversed
-        if self.range_begin > self.range_end:
+        if address_value(self.range_begin) > address_value(self.range_end):
             raise ValidationError(
                 _("Proposed range is reversed"),
                 code='reversed_range'
@@ -63,7 +73,7 @@ class IPRange(AbstractDatedModel):
 
         netaddr_cidr = IPNetwork(str(self.subnet.cidr))
 
-        if int(self.range_begin) < netaddr_cidr.first:
+        if address_value(self.range_begin) < netaddr_cidr.first:
             field_errors.update({
                 'range_begin':
                     ValidationError(_(
@@ -78,7 +88,7 @@ class IPRange(AbstractDatedModel):
                     )
             })
 
-        if int(self.range_end) > netaddr_cidr.last:
+        if address_value(self.range_end) > netaddr_cidr.last:
             field_errors.update({
                 'range_end':
                     ValidationError(_(
@@ -95,17 +105,45 @@ class IPRange(AbstractDatedModel):
 
         if field_errors:
             raise ValidationError(field_errors)
-        subnets_in_range = self.subnets_in_range.filter(supernet=self.subnet)
-        if subnets_in_range.exists():
+        clashing_subnets = self.clashing_subnets()
+        if clashing_subnets:
             raise ValidationError(
                 _("Range %(range)s clashes with subnet(s) %(subnet)s"),
                 code="conflict_with_subnet",
                 params={
                     'range': self.range,
-                    'subnet': ", ".join((str(s) for s in subnets_in_range))
+                    'subnet': ", ".join(clashing_subnets)
+                }
+            )
+        overlapping_ranges = self.overlapping_ranges()
+        if overlapping_ranges:
+            raise ValidationError(
+                _("Range %(range)s overlaps range(s) %(ranges)s"),
+                code="overlapping_range",
+                params={
+                    'range': self.range,
+                    'ranges': ", ".join((str(r) for r in overlapping_ranges))
                 }
             )
 
+    def clashing_subnets(self):
+        """
+        Return the CIDRs of the children of our subnet which overlap this range.
+        """
+        children = IPRange.objects.child_subnet_intervals([self.subnet_id])[self.subnet_id]
+        return sorted(children.overlapping(address_value(self.range_begin),
+                                           address_value(self.range_end)))
+
+    def overlapping_ranges(self):
+        """
+        Return the other ranges of our subnet which overlap this range.
+        """
+        pks = range_index.overlapping_ranges(
+            self.subnet_id, address_value(self.range_begin), address_value(self.range_end),
+            exclude_pk=self.pk
+        )
+        return IPRange.objects.filter(pk__in=pks) if pks else []
+
     @property
     def subnets_in_range(self):
         from ipam.models import Subnet
@@ -128,12 +166,12 @@ class IPRange(AbstractDatedModel):
     def save(self, *args, **kwargs):
         self.version = self.range.version
 
-        if self.range_begin > self.range_end:
+        if address_value(self.range_begin) > address_value(self.range_end):
             raise ValueError("Proposed range is reversed")
 
         netaddr_cidr = IPNetwork(str(self.subnet.cidr))
 
-        if int(self.range_begin) < netaddr_cidr.first:
+        if address_value(self.range_begin) < netaddr_cidr.first:
             raise ValueError(
                 '%(begin)s is smaller than %(subnet)s first possible address (%(address)s)' % {
                     'begin': self.range_begin,
@@ -142,7 +180,7 @@ class IPRange(AbstractDatedModel):
                 }
             )
 
-        if int(self.range_end) > netaddr_cidr.last:
+        if address_value(self.range_end) > netaddr_cidr.last:
             raise ValueError(
                 '%(end)s is greater than %(subnet)s last possible address (%(address)s)' % {
                     'end': self.range_end,
@@ -151,12 +189,21 @@ class IPRange(AbstractDatedModel):
                 }
             )
 
-        subnets_in_range = self.subnets_in_range.filter(supernet=self.subnet)
-        if subnets_in_range.exists():
+        clashing_subnets = self.clashing_subnets()
+        if clashing_subnets:
             raise ValueError(
                 "Range %(range)s clashes with subnet(s) %(subnet)s" % {
                     'range': self.range,
-                    'subnet': ", ".join((str(s) for s in subnets_in_range))
+                    'subnet': ", ".join(clashing_subnets)
+                }
+            )
+
+        overlapping_ranges = self.overlapping_ranges()
+        if overlapping_ranges:
+            raise ValueError(
+                "Range %(range)s overlaps range(s) %(ranges)s" % {
+                    'range': self.range,
+                    'ranges': ", ".join((str(r) for r in overlapping_ranges))
                 }
             )
 
@@ -1,13 +1,14 @@
 from ipaddress import ip_network
 
 from django.db import models, transaction
-from django.core.cache import cache
 import netaddr
 
 from netfields import CidrAddressField
 
 from ipam.constants import AV_CHOICES
-from ipam.managers import SubnetManager
+from ipam.managers import SubnetManager, ROOT_PATH
+from ipam.subnet_index import subnet_index
+from ipam.utilisation import SubnetUtilisation
 
 
 # Subnets
@@ -36,6 +37,16 @@ class Subnet(models.Model):
         editable=False
     )
 
+    # Materialised path of the ancestors of this subnet, from the root down to its supernet, e.g.
+    # '/1/5/' for a subnet whose supernet is 5 and whose supernet's supernet is 1, or '/' for a
+    # root subnet.
+    ancestor_path = models.CharField(
+        max_length=2000,
+        default=ROOT_PATH,
+        db_index=True,
+        editable=False
+    )
+
     version = models.PositiveSmallIntegerField(choices=AV_CHOICES, editable=False)
 
     vrf = models.ForeignKey('ipam.VRF', blank=True, null=True)
@@ -65,9 +76,6 @@ class Subnet(models.Model):
         return Subnet.objects.filter(pk__in=[root.pk for root in roots])
 
     def save(self, *args, **kwargs):
-        if cache.get('display_with_ancestors'):
-            cache.delete('display_with_ancestors')
-
         if isinstance(self.cidr, str):
             self.cidr = ip_network(self.cidr)
 
@@ -77,18 +85,41 @@ class Subnet(models.Model):
             self.supernet = self.find_parent()
 
             with transaction.atomic():
+                self.ancestor_path = Subnet.objects.path_below(self.supernet)
                 super(Subnet, self).save(*args, **kwargs)
-                self.get_direct_children_subnets_from_cidr().update(supernet=self)
-
+                self._adopt_descendants()
 
         else:  # instance is being updated
-            old_parent = self.supernet
-            self.supernet = self.find_parent()
-
             with transaction.atomic():
-                self.children.update(supernet=old_parent)
+                # detach our subtree from its current position, the tree may have changed since
+                # this instance was loaded
+                old_supernet_id, old_ancestor_path, old_vrf_id = Subnet.objects.filter(
+                    pk=self.pk
+                ).values_list('supernet_id', 'ancestor_path', 'vrf_id').get()
+                self.children.update(supernet=old_supernet_id)
+                Subnet.objects.replace_path_prefix(old_ancestor_path + '{}/'.format(self.pk),
+                                                   old_ancestor_path)
+
+                self.supernet = self.find_parent()
+                self.ancestor_path = Subnet.objects.path_below(self.supernet)
                 super(Subnet, self).save(*args, **kwargs)
-                self.get_direct_children_subnets_from_cidr().update(supernet=self)
+                self._adopt_descendants()
+
+                if self.vrf_id != old_vrf_id:
+                    from ipam.models import IPAddress
+                    IPAddress.objects.update_unique_scopes(self.vrf, subnet=self)
+
+    def _adopt_descendants(self):
+        """
+        Attach the subnets contained in this one that are still attached to our own supernet:
+        before this subnet took its place in the tree, the supernet of each of its direct
+        children was the smallest subnet containing this one.
+        """
+        Subnet.objects.subnet_descendants(self.cidr).filter(
+            supernet=self.supernet
+        ).exclude(pk=self.pk).update(supernet=self)
+        Subnet.objects.replace_path_prefix(self.ancestor_path, self.descendant_path,
+                                           within=self.cidr)
 
     def delete(self, *args, **kwargs):
         if self.children.count() > 0:  # if we need to repair the tree, let SubnetManager deal
@@ -101,31 +132,39 @@ class Subnet(models.Model):
         return str(self.cidr)
 
     def find_parent(self):
-        enclosing_subnets = Subnet.objects.filter(cidr__net_contains=self.cidr).order_by('-cidr')
-        return enclosing_subnets.first()
+        return subnet_index.find_subnet_parent(self.cidr, exclude_pk=self.pk)
+
+    @property
+    def descendant_path(self):
+        """
+        The ancestor path shared by every descendant of this subnet.
+        """
+        return '{}{}/'.format(self.ancestor_path, self.pk)
 
-    @classmethod
-    def _update_display_with_ancestors_cache(cls):
-        results = dict()
-        for subnet in Subnet.objects.all():
-            results[subnet.id] = subnet._display_with_ancestors()
+    @property
+    def ancestor_ids(self):
+        return [int(pk) for pk in self.ancestor_path.split('/') if pk]
 
-        cache.set('display_with_ancestors', results, timeout=None)
+    def ancestors(self):
+        return Subnet.objects.filter(pk__in=self.ancestor_ids).order_by('cidr')
+
+    def descendants(self):
+        return Subnet.objects.filter(ancestor_path__startswith=self.descendant_path)
 
     def display_with_ancestors(self):
-        cached_values = cache.get('display_with_ancestors')
-        if cached_values:
-            return cached_values[self.id]
-        else:
-            Subnet._update_display_with_ancestors_cache()
-            return cache.get('display_with_ancestors')[self.id]
-
-    def _display_with_ancestors(self):
-        s = list()
-        parent = self.supernet
-        while parent is not None:
-            s.append(str(parent))
-            parent = parent.supernet
-        s.reverse()
+        s = [str(cidr) for cidr in self.ancestors().values_list('cidr', flat=True)]
         s.append(str(self))
         return ' > '.join(s)
+
+    def utilisation(self):
+        return SubnetUtilisation(self)
+
+    def allocate_address(self, **fields):
+        """
+        Create an IP address in the first free address of this subnet, outside of its managed
+        ranges, and return it.
+        """
+        return self.allocate_addresses(1, **fields)[0]
+
+    def allocate_addresses(self, count, **fields):
+        return Subnet.objects.allocate_addresses(self, count, **fields)
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 from vertex.models import AbstractDatedModel
 
@@ -26,6 +26,13 @@ class VRF(AbstractDatedModel):
     def __str__(self):
         return self.display_name or super(VRF, self).__str__()
 
+    def save(self, *args, **kwargs):
+        from ipam.models import IPAddress
+
+        with transaction.atomic():
+            super(VRF, self).save(*args, **kwargs)
+            IPAddress.objects.update_unique_scopes(self, subnet__vrf=self)
+
     def get_absolute_url(self):
         return reverse('ipam:vrf', args=[self.pk])
 
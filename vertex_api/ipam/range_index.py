@@ -0,0 +1,155 @@
+# IP range index
+#
+# An IP range always lies within its subnet, and neither overlaps the direct children of that
+# subnet nor, since the ranges of a subnet can't overlap each other, the ranges of any other subnet
+# of the same VRF. Overlap and containment questions about ranges can thus always be answered
+# subnet by subnet: we keep, for each subnet, its ranges as integer intervals sorted by their first
+# address, and find the intervals overlapping a given one by bisection.
+#
+# The index is kept up to date by the IPRange post_save/post_delete handlers in ipam.signals, see
+# ipam.indexes for how it is loaded and invalidated.
+from bisect import bisect_left, bisect_right, insort
+
+import netaddr
+
+from ipam.indexes import ProcessIndex
+
+GENERATION_CACHE_KEY = 'ipam_range_index_generation'
+
+
+def address_value(address):
+    """
+    Return the integer value of an address given as a string, a netaddr or an ipaddress object.
+    """
+    if isinstance(address, netaddr.IPAddress):
+        return int(address)
+    return int(netaddr.IPAddress(str(address).split('/')[0]))
+
+
+class IntervalList(object):
+    """
+    A list of (first, last, payload) intervals sorted by first value, along with the running
+    maximum of their last values, so that finding the intervals which overlap a given one costs a
+    bisection plus a step per interval found.
+    """
+    __slots__ = ('_intervals', '_firsts', '_max_lasts')
+
+    def __init__(self, intervals=()):
+        self._intervals = sorted(intervals)
+        self._firsts = [interval[0] for interval in self._intervals]
+        self._max_lasts = None
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def insert(self, first, last, payload):
+        insort(self._intervals, (first, last, payload))
+        insort(self._firsts, first)
+        self._max_lasts = None
+
+    def remove(self, first, last, payload):
+        position = bisect_left(self._intervals, (first, last, payload))
+        if position < len(self._intervals) and self._intervals[position] == (first, last, payload):
+            del self._intervals[position]
+            del self._firsts[position]
+            self._max_lasts = None
+
+    def overlapping(self, first, last):
+        """
+        Return the payloads of the intervals overlapping [first, last], in reverse order.
+        """
+        if self._max_lasts is None:
+            self._max_lasts = list()
+            maximum = None
+            for interval in self._intervals:
+                maximum = interval[1] if maximum is None else max(maximum, interval[1])
+                self._max_lasts.append(maximum)
+
+        payloads = list()
+        position = bisect_right(self._firsts, last) - 1
+        while position >= 0 and self._max_lasts[position] >= first:
+            if self._intervals[position][1] >= first:
+                payloads.append(self._intervals[position][2])
+            position -= 1
+        return payloads
+
+
+class RangeIndex(ProcessIndex):
+    """
+    Per-process index of the IPRanges of every subnet.
+    """
+    generation_cache_key = GENERATION_CACHE_KEY
+
+    def __init__(self):
+        super(RangeIndex, self).__init__()
+        self._lists = None
+
+    def _load_entries(self):
+        from ipam.models import IPRange
+
+        self._lists = dict()
+        self._entries = dict()
+        rows = IPRange.objects.values_list('pk', 'subnet_id', 'range_begin', 'range_end')
+        for row in rows.iterator():
+            self._insert(*row)
+
+    def _insert(self, pk, subnet_id, range_begin, range_end):
+        first, last = address_value(range_begin), address_value(range_end)
+        intervals = self._lists.get(subnet_id)
+        if intervals is None:
+            intervals = self._lists[subnet_id] = IntervalList()
+        intervals.insert(first, last, pk)
+        self._entries[pk] = (subnet_id, first, last)
+
+    def _remove(self, pk):
+        entry = self._entries.pop(pk, None)
+        if entry is not None:
+            subnet_id, first, last = entry
+            self._lists[subnet_id].remove(first, last, pk)
+
+    def range_saved(self, ip_range):
+        with self._lock:
+            self._discard_rolled_back_writes()
+            if self.loaded:
+                self._remove(ip_range.pk)
+                self._insert(ip_range.pk, ip_range.subnet_id, ip_range.range_begin,
+                             ip_range.range_end)
+            self._track_write()
+
+    def range_deleted(self, ip_range):
+        with self._lock:
+            self._discard_rolled_back_writes()
+            if self.loaded:
+                self._remove(ip_range.pk)
+            self._track_write()
+
+    def ranges_changed(self):
+        """
+        Reload the index once ranges were written without sending signals, e.g. by bulk_create().
+        """
+        with self._lock:
+            self._discard_rolled_back_writes()
+            self._entries = None
+            self._track_write()
+
+    def overlapping_ranges(self, subnet_id, first, last, exclude_pk=None):
+        """
+        Return the pks of the ranges of the subnet `subnet_id` which overlap [first, last].
+        """
+        with self._lock:
+            self._ensure_loaded()
+            intervals = self._lists.get(subnet_id)
+            if intervals is None:
+                return []
+            return [pk for pk in intervals.overlapping(first, last) if pk != exclude_pk]
+
+    def find_range(self, subnet_id, address):
+        """
+        Return the pk of the range of the subnet `subnet_id` containing `address`, or None.
+        """
+        value = address_value(address)
+        pks = self.overlapping_ranges(subnet_id, value, value)
+        return pks[0] if pks else None
+
+
+range_index = RangeIndex()
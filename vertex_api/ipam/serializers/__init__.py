@@ -0,0 +1,6 @@
+from .fabric import *
+from .vlan import *
+from .vrf import *
+from .subnet import *
+from .ip_address import *
+from .ip_range import *
@@ -0,0 +1,10 @@
+from rest_framework_json_api import serializers
+
+from ..models import Fabric
+
+
+class FabricSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Fabric
+        fields = ('name', 'description', 'notes', 'created_at', 'modified_at')
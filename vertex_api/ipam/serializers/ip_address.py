@@ -0,0 +1,22 @@
+from rest_framework_json_api import serializers
+from rest_framework_json_api.relations import ResourceRelatedField
+
+from .subnet import SubnetSerializer
+from ..models import IPAddress
+
+
+class IPAddressSerializer(serializers.ModelSerializer):
+    included_serializers = {
+        'subnet': SubnetSerializer,
+        'nat_inside': 'self',
+    }
+
+    address = serializers.CharField(read_only=True)
+    subnet = ResourceRelatedField(read_only=True)
+    interface = ResourceRelatedField(read_only=True)
+    nat_inside = ResourceRelatedField(read_only=True)
+
+    class Meta:
+        model = IPAddress
+        fields = ('address', 'version', 'subnet', 'interface', 'status', 'role', 'nat_inside',
+                  'description', 'notes', 'created_at', 'modified_at')
@@ -0,0 +1,21 @@
+from rest_framework_json_api import serializers
+from rest_framework_json_api.relations import ResourceRelatedField
+
+from .subnet import SubnetSerializer
+from ..models import IPRange
+
+
+class IPRangeSerializer(serializers.ModelSerializer):
+    included_serializers = {
+        'subnet': SubnetSerializer,
+    }
+
+    range_begin = serializers.CharField(read_only=True)
+    range_end = serializers.CharField(read_only=True)
+    subnet = ResourceRelatedField(read_only=True)
+    role = ResourceRelatedField(read_only=True)
+
+    class Meta:
+        model = IPRange
+        fields = ('range_begin', 'range_end', 'version', 'subnet', 'role', 'description', 'notes',
+                  'created_at', 'modified_at')
@@ -0,0 +1,26 @@
+from rest_framework_json_api import serializers
+from rest_framework_json_api.relations import ResourceRelatedField
+
+from .vlan import VLANSerializer
+from .vrf import VRFSerializer
+from ..models import Subnet
+
+
+class SubnetSerializer(serializers.ModelSerializer):
+    included_serializers = {
+        'vrf': VRFSerializer,
+        'vlan': VLANSerializer,
+        'supernet': 'self',
+    }
+
+    cidr = serializers.CharField(read_only=True)
+    supernet = ResourceRelatedField(read_only=True)
+    vrf = ResourceRelatedField(read_only=True)
+    space = ResourceRelatedField(read_only=True)
+    vlan = ResourceRelatedField(read_only=True)
+    role = ResourceRelatedField(read_only=True, many=True)
+
+    class Meta:
+        model = Subnet
+        fields = ('name', 'cidr', 'version', 'supernet', 'vrf', 'space', 'vlan', 'role',
+                  'description', 'notes')
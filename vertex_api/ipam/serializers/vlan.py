@@ -0,0 +1,20 @@
+from rest_framework_json_api import serializers
+from rest_framework_json_api.relations import ResourceRelatedField
+
+from .fabric import FabricSerializer
+from ..models import VLAN
+
+
+class VLANSerializer(serializers.ModelSerializer):
+    included_serializers = {
+        'fabric': FabricSerializer,
+    }
+
+    fabric = ResourceRelatedField(read_only=True)
+    gateway = ResourceRelatedField(read_only=True)
+    role = ResourceRelatedField(read_only=True, many=True)
+
+    class Meta:
+        model = VLAN
+        fields = ('name', 'vlan_id', 'fabric', 'gateway', 'role', 'description', 'notes',
+                  'created_at', 'modified_at')
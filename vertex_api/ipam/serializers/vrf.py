@@ -0,0 +1,13 @@
+from rest_framework_json_api import serializers
+from rest_framework_json_api.relations import ResourceRelatedField
+
+from ..models import VRF
+
+
+class VRFSerializer(serializers.ModelSerializer):
+    space = ResourceRelatedField(read_only=True)
+
+    class Meta:
+        model = VRF
+        fields = ('name', 'rd', 'space', 'enforce_unique', 'description', 'notes', 'created_at',
+                  'modified_at')
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Subnet, IPRange
+from .range_index import range_index
+from .subnet_index import subnet_index
+
+
+@receiver(post_save, sender=Subnet)
+def index_saved_subnet(instance, **kwargs):
+    """
+    Keep the in-memory subnet index in sync with saved subnets.
+    """
+    subnet_index.subnet_saved(instance)
+
+
+@receiver(post_delete, sender=Subnet)
+def unindex_deleted_subnet(instance, **kwargs):
+    """
+    Remove deleted subnets from the in-memory subnet index.
+    """
+    subnet_index.subnet_deleted(instance)
+
+
+@receiver(post_save, sender=IPRange)
+def index_saved_range(instance, **kwargs):
+    """
+    Keep the in-memory range index in sync with saved ranges.
+    """
+    range_index.range_saved(instance)
+
+
+@receiver(post_delete, sender=IPRange)
+def unindex_deleted_range(instance, **kwargs):
+    """
+    Remove deleted ranges from the in-memory range index.
+    """
+    range_index.range_deleted(instance)
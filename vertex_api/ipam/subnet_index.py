@@ -0,0 +1,229 @@
+# Subnet index
+#
+# Locating the parent of an address or a subnet is a longest-prefix-match problem. Rather than
+# asking the database for every enclosing subnet and sorting them, we keep every Subnet CIDR in a
+# binary trie (one per IP version and VRF) and walk it bit by bit, so that a lookup costs at most
+# one step per bit of prefix length and no query at all.
+#
+# The index is kept up to date by the Subnet post_save/post_delete handlers in ipam.signals, see
+# ipam.indexes for how it is loaded and invalidated.
+from ipaddress import ip_network
+
+import netaddr
+from django.db import transaction
+
+from ipam.indexes import ProcessIndex
+
+GENERATION_CACHE_KEY = 'ipam_subnet_index_generation'
+
+# the fields loaded for each indexed subnet, all other fields are deferred. They must be listed in
+# the order in which they are declared on Subnet, as expected by Model.from_db()
+INDEXED_FIELDS = ('id', 'cidr', 'version', 'vrf_id')
+
+ANY_VRF = object()
+
+
+class PrefixTrie(object):
+    """
+    A binary trie of IP prefixes.
+
+    Each node is a list of [zero_child, one_child, payload]. A prefix of length n is stored on the
+    node reached by following the n most significant bits of its network address.
+    """
+    __slots__ = ('bits', '_root', '_size')
+
+    def __init__(self, bits):
+        self.bits = bits
+        self._root = [None, None, None]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, network, prefixlen, payload):
+        node = self._root
+        shift = self.bits - 1
+        for depth in range(prefixlen):
+            bit = (network >> (shift - depth)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        if node[2] is None:
+            self._size += 1
+        node[2] = payload
+
+    def remove(self, network, prefixlen):
+        path = []
+        node = self._root
+        shift = self.bits - 1
+        for depth in range(prefixlen):
+            bit = (network >> (shift - depth)) & 1
+            if node[bit] is None:
+                return None
+            path.append((node, bit))
+            node = node[bit]
+
+        payload = node[2]
+        if payload is None:
+            return None
+        node[2] = None
+        self._size -= 1
+
+        # prune the branch we just emptied
+        while path and node[0] is None and node[1] is None and node[2] is None:
+            parent, bit = path.pop()
+            parent[bit] = None
+            node = parent
+        return payload
+
+    def longest_match(self, network, prefixlen, exclude=None):
+        """
+        Return a (depth, payload) tuple for the longest prefix that strictly contains
+        `network`/`prefixlen`, or (-1, None) when there is none. Payloads for which `exclude`
+        returns True are skipped.
+        """
+        best = (-1, None)
+        node = self._root
+        shift = self.bits - 1
+        for depth in range(prefixlen):
+            payload = node[2]
+            if payload is not None and not (exclude and exclude(payload)):
+                best = (depth, payload)
+            node = node[(network >> (shift - depth)) & 1]
+            if node is None:
+                break
+        return best
+
+
+def _address_key(address):
+    if isinstance(address, netaddr.IPAddress):
+        return address.version, int(address), 32 if address.version == 4 else 128
+    address = netaddr.IPNetwork(str(address))
+    return address.version, int(address.ip), 32 if address.version == 4 else 128
+
+
+def _network_key(cidr):
+    cidr = netaddr.IPNetwork(str(cidr))
+    return cidr.version, int(cidr.network), cidr.prefixlen
+
+
+class SubnetIndex(ProcessIndex):
+    """
+    Per-process longest-prefix-match index over every Subnet, split by IP version and VRF.
+    """
+    generation_cache_key = GENERATION_CACHE_KEY
+
+    def __init__(self):
+        super(SubnetIndex, self).__init__()
+        self._tries = None
+
+    def _load_entries(self):
+        from ipam.models import Subnet
+
+        self._tries = dict()
+        self._entries = dict()
+        for row in Subnet.objects.values_list(*INDEXED_FIELDS).iterator():
+            self._insert(*row)
+
+    def _insert(self, pk, cidr, version, vrf_id):
+        cidr = ip_network(str(cidr))
+        key = (version, vrf_id)
+        trie = self._tries.get(key)
+        if trie is None:
+            trie = self._tries[key] = PrefixTrie(cidr.max_prefixlen)
+        trie.insert(int(cidr.network_address), cidr.prefixlen, (pk, cidr, version, vrf_id))
+        self._entries[pk] = (key, int(cidr.network_address), cidr.prefixlen)
+
+    def _remove(self, pk):
+        entry = self._entries.pop(pk, None)
+        if entry is not None:
+            key, network, prefixlen = entry
+            self._tries[key].remove(network, prefixlen)
+
+    def subnet_saved(self, subnet):
+        with self._lock:
+            self._discard_rolled_back_writes()
+            if self.loaded:
+                self._remove(subnet.pk)
+                self._insert(subnet.pk, subnet.cidr, subnet.version, subnet.vrf_id)
+            self._track_write()
+
+    def subnets_changed(self):
+        """
+        Reload the index once subnets were written without sending signals, e.g. by bulk_create().
+        """
+        with self._lock:
+            self._discard_rolled_back_writes()
+            self._entries = None
+            self._track_write()
+
+    def subnet_deleted(self, subnet):
+        with self._lock:
+            self._discard_rolled_back_writes()
+            if self.loaded:
+                self._remove(subnet.pk)
+            self._track_write()
+
+    def _longest_match(self, version, network, prefixlen, vrf=ANY_VRF, exclude_pk=None):
+        """
+        Return the payload of the longest match, the caller must hold the lock and have loaded the
+        index.
+        """
+        exclude = None
+        if exclude_pk is not None:
+            exclude = lambda payload: payload[0] == exclude_pk
+
+        if vrf is ANY_VRF:
+            tries = [trie for (trie_version, vrf_id), trie in self._tries.items()
+                     if trie_version == version]
+        else:
+            vrf_id = getattr(vrf, 'pk', vrf)
+            tries = [self._tries.get((version, vrf_id))]
+
+        best = (-1, None)
+        for trie in tries:
+            if trie is not None:
+                match = trie.longest_match(network, prefixlen, exclude)
+                if match[0] > best[0]:
+                    best = match
+        return best[1]
+
+    def _find(self, key, vrf=ANY_VRF, exclude_pk=None):
+        with self._lock:
+            self._ensure_loaded()
+            return self._longest_match(*key, vrf=vrf, exclude_pk=exclude_pk)
+
+    def find_address_parents(self, addresses, vrf=ANY_VRF):
+        """
+        Resolve the parents of many addresses at once. Return a list holding, for each address, a
+        (subnet pk, subnet cidr, subnet vrf_id) tuple or None when no subnet contains it.
+        """
+        parents = list()
+        with self._lock:
+            self._ensure_loaded()
+            for address in addresses:
+                payload = self._longest_match(*_address_key(address), vrf=vrf)
+                parents.append((payload[0], payload[1], payload[3]) if payload else None)
+        return parents
+
+    def find_address_parent(self, address, vrf=ANY_VRF):
+        """
+        Return the smallest Subnet containing `address`, or None.
+        """
+        return _subnet_from_payload(self._find(_address_key(address), vrf))
+
+    def find_subnet_parent(self, cidr, vrf=ANY_VRF, exclude_pk=None):
+        """
+        Return the smallest Subnet strictly containing `cidr`, or None.
+        """
+        return _subnet_from_payload(self._find(_network_key(cidr), vrf, exclude_pk))
+
+
+def _subnet_from_payload(payload):
+    if payload is None:
+        return None
+    from ipam.models import Subnet
+    return Subnet.from_db(transaction.get_connection().alias, INDEXED_FIELDS, payload)
+
+
+subnet_index = SubnetIndex()
@@ -1 +1,6 @@
-from .models import *
\ No newline at end of file
+from .models import *
+from .managers import *
+from .subnet_index import *
+from .utilisation import *
+from .range_index import *
+from .api import *
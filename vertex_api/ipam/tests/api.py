@@ -0,0 +1,77 @@
+import json
+from base64 import urlsafe_b64encode
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from ipam.models import Subnet, Space, IPAddress, IPRange
+
+ADDRESSES = ['10.2.3.1', '10.2.3.2', '10.2.3.10', '10.2.3.100', '2001:db8::1']
+
+
+@override_settings(ROOT_URLCONF='ipam.urls')
+class IPAddressAPITests(APITestCase):
+
+    def setUp(self):
+        Space.objects.get_or_create(name="Test Space", pk=1)
+        Subnet.objects.create(cidr='10.2.3.0/24')
+        Subnet.objects.create(cidr='2001:db8::/32')
+        for address in reversed(ADDRESSES):
+            IPAddress.objects.create(address=address)
+
+        self.client.force_authenticate(User.objects.create_user('ipam', 'ipam@example.com'))
+
+    def test_keyset_pagination(self):
+        addresses = list()
+        url = reverse('ipaddress-list') + '?page_size=2'
+        while url is not None:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            addresses.extend(item['address'].split('/')[0] for item in response.data['results'])
+            url = response.data['links']['next']
+
+        self.assertEqual(addresses, ADDRESSES)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('ipaddress-list') + '?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+        # well-formed cursors whose values don't fit the ordering fields
+        for position in (['four', '10.2.3.1', '1'], [4, '10.2.3.1', 'one'], [4, 'garbage', 1]):
+            cursor = urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+            response = self.client.get(reverse('ipaddress-list') + '?cursor=' + cursor)
+            self.assertEqual(response.status_code, 404, position)
+
+    def walk_pages(self, url):
+        results = list()
+        while url is not None:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            results.extend(response.data['results'])
+            url = response.data['links']['next']
+        return results
+
+    def test_subnet_keyset_pagination(self):
+        Subnet.objects.create(cidr='10.2.4.0/24')
+        subnets = self.walk_pages(reverse('subnet-list') + '?page_size=1')
+        self.assertEqual([subnet['cidr'] for subnet in subnets],
+                         ['10.2.3.0/24', '10.2.4.0/24', '2001:db8::/32'])
+
+    def test_range_keyset_pagination(self):
+        subnet = Subnet.objects.get(cidr='10.2.3.0/24')
+        for begin, end in (('10.2.3.200', '10.2.3.210'), ('10.2.3.20', '10.2.3.29'),
+                           ('10.2.3.110', '10.2.3.119')):
+            IPRange.objects.create(subnet=subnet, range_begin=begin, range_end=end)
+        ranges = self.walk_pages(reverse('iprange-list') + '?page_size=1')
+        self.assertEqual([str(ip_range['range_begin']).split('/')[0] for ip_range in ranges],
+                         ['10.2.3.20', '10.2.3.110', '10.2.3.200'])
+
+    def test_export(self):
+        response = self.client.get(reverse('ipaddress-export'))
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['address'].split('/')[0] for line in lines], ADDRESSES)
@@ -0,0 +1,198 @@
+import csv
+import io
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from ipam.models import Subnet, Space, IPAddress, IPRange, IPRangeRole, VRF
+
+
+class IPAddressBulkImportTests(TestCase):
+
+    def setUp(self):
+        Space.objects.get_or_create(name="Test Space", pk=1)
+        self.subnet = Subnet.objects.create(cidr='10.2.3.0/24')
+        self.small_subnet = Subnet.objects.create(cidr='10.2.3.128/25')
+
+    def test_bulk_import(self):
+        result = IPAddress.objects.bulk_import(
+            [
+                {'address': '10.2.3.130', 'description': 'second'},
+                {'address': '10.2.3.1', 'description': 'first'},
+            ],
+            batch_size=1
+        )
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.errors, [])
+        self.assertEqual(IPAddress.objects.get(address='10.2.3.1').subnet, self.subnet)
+        self.assertEqual(IPAddress.objects.get(address='10.2.3.130').subnet, self.small_subnet)
+
+    def test_bulk_import_reports_rejected_rows(self):
+        rows = [
+            {'address': '10.2.3.2'},
+            {'address': 'not an address'},
+            {'address': '172.31.3.1'},  # no parent
+            {'address': '10.2.3.0'},  # network address
+            {'address': '10.2.3.127'},
+            {'address': '10.2.3.255'},  # broadcast address of 10.2.3.128/25
+            {'address': '10.2.3.3', 'status': 42},  # invalid choice
+            {'address': '10.2.3.4', 'vrf': 1},  # unknown field
+        ]
+
+        result = IPAddress.objects.bulk_import(rows)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(sorted(row_number for row_number, row, message in result.errors),
+                         [2, 3, 4, 6, 7, 8])
+        self.assertEqual(IPAddress.objects.count(), 2)
+
+    def test_bulk_import_reports_extra_csv_values(self):
+        rows = csv.DictReader(io.StringIO("address,description\n10.2.3.5,fifth,extra\n"))
+
+        result = IPAddress.objects.bulk_import(rows)
+
+        self.assertEqual(result.created, 0)
+        self.assertEqual([row_number for row_number, row, message in result.errors], [1])
+
+    def test_bulk_import_numbered_rows(self):
+        result = IPAddress.objects.bulk_import(
+            [(3, {'address': '10.2.3.6'}), (5, {'address': 'not an address'})], numbered=True
+        )
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([row_number for row_number, row, message in result.errors], [5])
+
+    def test_import_command_reports_file_lines(self):
+        # the blank line is skipped but still counted
+        stream = io.StringIO('{"address": "10.2.3.7"}\n\n{"address": "nope"}\n')
+        stderr = io.StringIO()
+
+        with mock.patch('sys.stdin', stream):
+            call_command('import_ip_addresses', '-', format='ndjson', stdout=io.StringIO(),
+                         stderr=stderr)
+
+        self.assertTrue(stderr.getvalue().startswith("Line 3:"))
+        self.assertTrue(IPAddress.objects.filter(address='10.2.3.7').exists())
+
+
+class SubnetTreeTests(TestCase):
+
+    def setUp(self):
+        Space.objects.get_or_create(name="Test Space", pk=1)
+
+    def assertTreeIsConsistent(self):
+        for subnet in Subnet.objects.all():
+            self.assertEqual(subnet.supernet, subnet.find_parent(), str(subnet))
+
+    def test_bulk_insert_cidrs(self):
+        Subnet.objects.create(cidr='10.2.0.0/16')
+        Subnet.objects.bulk_insert_cidrs(
+            ['10.2.3.4/30', '10.2.0.0/24', '10.0.0.0/8', '10.2.3.0/24', '2001:db8::/32']
+        )
+
+        self.assertEqual(Subnet.objects.count(), 6)
+        self.assertEqual(Subnet.objects.get(cidr='10.2.3.4/30').supernet.cidr,
+                         Subnet.objects.get(cidr='10.2.3.0/24').cidr)
+        self.assertTreeIsConsistent()
+
+    def test_rebuild_tree(self):
+        Subnet.objects.bulk_insert_cidrs(['10.0.0.0/8', '10.2.0.0/16', '10.2.3.0/24'])
+        Subnet.objects.update(supernet=None)
+
+        self.assertEqual(Subnet.objects.rebuild_tree(), 2)
+        self.assertTreeIsConsistent()
+        self.assertEqual(Subnet.objects.rebuild_tree(), 0)
+
+
+class SubnetAllocationTests(TestCase):
+
+    def setUp(self):
+        Space.objects.get_or_create(name="Test Space", pk=1)
+        self.subnet = Subnet.objects.create(cidr='10.2.3.0/28')
+        Subnet.objects.create(cidr='10.2.3.4/30')
+        managed = IPRangeRole.objects.create(name="Infrastructure", color='#ff0000', managed=True)
+        unmanaged = IPRangeRole.objects.create(name="DHCP", color='#00ff00', managed=False)
+        IPRange.objects.create(subnet=self.subnet, range_begin='10.2.3.9',
+                               range_end='10.2.3.10', role=managed)
+        IPRange.objects.create(subnet=self.subnet, range_begin='10.2.3.12',
+                               range_end='10.2.3.13', role=unmanaged)
+        IPAddress.objects.create(address='10.2.3.2')
+
+    def test_allocate_address(self):
+        address = self.subnet.allocate_address(description="provisioned")
+
+        self.assertEqual(str(address.address), '10.2.3.1')
+        self.assertEqual(address.subnet, self.subnet)
+        self.assertEqual(IPAddress.objects.get(pk=address.pk).description, "provisioned")
+
+    def test_allocate_addresses(self):
+        addresses = self.subnet.allocate_addresses(5)
+
+        self.assertEqual(
+            [str(address.address) for address in addresses],
+            ['10.2.3.1', '10.2.3.3', '10.2.3.8', '10.2.3.11', '10.2.3.12']
+        )
+
+    def test_allocate_too_many_addresses(self):
+        with self.assertRaises(ValueError):
+            self.subnet.allocate_addresses(8)
+        self.assertEqual(IPAddress.objects.count(), 1)
+
+
+class DuplicateAddressTests(TestCase):
+
+    def setUp(self):
+        Space.objects.get_or_create(name="Test Space", pk=1)
+        self.vrf = VRF.objects.create(name="Red", rd='65000:1', space_id=1, enforce_unique=False)
+        Subnet.objects.create(cidr='10.9.0.0/24', vrf=self.vrf)
+        Subnet.objects.create(cidr='10.8.0.0/24')
+        self.first = IPAddress.objects.create(address='10.9.0.5')
+        self.second = IPAddress.objects.create(address='10.9.0.5')
+        IPAddress.objects.create(address='10.8.0.5')
+
+    def test_duplicate_groups(self):
+        with self.assertNumQueries(1):
+            groups = IPAddress.objects.duplicate_groups()
+
+        self.assertEqual(groups, [{
+            'vrf': self.vrf.pk,
+            'address': '10.9.0.5',
+            'ids': [self.first.pk, self.second.pk]
+        }])
+        self.assertEqual(IPAddress.objects.duplicate_groups(None), [])
+
+    def test_enforcing_vrf_with_duplicates_fails(self):
+        self.vrf.enforce_unique = True
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.vrf.save()
+
+    def test_clean_follows_unique_scope(self):
+        self.second.delete()
+        third = IPAddress(address='10.9.0.5')
+        third.clean()  # the VRF allows duplicates
+
+        self.vrf.enforce_unique = True
+        self.vrf.save()
+        with self.assertRaises(ValidationError):
+            third.clean()
+        # the global table doesn't enforce unique addresses
+        IPAddress(address='10.8.0.5').clean()
+
+    def test_bulk_import_rejects_duplicates(self):
+        self.second.delete()
+        self.vrf.enforce_unique = True
+        self.vrf.save()
+
+        result = IPAddress.objects.bulk_import([
+            {'address': '10.9.0.5'},
+            {'address': '10.9.0.6'},
+            {'address': '10.9.0.6'},
+            {'address': '10.8.0.5'},  # the global table doesn't enforce unique addresses
+        ])
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([row_number for row_number, row, message in result.errors], [1, 3])
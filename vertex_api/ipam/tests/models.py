@@ -7,6 +7,7 @@ ROOT_PARENT_MUST_BE_NONE = 'Subnet {0} has a parent but should be a root'
 CHILD_WRONG_PARENT = 'Subnet {0} : wrong parent! Expected: {1}, was: {2}'
 CHILD_PARENT_IS_NONE = 'Subnet {0} : should be a child, but has parent None'
 SUPERNET_CONFLICT = 'Subnet {0} : Stored supernet {1} conflicts with result of find_parent {2}'
+ANCESTOR_PATH_CONFLICT = 'Subnet {0} : Stored ancestor path {1} conflicts with its supernets {2}'
 
 
 class SubnetsAndAddressesTests(TestCase):
@@ -46,6 +47,16 @@ class SubnetsAndAddressesTests(TestCase):
                 subnet.find_parent(),
                 SUPERNET_CONFLICT.format(subnet, subnet.supernet, subnet.find_parent())
             )
+            ancestor_ids = list()
+            parent = subnet.supernet
+            while parent is not None:
+                ancestor_ids.insert(0, parent.pk)
+                parent = parent.supernet
+            self.assertEqual(
+                subnet.ancestor_ids,
+                ancestor_ids,
+                ANCESTOR_PATH_CONFLICT.format(subnet, subnet.ancestor_path, ancestor_ids)
+            )
 
     def test_new_root(self):
         new_root1, created = Subnet.objects.get_or_create(cidr='192.0.0.0/8')
@@ -159,6 +170,26 @@ class SubnetsAndAddressesTests(TestCase):
             transform=lambda s: str(s.cidr)
         )
 
+    def test_display_with_ancestors(self):
+        subnet = Subnet.objects.get(cidr='10.2.3.4/30')
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                subnet.display_with_ancestors(),
+                '10.0.0.0/8 > 10.2.0.0/16 > 10.2.3.0/24 > 10.2.3.4/30'
+            )
+
+    def test_descendants(self):
+        expected = ['10.2.0.0/24', '10.2.1.0/24', '10.2.3.0/24', '10.2.0.0/30', '10.2.0.4/30',
+                    '10.2.3.4/30']
+        subnet = Subnet.objects.get(cidr='10.2.0.0/16')
+
+        self.assertQuerysetEqual(
+            subnet.descendants(),
+            expected,
+            ordered=False,
+            transform=lambda s: str(s.cidr)
+        )
+
     def test_ip_address_no_parent(self):
         with self.assertRaises(ValueError):
             address, created = IPAddress.objects.get_or_create(address='172.31.3.1')
@@ -0,0 +1,75 @@
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+
+from ipam.models import Subnet, Space, IPAddress, IPRange
+from ipam.range_index import IntervalList
+
+
+class IntervalListTests(SimpleTestCase):
+
+    def setUp(self):
+        self.intervals = IntervalList([(0, 9, 'a'), (20, 29, 'b'), (2, 40, 'c'), (50, 50, 'd')])
+
+    def test_overlapping(self):
+        self.assertEqual(sorted(self.intervals.overlapping(5, 5)), ['a', 'c'])
+        self.assertEqual(sorted(self.intervals.overlapping(30, 60)), ['c', 'd'])
+        self.assertEqual(self.intervals.overlapping(41, 49), [])
+
+    def test_insert_and_remove(self):
+        self.intervals.remove(2, 40, 'c')
+        self.intervals.insert(42, 45, 'e')
+        self.assertEqual(len(self.intervals), 4)
+        self.assertEqual(self.intervals.overlapping(30, 41), [])
+        self.assertEqual(self.intervals.overlapping(41, 49), ['e'])
+
+
+class IPRangeValidationTests(TestCase):
+
+    def setUp(self):
+        Space.objects.get_or_create(name="Test Space", pk=1)
+        self.subnet = Subnet.objects.create(cidr='10.2.3.0/24')
+        Subnet.objects.create(cidr='10.2.3.128/26')
+        self.ip_range = IPRange.objects.create(subnet=self.subnet, range_begin='10.2.3.10',
+                                               range_end='10.2.3.19')
+
+    def test_overlapping_range_is_rejected(self):
+        ip_range = IPRange(subnet=self.subnet, range_begin='10.2.3.15', range_end='10.2.3.25')
+        with self.assertRaises(ValidationError):
+            ip_range.clean()
+        with self.assertRaises(ValueError):
+            ip_range.save()
+
+    def test_range_clashing_with_subnet_is_rejected(self):
+        ip_range = IPRange(subnet=self.subnet, range_begin='10.2.3.120', range_end='10.2.3.130')
+        self.assertEqual(ip_range.clashing_subnets(), ['10.2.3.128/26'])
+        with self.assertRaises(ValidationError):
+            ip_range.clean()
+
+    def test_find_range(self):
+        self.assertEqual(IPAddress.objects.create(address='10.2.3.12').find_range(),
+                         self.ip_range)
+        self.assertIsNone(IPAddress.objects.create(address='10.2.3.20').find_range())
+
+    def test_validate_ranges(self):
+        ranges = [
+            IPRange(subnet=self.subnet, range_begin='10.2.3.30', range_end='10.2.3.39'),
+            IPRange(subnet=self.subnet, range_begin='10.2.3.35', range_end='10.2.3.40'),
+            IPRange(subnet=self.subnet, range_begin='10.2.3.19', range_end='10.2.3.20'),
+            IPRange(subnet=self.subnet, range_begin='10.2.3.60', range_end='10.2.3.50'),
+            IPRange(subnet=self.subnet, range_begin='10.2.3.100', range_end='10.2.3.200'),
+            IPRange(subnet=self.subnet, range_begin='10.2.3.41', range_end='10.2.3.49'),
+        ]
+        with self.assertNumQueries(2):
+            errors = IPRange.objects.validate_ranges(ranges)
+
+        self.assertEqual([position for position, ip_range, message in errors], [1, 2, 3, 4])
+
+    def test_validate_ranges_without_subnet(self):
+        ranges = [
+            IPRange(range_begin='10.2.3.30', range_end='10.2.3.39'),
+            IPRange(subnet_id=self.subnet.pk + 1000, range_begin='10.2.3.30',
+                    range_end='10.2.3.39'),
+            IPRange(subnet=self.subnet, range_begin='10.2.3.30', range_end='10.2.3.39'),
+        ]
+        errors = IPRange.objects.validate_ranges(ranges)
+        self.assertEqual([position for position, ip_range, message in errors], [0, 1])
@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+from netaddr import IPNetwork
+
+from ipam.models import Subnet, Space, IPAddress
+from ipam.subnet_index import PrefixTrie, subnet_index
+
+
+def _prefix(cidr):
+    network = IPNetwork(cidr)
+    return int(network.network), network.prefixlen
+
+
+class PrefixTrieTests(SimpleTestCase):
+
+    def setUp(self):
+        self.trie = PrefixTrie(32)
+        for cidr in ('10.0.0.0/8', '10.2.0.0/16', '10.2.3.0/24', '10.2.3.4/30'):
+            self.trie.insert(*_prefix(cidr), payload=cidr)
+
+    def test_longest_match(self):
+        self.assertEqual(self.trie.longest_match(*_prefix('10.2.3.5/32')), (30, '10.2.3.4/30'))
+        self.assertEqual(self.trie.longest_match(*_prefix('10.2.4.1/32')), (16, '10.2.0.0/16'))
+        self.assertEqual(self.trie.longest_match(*_prefix('10.9.0.0/16')), (8, '10.0.0.0/8'))
+        self.assertEqual(self.trie.longest_match(*_prefix('192.168.0.1/32')), (-1, None))
+
+    def test_match_is_strict(self):
+        self.assertEqual(self.trie.longest_match(*_prefix('10.2.3.0/24')), (16, '10.2.0.0/16'))
+
+    def test_exclude(self):
+        match = self.trie.longest_match(*_prefix('10.2.3.0/25'),
+                                        exclude=lambda payload: payload == '10.2.3.0/24')
+        self.assertEqual(match, (16, '10.2.0.0/16'))
+
+    def test_remove(self):
+        self.assertEqual(self.trie.remove(*_prefix('10.2.3.0/24')), '10.2.3.0/24')
+        self.assertEqual(len(self.trie), 3)
+        self.assertEqual(self.trie.longest_match(*_prefix('10.2.3.1/32')), (16, '10.2.0.0/16'))
+        self.assertEqual(self.trie.longest_match(*_prefix('10.2.3.5/32')), (30, '10.2.3.4/30'))
+        self.assertIsNone(self.trie.remove(*_prefix('10.2.3.0/24')))
+
+
+class SubnetIndexTests(TestCase):
+
+    def setUp(self):
+        Space.objects.get_or_create(name="Test Space", pk=1)
+        self.root = Subnet.objects.create(cidr='10.0.0.0/8')
+        self.child = Subnet.objects.create(cidr='10.2.0.0/16')
+
+    def test_find_parent_without_query(self):
+        subnet_index.find_address_parent('10.2.0.1')  # make sure the index is loaded
+        with self.assertNumQueries(0):
+            parent = subnet_index.find_address_parent('10.2.0.1')
+        self.assertEqual(parent, self.child)
+        self.assertEqual(str(parent.cidr), '10.2.0.0/16')
+
+    def test_index_follows_deletions(self):
+        self.child.delete()
+        self.assertEqual(IPAddress(address='10.2.0.1').find_parent(), self.root)
+
+    def test_rolled_back_subnet_is_forgotten(self):
+        try:
+            with transaction.atomic():
+                Subnet.objects.create(cidr='10.2.3.0/24')
+                self.assertEqual(subnet_index.find_address_parent('10.2.3.1').cidr.prefixlen, 24)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(subnet_index.find_address_parent('10.2.3.1'), self.child)
@@ -0,0 +1,79 @@
+from ipaddress import ip_network
+
+from django.test import SimpleTestCase, TestCase
+
+from ipam.models import Subnet, Space, IPAddress, IPRange
+from ipam.utilisation import merge_intervals, interval_gaps, interval_to_blocks
+
+
+class IntervalTests(SimpleTestCase):
+
+    def test_merge_intervals(self):
+        self.assertEqual(
+            merge_intervals([(0, 3), (2, 5), (6, 6), (8, 9), (8, 8)]),
+            [(0, 6), (8, 9)]
+        )
+
+    def test_interval_gaps(self):
+        self.assertEqual(
+            list(interval_gaps(0, 15, [(0, 1), (4, 5), (14, 20)])),
+            [(2, 3), (6, 13)]
+        )
+        self.assertEqual(list(interval_gaps(0, 15, [])), [(0, 15)])
+
+    def test_interval_to_blocks(self):
+        self.assertEqual(
+            list(interval_to_blocks(1, 14, 4)),
+            [(1, 4), (2, 3), (4, 2), (8, 2), (12, 3), (14, 4)]
+        )
+        self.assertEqual(list(interval_to_blocks(0, 255, 8)), [(0, 0)])
+
+
+class SubnetUtilisationTests(TestCase):
+
+    def setUp(self):
+        Space.objects.get_or_create(name="Test Space", pk=1)
+
+        self.subnet, created = Subnet.objects.get_or_create(cidr='10.0.0.0/24')
+        Subnet.objects.get_or_create(cidr='10.0.0.0/26')
+        Subnet.objects.get_or_create(cidr='10.0.0.128/28')
+        IPRange.objects.create(subnet=self.subnet, range_begin='10.0.0.64',
+                               range_end='10.0.0.79')
+        IPAddress.objects.get_or_create(address='10.0.0.70')
+        IPAddress.objects.get_or_create(address='10.0.0.100')
+
+    def test_utilisation(self):
+        with self.assertNumQueries(4):
+            utilisation = self.subnet.utilisation()
+
+        self.assertEqual(utilisation.size, 256)
+        self.assertEqual(utilisation.allocated, 64 + 16)
+        self.assertEqual(utilisation.reserved, 16)
+        self.assertEqual(utilisation.addresses, 2)
+        self.assertEqual(utilisation.used, 64 + 16 + 16 + 1)
+        self.assertEqual(utilisation.free, 256 - 97)
+
+    def test_free_blocks(self):
+        self.assertEqual(
+            [str(block) for block in self.subnet.utilisation().free_blocks()],
+            ['10.0.0.80/28', '10.0.0.96/30', '10.0.0.101/32', '10.0.0.102/31', '10.0.0.104/29',
+             '10.0.0.112/28', '10.0.0.144/28', '10.0.0.160/27', '10.0.0.192/26']
+        )
+
+    def test_next_free_block(self):
+        utilisation = self.subnet.utilisation()
+        self.assertEqual(str(utilisation.next_free_block(29)), '10.0.0.80/29')
+        self.assertEqual(str(utilisation.next_free_block(27)), '10.0.0.160/27')
+        self.assertIsNone(utilisation.next_free_block(24))
+
+    def test_large_ipv6_subnet(self):
+        subnet, created = Subnet.objects.get_or_create(cidr='2001:db8:abcd::/48')
+        Subnet.objects.get_or_create(cidr='2001:db8:abcd::/64')
+        IPAddress.objects.get_or_create(address='2001:db8:abcd:1::1')
+
+        utilisation = subnet.utilisation()
+        self.assertEqual(utilisation.used, 2 ** 64 + 1)
+        self.assertEqual(utilisation.next_free_block(64),
+                         ip_network('2001:db8:abcd:2::/64'))
+        self.assertEqual(utilisation.next_free_block(127),
+                         ip_network('2001:db8:abcd:1::2/127'))
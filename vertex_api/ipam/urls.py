@@ -0,0 +1,28 @@
+from django.conf.urls import url
+from rest_framework.routers import DefaultRouter
+
+from .views import SubnetUtilisationView, DuplicateIPAddressesView
+from .viewsets import (
+    SubnetViewSet,
+    IPAddressViewSet,
+    IPRangeViewSet,
+    VRFViewSet,
+    VLANViewSet,
+    FabricViewSet
+)
+
+router = DefaultRouter(trailing_slash=False)
+
+router.register(r'subnets', SubnetViewSet)
+router.register(r'ip-addresses', IPAddressViewSet)
+router.register(r'ip-ranges', IPRangeViewSet)
+router.register(r'vrfs', VRFViewSet)
+router.register(r'vlans', VLANViewSet)
+router.register(r'fabrics', FabricViewSet)
+
+urlpatterns = [
+    url(r'subnets/(?P<pk>[^/.]+)/utilisation$', SubnetUtilisationView.as_view(),
+        name='subnet-utilisation'),
+    url(r'ip-addresses/duplicates$', DuplicateIPAddressesView.as_view(),
+        name='ip-address-duplicates'),
+] + router.urls
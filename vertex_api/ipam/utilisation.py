@@ -0,0 +1,185 @@
+# Subnet utilisation
+#
+# The space of a subnet is taken up by its direct children, by the IP ranges reserved in it and by
+# the addresses assigned in it. Rather than iterating over every address of the subnet (which is
+# hopeless for an IPv6 /48), each of those is turned into an interval of integers [first, last],
+# the intervals are sorted and merged, and the free space is what lies between them. Counting and
+# enumerating free blocks then costs a handful of queries and a linear sweep over the intervals.
+from functools import reduce
+from ipaddress import ip_network
+
+from django.db.models import Q
+
+
+def merge_intervals(intervals):
+    """
+    Merge overlapping or adjacent (first, last) intervals, which must be sorted.
+    """
+    merged = list()
+    for first, last in intervals:
+        if merged and first <= merged[-1][1] + 1:
+            if last > merged[-1][1]:
+                merged[-1][1] = last
+        else:
+            merged.append([first, last])
+    return [tuple(interval) for interval in merged]
+
+
+def interval_gaps(first, last, intervals):
+    """
+    Yield the (first, last) intervals of [first, last] which aren't covered by `intervals`, which
+    must be sorted and merged.
+    """
+    position = first
+    for used_first, used_last in intervals:
+        if used_last < position:
+            continue
+        if used_first > last:
+            break
+        if used_first > position:
+            yield position, used_first - 1
+        position = used_last + 1
+    if position <= last:
+        yield position, last
+
+
+def interval_to_blocks(first, last, bits):
+    """
+    Yield the (network, prefixlen) tuples of the largest aligned blocks covering [first, last].
+    """
+    while first <= last:
+        # the largest block aligned on `first`...
+        size = first & -first if first else 1 << bits
+        # ...which doesn't go past `last`
+        while size > last - first + 1:
+            size >>= 1
+        yield first, bits - size.bit_length() + 1
+        first += size
+
+
+class SubnetUtilisation(object):
+    """
+    Utilisation of a subnet, computed from its direct children, its IP ranges and its addresses.
+
+    All sizes are numbers of addresses. An address assigned within a reserved range is counted in
+    both `reserved` and `addresses`, but only once in `used`.
+    """
+
+    def __init__(self, subnet):
+        self.subnet = subnet
+        cidr = ip_network(str(subnet.cidr))
+        self._network_class = cidr.__class__
+        self._address_class = cidr.network_address.__class__
+        self.bits = cidr.max_prefixlen
+        self.first = int(cidr.network_address)
+        self.last = int(cidr.broadcast_address)
+        self.size = cidr.num_addresses
+
+        self.children = merge_intervals(sorted(
+            (int(child.network_address), int(child.broadcast_address))
+            for child in (ip_network(str(cidr)) for cidr in
+                          subnet.children.values_list('cidr', flat=True))
+        ))
+        self.ranges = merge_intervals(sorted(
+            (int(begin), int(end))
+            for begin, end in subnet.iprange_set.values_list('range_begin', 'range_end')
+        ))
+
+        self.allocated = sum(last - first + 1 for first, last in self.children)
+        self.reserved = sum(
+            last - first + 1 for first, last in
+            merge_intervals(sorted(self.ranges + self.children))
+        ) - self.allocated
+
+        addresses = subnet.ipaddress_set.all()
+        self.addresses = addresses.count()
+        addresses_in_ranges = addresses.filter(self._ranges_q()).count() if self.ranges else 0
+        self.used = self.allocated + self.reserved + self.addresses - addresses_in_ranges
+
+    @property
+    def free(self):
+        return self.size - self.used
+
+    @property
+    def percent_used(self):
+        return 100.0 * self.used / self.size
+
+    def _ranges_q(self):
+        bounds = [
+            Q(address__gte=str(self._address_class(first)),
+              address__lte=str(self._address_class(last)))
+            for first, last in self.ranges
+        ]
+        return reduce(lambda left, right: left | right, bounds)
+
+    def _used_intervals(self):
+        """
+        Yield the merged intervals taken up in the subnet, in order, streaming the addresses from
+        the database rather than loading them all at once.
+        """
+        addresses = self.subnet.ipaddress_set.order_by('address').values_list('address', flat=True)
+        if self.ranges:
+            addresses = addresses.exclude(self._ranges_q())
+        addresses = ((int(address), int(address)) for address in addresses.iterator())
+
+        blocks = iter(merge_intervals(sorted(self.children + self.ranges)))
+        block = next(blocks, None)
+        address = next(addresses, None)
+        current = None
+        while block is not None or address is not None:
+            if address is None or (block is not None and block[0] <= address[0]):
+                interval, block = block, next(blocks, None)
+            else:
+                interval, address = address, next(addresses, None)
+
+            if current is not None and interval[0] <= current[1] + 1:
+                current[1] = max(current[1], interval[1])
+            else:
+                if current is not None:
+                    yield tuple(current)
+                current = list(interval)
+        if current is not None:
+            yield tuple(current)
+
+    def free_intervals(self):
+        """
+        Yield the (first, last) integer intervals which are free in the subnet.
+        """
+        return interval_gaps(self.first, self.last, self._used_intervals())
+
+    def free_blocks(self, prefixlen=None):
+        """
+        Yield the free blocks of the subnet as ip_network objects. Without `prefixlen`, the free
+        space is split into the largest possible blocks; otherwise every free block of that length
+        is yielded, in order.
+        """
+        for first, last in self.free_intervals():
+            if prefixlen is None:
+                for network, length in interval_to_blocks(first, last, self.bits):
+                    yield self._network(network, length)
+            else:
+                size = 1 << (self.bits - prefixlen)
+                network = -(-first // size) * size  # round up to the block alignment
+                while network + size - 1 <= last:
+                    yield self._network(network, prefixlen)
+                    network += size
+
+    def next_free_block(self, prefixlen):
+        """
+        Return the first free block of length `prefixlen` in the subnet, or None.
+        """
+        return next(self.free_blocks(prefixlen), None)
+
+    def _network(self, network, prefixlen):
+        return self._network_class((network, prefixlen))
+
+    def as_dict(self):
+        return {
+            'size': self.size,
+            'allocated': self.allocated,
+            'reserved': self.reserved,
+            'addresses': self.addresses,
+            'used': self.used,
+            'free': self.free,
+            'percent_used': round(self.percent_used, 2),
+        }
@@ -1,3 +1,77 @@
-from django.shortcuts import render
+from itertools import islice
 
-# Create your views here.
+from rest_framework import exceptions
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import IPAddress, Subnet
+from .subnet_index import ANY_VRF
+
+# Maximum number of free blocks returned by SubnetUtilisationView
+MAX_FREE_BLOCKS = 1000
+
+
+class SubnetUtilisationView(GenericAPIView):
+    """
+    Utilisation of a subnet, along with its free blocks. The `prefixlen` query parameter restricts
+    the free blocks to those of the given length and `limit` caps how many of them are listed.
+    """
+    queryset = Subnet.objects
+    lookup_url_kwarg = 'pk'
+    permission_classes = (IsAuthenticated, )
+
+    def get(self, request, *args, **kwargs):
+        subnet = self.get_object()
+        prefixlen = self._int_param('prefixlen', None)
+        limit = min(self._int_param('limit', 100), MAX_FREE_BLOCKS)
+
+        if prefixlen is not None and not (
+                subnet.cidr.prefixlen <= prefixlen <= subnet.cidr.max_prefixlen):
+            raise exceptions.ValidationError({
+                'prefixlen': "Must be between {} and {}".format(subnet.cidr.prefixlen,
+                                                                subnet.cidr.max_prefixlen)
+            })
+
+        utilisation = subnet.utilisation()
+        data = utilisation.as_dict()
+        data['subnet'] = str(subnet.cidr)
+        data['free_blocks'] = [
+            str(block) for block in islice(utilisation.free_blocks(prefixlen), limit)
+        ]
+        return Response(data)
+
+    def _int_param(self, name, default):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            value = -1
+        if value < 0:
+            raise exceptions.ValidationError({name: "Must be a positive integer"})
+        return value
+
+
+class DuplicateIPAddressesView(APIView):
+    """
+    Report of the IP addresses found more than once in the same VRF or in the global table. The
+    `vrf` query parameter restricts it to a VRF, given by its id, or to the global table with
+    `vrf=global`.
+    """
+    permission_classes = (IsAuthenticated, )
+
+    def get(self, request, *args, **kwargs):
+        vrf = request.query_params.get('vrf')
+        if vrf is None:
+            vrf = ANY_VRF
+        elif vrf == 'global':
+            vrf = None
+        elif not vrf.isdigit():
+            raise exceptions.ValidationError({'vrf': "Must be a VRF id or 'global'"})
+        else:
+            vrf = int(vrf)
+
+        return Response(IPAddress.objects.duplicate_groups(vrf))
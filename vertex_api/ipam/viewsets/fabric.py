@@ -0,0 +1,13 @@
+from rest_framework import viewsets
+
+from ipam.models import Fabric
+from ipam.serializers import FabricSerializer
+from .mixins import KeysetReadOnlyMixin
+
+
+class FabricViewSet(KeysetReadOnlyMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint that allows fabrics to be viewed.
+    """
+    serializer_class = FabricSerializer
+    queryset = Fabric.objects.all()
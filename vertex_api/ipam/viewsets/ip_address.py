@@ -0,0 +1,16 @@
+from rest_framework import viewsets
+
+from ipam.models import IPAddress
+from ipam.serializers import IPAddressSerializer
+from .mixins import KeysetReadOnlyMixin
+
+
+class IPAddressViewSet(KeysetReadOnlyMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint that allows IP addresses to be viewed, in address order.
+    """
+    serializer_class = IPAddressSerializer
+    queryset = IPAddress.objects.select_related(
+        'subnet', 'interface', 'nat_inside'
+    )
+    keyset_ordering = ('version', 'address', 'id')
@@ -0,0 +1,14 @@
+from rest_framework import viewsets
+
+from ipam.models import IPRange
+from ipam.serializers import IPRangeSerializer
+from .mixins import KeysetReadOnlyMixin
+
+
+class IPRangeViewSet(KeysetReadOnlyMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint that allows IP ranges to be viewed, in address order.
+    """
+    serializer_class = IPRangeSerializer
+    queryset = IPRange.objects.select_related('subnet', 'role')
+    keyset_ordering = ('version', 'range_begin', 'id')
@@ -0,0 +1,34 @@
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import list_route
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
+
+from vertex.pagination import KeysetPagination, keyset_batches
+
+
+class KeysetReadOnlyMixin(object):
+    """
+    Read-only API endpoint paginated on `keyset_ordering`, whose whole content can be exported as
+    newline delimited JSON from its `export` route.
+    """
+    permission_classes = (IsAuthenticated, )
+    pagination_class = KeysetPagination
+    keyset_ordering = ('id', )
+    export_batch_size = 1000
+
+    @list_route(methods=['get'])
+    def export(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(self._export_lines(queryset),
+                                         content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="{}.ndjson"'.format(
+            queryset.model._meta.model_name
+        )
+        return response
+
+    def _export_lines(self, queryset):
+        for batch in keyset_batches(queryset, self.keyset_ordering, self.export_batch_size):
+            for item in self.get_serializer(batch, many=True).data:
+                yield json.dumps(item, cls=JSONEncoder) + '\n'
@@ -0,0 +1,16 @@
+from rest_framework import viewsets
+
+from ipam.models import Subnet
+from ipam.serializers import SubnetSerializer
+from .mixins import KeysetReadOnlyMixin
+
+
+class SubnetViewSet(KeysetReadOnlyMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint that allows subnets to be viewed, in CIDR order.
+    """
+    serializer_class = SubnetSerializer
+    queryset = Subnet.objects.select_related(
+        'supernet', 'vrf', 'space', 'vlan'
+    ).prefetch_related('role')
+    keyset_ordering = ('cidr', )
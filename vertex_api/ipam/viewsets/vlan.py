@@ -0,0 +1,13 @@
+from rest_framework import viewsets
+
+from ipam.models import VLAN
+from ipam.serializers import VLANSerializer
+from .mixins import KeysetReadOnlyMixin
+
+
+class VLANViewSet(KeysetReadOnlyMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint that allows VLANs to be viewed.
+    """
+    serializer_class = VLANSerializer
+    queryset = VLAN.objects.select_related('fabric', 'gateway').prefetch_related('role')
@@ -0,0 +1,13 @@
+from rest_framework import viewsets
+
+from ipam.models import VRF
+from ipam.serializers import VRFSerializer
+from .mixins import KeysetReadOnlyMixin
+
+
+class VRFViewSet(KeysetReadOnlyMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint that allows VRFs to be viewed.
+    """
+    serializer_class = VRFSerializer
+    queryset = VRF.objects.select_related('space')
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ServiceConfig(AppConfig):
+    name = 'service'
+
+    def ready(self):
+        import service.signals
+        import vertex.checks
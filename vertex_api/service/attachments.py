@@ -0,0 +1,205 @@
+# Attachments
+#
+# Attachment files are content-addressed: they are stored under the SHA-256 of their content, so
+# that a file attached many times (a logo in every signature, a document sent to several tickets)
+# is stored once. Files are read chunk by chunk twice, once to compute their SHA-256, size and
+# MIME type, and once more by the storage if their content isn't stored yet, so that they are
+# never held in memory as a whole. With the default FileSystemStorage, an upload large enough to
+# have been written to a temporary file is moved into place rather than copied.
+#
+# Downloads are handed over to the web server through ATTACHMENT_SENDFILE_HEADER when it's set
+# (X-Sendfile for Apache or uWSGI's offloading, X-Accel-Redirect for nginx), so that workers aren't
+# tied up sending large files. Otherwise they are streamed from the storage, honouring single byte
+# ranges so that interrupted downloads can be resumed.
+import hashlib
+import mimetypes
+import os
+import re
+from collections import namedtuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+
+from .models import Attachment
+
+CHUNK_SIZE = 64 * 1024
+ATTACHMENT_PATH = 'service/attachments/{}/{}/{}'
+
+# leading bytes of the file formats recognised when the declared MIME type is missing or generic
+SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'PK\x03\x04', 'application/zip'),
+)
+SIGNATURE_LENGTH = max(len(signature) for signature, mime_type in SIGNATURES)
+GENERIC_MIME_TYPES = frozenset(['', 'application/octet-stream', 'binary/octet-stream'])
+DEFAULT_MIME_TYPE = 'application/octet-stream'
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+StoredFile = namedtuple('StoredFile', ('name', 'sha256', 'size', 'mime_type'))
+
+
+def attachment_name(sha256):
+    return ATTACHMENT_PATH.format(sha256[:2], sha256[2:4], sha256)
+
+
+def guess_mime_type(head, filename, declared=None):
+    """
+    Return the MIME type of a file from its declared one, then its filename and finally its
+    leading bytes `head`.
+    """
+    declared = (declared or '').split(';')[0].strip().lower()
+    if declared not in GENERIC_MIME_TYPES:
+        return declared
+    guessed = mimetypes.guess_type(filename or '')[0]
+    if guessed:
+        return guessed
+    for signature, mime_type in SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return DEFAULT_MIME_TYPE
+
+
+def store(content, filename, content_type=None, storage=default_storage):
+    """
+    Store `content`, a File, unless the same content already is, and return its StoredFile.
+    """
+    digest, size, head = hashlib.sha256(), 0, b''
+    for chunk in content.chunks(CHUNK_SIZE):
+        if len(head) < SIGNATURE_LENGTH:
+            head += chunk[:SIGNATURE_LENGTH - len(head)]
+        digest.update(chunk)
+        size += len(chunk)
+    sha256 = digest.hexdigest()
+
+    name = Attachment.objects.filter(sha256=sha256).values_list('file', flat=True).first()
+    if name is None:
+        name = attachment_name(sha256)
+        if not storage.exists(name):
+            name = storage.save(name, content)
+    return StoredFile(name=name, sha256=sha256, size=size,
+                      mime_type=guess_mime_type(head, filename, content_type))
+
+
+def store_email_attachments(message, ticket_id, update_id=None):
+    """
+    Store the attachments of `message`, a django_mailbox Message, as attachments of the ticket
+    `ticket_id` (and of its update `update_id`). Attachments already stored for them are skipped,
+    so that processing a message twice stores its attachments once.
+    """
+    stored = set(Attachment.objects.filter(ticket_id=ticket_id, update_id=update_id).values_list(
+        'sha256', 'filename'
+    ))
+    attachments = list()
+    for message_attachment in message.attachments.all():
+        document = message_attachment.document
+        filename = message_attachment.get_filename() or os.path.basename(document.name)
+        stored_file = store(document, filename, message_attachment['Content-Type'])
+        if (stored_file.sha256, filename) in stored:
+            continue
+        stored.add((stored_file.sha256, filename))
+        attachments.append(Attachment(
+            ticket_id=ticket_id,
+            update_id=update_id,
+            file=stored_file.name,
+            sha256=stored_file.sha256,
+            filename=filename,
+            mime_type=stored_file.mime_type,
+            size=stored_file.size,
+        ))
+    return Attachment.objects.bulk_create(attachments)
+
+
+def delete_unused_file(attachment):
+    """
+    Delete the file of `attachment`, once the transaction commits, unless other attachments
+    share its content.
+    """
+    def committed():
+        if not Attachment.objects.filter(sha256=attachment.sha256).exists():
+            attachment.file.storage.delete(attachment.file.name)
+    transaction.on_commit(committed)
+
+
+def parse_range(header, size):
+    """
+    Return the first and last positions of the single byte range asked for by a Range `header`,
+    or None if it doesn't ask for one, raising ValueError if the range can't be satisfied.
+    """
+    match = RANGE_PATTERN.match(header or '')
+    if match is None or match.groups() == ('', ''):
+        return None  # also ignores multiple ranges, which RFC 7233 allows
+    first, last = match.groups()
+    if not first:  # the last `last` bytes
+        if not int(last) or not size:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    if last and int(last) < int(first):
+        return None
+    if int(first) >= size:
+        raise ValueError(header)
+    return int(first), min(int(last), size - 1) if last else size - 1
+
+
+def file_chunks(storage, name, first, last):
+    with storage.open(name, 'rb') as file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def download_response(request, attachment):
+    """
+    Return the response sending `attachment` to the client.
+    """
+    etag = '"{}"'.format(attachment.sha256)
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        return HttpResponseNotModified()
+
+    storage = attachment.file.storage
+    header = settings.ATTACHMENT_SENDFILE_HEADER
+    if header:
+        # the web server takes care of ranges
+        response = HttpResponse(content_type=attachment.mime_type)
+        if header.lower() == 'x-accel-redirect':
+            response[header] = settings.ATTACHMENT_SENDFILE_URL + attachment.file.name
+        else:
+            response[header] = storage.path(attachment.file.name)
+    else:
+        byte_range = None
+        if request.META.get('HTTP_IF_RANGE', etag) == etag:
+            try:
+                byte_range = parse_range(request.META.get('HTTP_RANGE'), attachment.size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = 'bytes */{}'.format(attachment.size)
+                return response
+
+        first, last = byte_range or (0, attachment.size - 1)
+        response = StreamingHttpResponse(
+            file_chunks(storage, attachment.file.name, first, last),
+            status=206 if byte_range else 200,
+            content_type=attachment.mime_type,
+        )
+        response['Content-Length'] = str(last - first + 1)
+        response['Accept-Ranges'] = 'bytes'
+        if byte_range:
+            response['Content-Range'] = 'bytes {}-{}/{}'.format(first, last, attachment.size)
+
+    response['ETag'] = etag
+    response['Content-Disposition'] = "attachment; filename*=UTF-8''{}".format(
+        quote(attachment.filename)
+    )
+    return response
@@ -0,0 +1,132 @@
+# Email blacklist
+#
+# A BlacklistedEmail pattern is either a full address, "user@*", "*@domain" or "*@*". Rather than
+# testing every pattern against every incoming address, the patterns applying to each team are
+# compiled into a BlacklistMatcher holding one hash table per kind of pattern, so that checking an
+# address costs three lookups whatever the number of patterns. Patterns applying to every team
+# are part of every matcher.
+#
+# The matchers of all teams are built with a single query the first time they are needed, and
+# kept per process, keyed by the mailbox of their team since that's what incoming messages carry.
+# They are rebuilt once BlacklistedEmail changes, see service.signals, the other processes
+# learning about the change through a generation counter kept in the Django cache, shared between
+# processes (see vertex.checks).
+import threading
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_CACHE_KEY = 'service_blacklist_generation'
+WILDCARD = '*'
+
+
+def _split(address):
+    local_part, _, domain = address.strip().lower().rpartition('@')
+    return local_part, domain
+
+
+class BlacklistMatcher(object):
+    """
+    The compiled blacklist of a team. match() returns None for addresses which aren't
+    blacklisted, otherwise whether messages from the address are to be kept in the mailbox.
+    """
+    __slots__ = ('addresses', 'local_parts', 'domains', 'everything')
+
+    def __init__(self):
+        self.addresses = dict()
+        self.local_parts = dict()
+        self.domains = dict()
+        self.everything = None
+
+    def add(self, pattern, keep):
+        local_part, domain = _split(pattern)
+        if local_part == WILDCARD and domain == WILDCARD:
+            self.everything = bool(self.everything) or keep
+        elif local_part == WILDCARD:
+            self.domains[domain] = self.domains.get(domain, False) or keep
+        elif domain == WILDCARD:
+            self.local_parts[local_part] = self.local_parts.get(local_part, False) or keep
+        else:
+            address = '{}@{}'.format(local_part, domain)
+            self.addresses[address] = self.addresses.get(address, False) or keep
+
+    def copy(self):
+        matcher = BlacklistMatcher()
+        matcher.addresses = dict(self.addresses)
+        matcher.local_parts = dict(self.local_parts)
+        matcher.domains = dict(self.domains)
+        matcher.everything = self.everything
+        return matcher
+
+    def match(self, address):
+        local_part, domain = _split(address)
+        matches = (
+            self.everything,
+            self.addresses.get('{}@{}'.format(local_part, domain)),
+            self.local_parts.get(local_part),
+            self.domains.get(domain),
+        )
+        if all(keep is None for keep in matches):
+            return None
+        # a pattern asking to keep the messages wins over those asking to delete them
+        return any(matches)
+
+
+class Blacklist(object):
+    """
+    The per-process BlacklistMatchers of every team.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matchers = None
+        self._default = None
+        self._generation = None
+
+    def _load(self):
+        BlacklistedEmail = apps.get_model('service', 'BlacklistedEmail')
+
+        generation = cache.get(GENERATION_CACHE_KEY)
+        patterns = BlacklistedEmail.objects.values_list('email_address', 'keep', 'teams__mailbox')
+        default, team_patterns = BlacklistMatcher(), dict()
+        for pattern, keep, mailbox_id in patterns:
+            if mailbox_id is None:
+                default.add(pattern, keep)
+            else:
+                team_patterns.setdefault(mailbox_id, list()).append((pattern, keep))
+
+        matchers = dict()
+        for mailbox_id, patterns in team_patterns.items():
+            matcher = matchers[mailbox_id] = default.copy()
+            for pattern, keep in patterns:
+                matcher.add(pattern, keep)
+
+        self._matchers, self._default, self._generation = matchers, default, generation
+
+    def matcher(self, mailbox_id):
+        with self._lock:
+            if self._matchers is None or cache.get(GENERATION_CACHE_KEY) != self._generation:
+                self._load()
+            return self._matchers.get(mailbox_id, self._default)
+
+    def match(self, message):
+        """
+        Return None if the sender of `message`, a django_mailbox Message, isn't blacklisted for
+        its mailbox, otherwise whether the message is to be kept.
+        """
+        if not message.from_address:
+            return None
+        return self.matcher(message.mailbox_id).match(message.from_address[0])
+
+    def changed(self):
+        with self._lock:
+            self._matchers = None
+
+        def committed():
+            cache.add(GENERATION_CACHE_KEY, 0, timeout=None)
+            cache.incr(GENERATION_CACHE_KEY)
+        transaction.on_commit(committed)
+
+
+blacklist = Blacklist()
@@ -0,0 +1,189 @@
+# Bulk ticket operations
+#
+# Triage often means assigning, retagging, re-prioritising or closing hundreds of tickets at once.
+# A bulk operation locks the tickets visible to the person, checks their change permission and,
+# when closing, the status transition for all of them in memory, then applies the change to the
+# tickets it's valid for with set-based queries whatever their number: one UPDATE (for tags, one
+# DELETE and one INSERT of links), and one bulk INSERT each of the updates and TicketChanges
+# recording it, all in a single transaction. The outcome of the operation is reported for each
+# ticket.
+from collections import OrderedDict, namedtuple
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django_fsm import can_proceed
+
+from contacts.models import Person
+from .models import Ticket, TicketChange, Update
+from .notifications import queue_notifications
+from .rules.memberships import has_perm_many
+from .saved_searches import shared_search_counts
+from .search import update_search_vectors
+
+ASSIGN = 'assign'
+RETAG = 'retag'
+PRIORITY = 'priority'
+CLOSE = 'close'
+
+# the argument of each operation
+OPERATIONS = OrderedDict([
+    (ASSIGN, 'assigned_to'),
+    (RETAG, 'tags'),
+    (PRIORITY, 'priority'),
+    (CLOSE, None),
+])
+
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+FORBIDDEN = 'forbidden'
+INVALID_TRANSITION = 'invalid_transition'
+
+BulkOutcome = namedtuple('BulkOutcome', ('ticket', 'outcome', 'update'))
+
+
+def _audit_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return ','.join(str(item) for item in value)
+    return str(value)
+
+
+def _tags_field():
+    field = Ticket._meta.get_field('tags')
+    return (field.remote_field.through, field.m2m_field_name() + '_id',
+            field.m2m_reverse_field_name() + '_id')
+
+
+def ticket_tags(ticket_ids):
+    """
+    Return a dict mapping each of `ticket_ids` to the set of the pks of its tags.
+    """
+    through, ticket_column, tag_column = _tags_field()
+    tags = dict((pk, set()) for pk in ticket_ids)
+    links = through.objects.filter(**{ticket_column + '__in': ticket_ids}).values_list(
+        ticket_column, tag_column
+    )
+    for ticket_id, tag_id in links:
+        tags[ticket_id].add(tag_id)
+    return tags
+
+
+def set_tags(ticket_ids, tag_ids, current):
+    """
+    Replace the tags of `ticket_ids` by `tag_ids`, `current` being what ticket_tags() returned.
+    """
+    through, ticket_column, tag_column = _tags_field()
+    through.objects.filter(**{ticket_column + '__in': ticket_ids}).exclude(
+        **{tag_column + '__in': tag_ids}
+    ).delete()
+    through.objects.bulk_create([
+        through(**{ticket_column: ticket_id, tag_column: tag_id})
+        for ticket_id in ticket_ids for tag_id in tag_ids if tag_id not in current[ticket_id]
+    ])
+
+
+def ticket_change(ticket, operation, value, tags):
+    """
+    Return the (field, old value, new value) of `operation` on `ticket`, or None if the operation
+    isn't allowed by the status of the ticket.
+    """
+    if operation == ASSIGN:
+        return 'assigned_to', ticket.assigned_to_id, getattr(value, 'pk', None)
+    if operation == PRIORITY:
+        return 'priority', ticket.priority, value
+    if operation == RETAG:
+        return 'tags', sorted(tags[ticket.pk]), sorted(tag.pk for tag in value)
+    if not can_proceed(ticket.close_by_signaler):
+        return None
+    return 'status', ticket.status, Ticket.CLOSED_STATUS
+
+
+def audited_people(changes):
+    """
+    Return the people of the (field, old pk, new pk) `changes` of assignments by pk, loaded with a
+    single query, so that they are recorded by name like the changes made one ticket at a time.
+    """
+    pks = set()
+    for field, old_value, new_value in changes:
+        pks.update((old_value, new_value))
+    pks.discard(None)
+    return Person.objects.in_bulk(list(pks))
+
+
+def bulk_update_tickets(person, ticket_ids, operation, value=None, comment=''):
+    """
+    Apply `operation`, one of OPERATIONS, to the tickets `ticket_ids` on behalf of `person`, and
+    return the BulkOutcome of each ticket.
+    """
+    ticket_ids = list(OrderedDict.fromkeys(ticket_ids))
+    now = timezone.now()
+    with transaction.atomic():
+        tickets = Ticket.objects.visible_to(person).select_for_update().filter(
+            pk__in=ticket_ids
+        ).order_by('pk').in_bulk()
+        allowed = has_perm_many(person, tickets.values(), 'service.change_ticket')
+        tags = ticket_tags(list(tickets)) if operation == RETAG else None
+
+        outcomes, changes = OrderedDict(), OrderedDict()
+        for pk in ticket_ids:
+            ticket = tickets.get(pk)
+            if ticket is None:
+                outcomes[pk] = NOT_FOUND
+            elif not allowed[pk]:
+                outcomes[pk] = FORBIDDEN
+            else:
+                change = ticket_change(ticket, operation, value, tags)
+                if change is None:
+                    outcomes[pk] = INVALID_TRANSITION
+                elif change[1] == change[2]:
+                    outcomes[pk] = UNCHANGED
+                else:
+                    outcomes[pk] = CHANGED
+                    changes[pk] = change
+
+        updates = dict()
+        if changes:
+            changed_ids = list(changes)
+            before = shared_search_counts.matches(changed_ids)
+            if operation == RETAG:
+                set_tags(changed_ids, [tag.pk for tag in value], tags)
+                Ticket.objects.filter(pk__in=changed_ids).update(
+                    modified_at=now, version=F('version') + 1
+                )
+            else:
+                field, old_value, new_value = next(iter(changes.values()))
+                Ticket.objects.filter(pk__in=changed_ids).update(**{
+                    Ticket._meta.get_field(field).attname: new_value,
+                    'modified_at': now,
+                    'version': F('version') + 1,
+                })
+
+            created = Update.objects.bulk_create([
+                Update(ticket_id=pk, person=person, body=comment, display_time=now)
+                for pk in changed_ids
+            ])
+            audited = changes.values()
+            if operation == ASSIGN:
+                people = audited_people(audited)
+                audited = [(field, people.get(old_value), people.get(new_value))
+                           for field, old_value, new_value in audited]
+            TicketChange.objects.bulk_create([
+                TicketChange(update=update, field=field, old_value=_audit_value(old_value),
+                             new_value=_audit_value(new_value))
+                for update, (field, old_value, new_value) in zip(created, audited)
+            ])
+            updates = dict((update.ticket_id, update) for update in created)
+
+            # bulk_create() and update() don't send the signals of service.signals
+            if comment:
+                update_search_vectors(changed_ids)
+            shared_search_counts.update(changed_ids, before)
+            queue_notifications(created)
+
+    return [
+        BulkOutcome(ticket=pk, outcome=outcome, update=getattr(updates.get(pk), 'pk', None))
+        for pk, outcome in outcomes.items()
+    ]
@@ -0,0 +1,162 @@
+# Ticket escalation
+#
+# The open tickets of a team whose escalate_after is set get their priority raised by one level
+# once escalate_after minutes went by since they were created or last escalated, not counting the
+# dates on which escalation is excluded for the team, and no escalation happens at all on those
+# dates. The candidates of each team are selected with a single query; the tickets are then
+# escalated by batches, each batch costing one UPDATE and two bulk INSERTs (the updates recording
+# the escalation and their priority TicketChanges) whatever its size.
+import datetime
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import EscalationExclusion, Team, Ticket, TicketChange, Update
+from .saved_searches import shared_search_counts
+
+ESCALATED_STATUSES = (
+    Ticket.NEW_STATUS,
+    Ticket.IN_PROGRESS_STATUS,
+    Ticket.REOPENED_STATUS,
+)
+HIGHEST_PRIORITY = 1
+
+
+class ExclusionCalendar(object):
+    """
+    The dates on which escalation is excluded for each team, from `since` on, loaded with a
+    single query.
+    """
+
+    def __init__(self, since):
+        self.global_dates = set()
+        self.team_dates = dict()
+        exclusions = EscalationExclusion.objects.filter(date__gte=since).values_list(
+            'date', 'teams'
+        )
+        for date, team_id in exclusions:
+            if team_id is None:
+                self.global_dates.add(date)
+            else:
+                self.team_dates.setdefault(team_id, set()).add(date)
+
+    def excluded_dates(self, team_id):
+        return self.global_dates | self.team_dates.get(team_id, set())
+
+
+def escalation_cutoff(now, minutes, excluded_dates):
+    """
+    Return the instant `minutes` minutes before `now`, not counting the time spent on the
+    excluded dates.
+    """
+    remaining = datetime.timedelta(minutes=minutes)
+    end = now
+    date = timezone.localtime(now).date()
+    while True:
+        start = timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+        if date not in excluded_dates:
+            if end - start >= remaining:
+                return end - remaining
+            remaining -= end - start
+        end = start
+        date -= datetime.timedelta(days=1)
+
+
+def due_at(cutoff):
+    """
+    The tickets last escalated, or created if never escalated, no later than `cutoff`.
+    """
+    return Q(last_escalation__lte=cutoff) | Q(last_escalation__isnull=True, created_at__lte=cutoff)
+
+
+def team_candidates(team, cutoff):
+    """
+    Return the pks of the tickets of `team` due for escalation at `cutoff`.
+    """
+    return Ticket.objects.filter(
+        teams=team,
+        status__in=ESCALATED_STATUSES,
+        priority__gt=HIGHEST_PRIORITY,
+    ).filter(due_at(cutoff)).values_list('pk', flat=True)
+
+
+def escalate_tickets(now=None, batch_size=1000):
+    """
+    Escalate every ticket due for escalation, and return how many were.
+    """
+    now = now or timezone.now()
+    today = timezone.localtime(now).date()
+    teams = list(Team.objects.filter(escalate_after__gt=0))
+    if not teams:
+        return 0
+
+    # the exclusions older than the longest escalation delay can only matter when most of the
+    # days in between are excluded as well, which the extra year of history covers
+    longest = max(team.escalate_after for team in teams)
+    calendar = ExclusionCalendar(today - datetime.timedelta(minutes=longest, days=366))
+
+    # the latest cutoff of the teams of each candidate
+    candidates = OrderedDict()
+    for team in teams:
+        excluded_dates = calendar.excluded_dates(team.pk)
+        if today in excluded_dates:
+            continue
+        cutoff = escalation_cutoff(now, team.escalate_after, excluded_dates)
+        for pk in team_candidates(team, cutoff):
+            candidates[pk] = max(cutoff, candidates.get(pk, cutoff))
+
+    pks = list(candidates)
+    escalated = 0
+    for start in range(0, len(pks), batch_size):
+        escalated += escalate_batch(
+            OrderedDict((pk, candidates[pk]) for pk in pks[start:start + batch_size]), now
+        )
+
+    if escalated:
+        # the counts of shared searches on priority are out of date
+        shared_search_counts.invalidate()
+    return escalated
+
+
+def escalate_batch(cutoffs, now):
+    """
+    Raise the priority of the tickets still due for escalation among `cutoffs`, a dict mapping
+    ticket pks to their cutoff, by one level, recording the change.
+    """
+    if not cutoffs:
+        return 0
+
+    # the cutoff is checked again once the tickets are locked, so that runs overlapping with this
+    # one (a slow run or a redelivered task) don't escalate the same tickets twice
+    pks_by_cutoff = OrderedDict()
+    for pk, cutoff in cutoffs.items():
+        pks_by_cutoff.setdefault(cutoff, list()).append(pk)
+    due = Q()
+    for cutoff, pks in pks_by_cutoff.items():
+        due |= Q(pk__in=pks) & due_at(cutoff)
+
+    with transaction.atomic():
+        tickets = list(Ticket.objects.select_for_update().filter(
+            due,
+            status__in=ESCALATED_STATUSES,
+            priority__gt=HIGHEST_PRIORITY,
+        ).order_by('pk').values_list('pk', 'priority'))
+        if not tickets:
+            return 0
+
+        Ticket.objects.filter(pk__in=[pk for pk, priority in tickets]).update(
+            priority=F('priority') - 1,
+            last_escalation=now,
+            version=F('version') + 1,
+        )
+        updates = Update.objects.bulk_create([
+            Update(ticket_id=pk, display_time=now) for pk, priority in tickets
+        ])
+        TicketChange.objects.bulk_create([
+            TicketChange(update=update, field='priority', old_value=str(priority),
+                         new_value=str(priority - 1))
+            for update, (pk, priority) in zip(updates, tickets)
+        ])
+    return len(tickets)
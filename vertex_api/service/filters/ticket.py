@@ -1,8 +1,14 @@
+import django_filters
+
 from vertex.filters import IdListFilterSet
 from ..models import Ticket
 
 
 class TicketFilterSet(IdListFilterSet):
+    search = django_filters.CharFilter(method='filter_search')
+
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value).highlight(value)
 
     class Meta:
         model = Ticket
@@ -0,0 +1,128 @@
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import reverse
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_json_api.utils import format_relation_name
+
+from contacts.models import Organization, Person
+from service.models import Ticket, TicketChange
+from service.serializers import TicketSerializer, UpdateSerializer
+
+CONTENT_TYPE = 'application/vnd.api+json'
+
+
+def baseline_apply_ticket_changes(serializer, ticket, changed_fields, update):
+    # UpdateSerializer._apply_ticket_changes before the write path was optimised: one INSERT per
+    # changed field and a save of every column
+    for field, new_value in changed_fields.items():
+        TicketChange.objects.create(
+            field=field,
+            update=update,
+            old_value=getattr(ticket, field),
+            new_value=new_value
+        )
+        setattr(ticket, field, new_value)
+    ticket.save()
+
+
+@contextmanager
+def baseline():
+    """
+    Have PATCH requests take the write path as it was before it was optimised, the ticket being
+    fetched again once saved.
+    """
+    update = TicketSerializer.update
+
+    def baseline_update(serializer, instance, validated_data):
+        instance = update(serializer, instance, validated_data)
+        return Ticket.objects.get(pk=instance.pk)
+
+    with mock.patch.object(UpdateSerializer, '_apply_ticket_changes',
+                           baseline_apply_ticket_changes), \
+            mock.patch.object(TicketSerializer, 'update', baseline_update):
+        yield
+
+
+class Command(BaseCommand):
+    help = ("Measure the latency and number of queries of PATCH requests changing a ticket, "
+            "optionally against the write path as it was before it was optimised. The ticket and "
+            "its updates are created in a transaction which is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help="Number of PATCH requests to measure (default: 200)")
+        parser.add_argument('--warmup', type=int, default=20,
+                            help="Number of PATCH requests issued first and not measured "
+                                 "(default: 20)")
+        parser.add_argument('--host', default='testserver',
+                            help="Host the requests are sent to, which must be in ALLOWED_HOSTS")
+        parser.add_argument('--compare', action='store_true',
+                            help="Measure the previous write path first, then the current one")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError("--requests must be at least 1")
+        if options['warmup'] < 0:
+            raise CommandError("--warmup can't be negative")
+
+        if options['compare']:
+            with baseline():
+                self.measure('before', options)
+            self.measure('after', options)
+        else:
+            self.measure('current', options)
+
+    def measure(self, label, options):
+        with transaction.atomic():
+            durations, queries = self.benchmark(options['requests'], options['warmup'],
+                                                options['host'])
+            transaction.set_rollback(True)
+
+        self.stdout.write("{}: {} requests, {:.2f} queries per request".format(
+            label, len(durations), statistics.mean(queries)
+        ))
+        self.stdout.write("{}: latency mean {:.2f}ms, median {:.2f}ms, max {:.2f}ms".format(
+            label, statistics.mean(durations) * 1000, statistics.median(durations) * 1000,
+            max(durations) * 1000
+        ))
+
+    def benchmark(self, requests, warmup, host):
+        person = Person.objects.create(first_name='Benchmark', last_name='Person')
+        user = person.create_login(username='benchmark_ticket_patch')
+        user.is_superuser = True
+        user.save()
+        user.is_verified = True
+        ticket = Ticket.objects.create(title='Benchmark ticket', priority=5,
+                                       organization=Organization.objects.create(name='Benchmark'),
+                                       signaled_by=person, created_by=person)
+
+        client = APIClient(SERVER_NAME=host, HTTP_ACCEPT=CONTENT_TYPE)
+        client.force_authenticate(user)
+        url = reverse('ticket-detail', args=[ticket.pk])
+
+        durations, queries = list(), list()
+        for i in range(warmup + requests):
+            data = json.dumps({'data': {
+                'type': format_relation_name('Ticket'),
+                'id': ticket.pk,
+                # every request changes several fields
+                'attributes': {'priority': i % 5 + 1, 'title': 'Benchmark ticket {}'.format(i),
+                               'resolution': 'Resolution {}'.format(i)},
+            }})
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.patch(url, data, content_type=CONTENT_TYPE)
+                duration = time.perf_counter() - started
+            if response.status_code != 200:
+                raise CommandError(response.content.decode())
+            if i >= warmup:
+                durations.append(duration)
+                queries.append(len(captured))
+        return durations, queries
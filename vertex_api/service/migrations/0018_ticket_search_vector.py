@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# service.search.update_search_vectors() as of this migration, with the configurations of the
+# languages of the time
+INDEX_TICKETS_SQL = """
+    UPDATE service_ticket AS ticket SET search_vector =
+        setweight(to_tsvector('english', coalesce(ticket.title, '')), 'A') ||
+        setweight(to_tsvector('french', coalesce(ticket.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(ticket.description, '') || ' ' ||
+                                         coalesce(ticket.resolution, '')), 'B') ||
+        setweight(to_tsvector('french', coalesce(ticket.description, '') || ' ' ||
+                                        coalesce(ticket.resolution, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(text.updates, '')), 'C') ||
+        setweight(to_tsvector('french', coalesce(text.updates, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(text.notes, '')), 'C') ||
+        setweight(to_tsvector('french', coalesce(text.notes, '')), 'C')
+    FROM (
+        SELECT t.id,
+            (SELECT string_agg(u.body, ' ') FROM service_update u WHERE u.ticket_id = t.id)
+                AS updates,
+            (SELECT string_agg(n.body, ' ') FROM service_note n
+                JOIN service_update u ON n.update_id = u.id WHERE u.ticket_id = t.id) AS notes
+        FROM service_ticket t
+    ) AS text
+    WHERE ticket.id = text.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0017_email_template_remove_hvad_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(INDEX_TICKETS_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'],
+                                                           name='service_ticket_search_idx'),
+        ),
+    ]
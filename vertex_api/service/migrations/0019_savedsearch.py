@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.jsonb
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('service', '0018_ticket_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, blank=True, null=True, verbose_name='modified at')),
+                ('title', models.CharField(help_text='User-provided name for this query', max_length=100, verbose_name='Query Name')),
+                ('title_en', models.CharField(help_text='User-provided name for this query', max_length=100, null=True, verbose_name='Query Name')),
+                ('title_fr', models.CharField(help_text='User-provided name for this query', max_length=100, null=True, verbose_name='Query Name')),
+                ('shared', models.BooleanField(default=False, help_text='Should other users see this query?', verbose_name='Shared With Other Users?')),
+                ('filters', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, help_text='Filter specification, see service.saved_searches.', verbose_name='Filters')),
+                ('version', models.PositiveIntegerField(default=1, editable=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Saved search',
+                'verbose_name_plural': 'Saved searches',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0019_savedsearch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EscalationExclusion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, blank=True, null=True, verbose_name='modified at')),
+                ('name', models.CharField(max_length=100, verbose_name='Name')),
+                ('name_en', models.CharField(max_length=100, null=True, verbose_name='Name')),
+                ('name_fr', models.CharField(max_length=100, null=True, verbose_name='Name')),
+                ('date', models.DateField(db_index=True, help_text='Date on which escalation should not happen', verbose_name='Date')),
+                ('teams', models.ManyToManyField(blank=True, help_text='Leave blank for this exclusion to be applied to all departments, or select those departments you wish to exclude with this entry.', related_name='escalation_exclusions', to='service.Team')),
+            ],
+            options={
+                'verbose_name': 'Escalation exclusion',
+                'verbose_name_plural': 'Escalation exclusions',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'last_escalation'], name='service_ticket_escalation_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0020_escalationexclusion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='message_id',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0021_ticket_message_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlacklistedEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, blank=True, null=True, verbose_name='modified at')),
+                ('email_address', models.CharField(help_text='Enter a full e-mail address, or portions with wildcards, eg *@domain.com or postmaster@*.', max_length=150, verbose_name='E-Mail Address')),
+                ('keep', models.BooleanField(default=False, help_text='Do you want to keep emails from this address in the mailbox? If this is not checked, emails from this address will be deleted.', verbose_name='Keep Emails from blacklisted address?')),
+                ('teams', models.ManyToManyField(blank=True, help_text='Leave blank for this e-mail to be ignored on all departments, or select those departments you wish to ignore this e-mail for.', related_name='blacklisted_emails', to='service.Team')),
+            ],
+            options={
+                'verbose_name': 'Blacklisted e-mail address',
+                'verbose_name_plural': 'Blacklisted e-mail addresses',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0022_blacklistedemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Attachment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, blank=True, null=True, verbose_name='modified at')),
+                ('file', models.FileField(editable=False, max_length=1000, upload_to='', verbose_name='File')),
+                ('sha256', models.CharField(db_index=True, editable=False, max_length=64, verbose_name='SHA-256')),
+                ('filename', models.CharField(max_length=1000, verbose_name='Filename')),
+                ('mime_type', models.CharField(max_length=255, verbose_name='MIME Type')),
+                ('size', models.BigIntegerField(help_text='Size of this file in bytes', verbose_name='Size')),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='service.Ticket', verbose_name='Ticket')),
+                ('update', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='service.Update', verbose_name='Update')),
+            ],
+            options={
+                'verbose_name': 'Attachment',
+                'verbose_name_plural': 'Attachments',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
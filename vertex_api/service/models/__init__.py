@@ -8,3 +8,7 @@ from .ticket_change import TicketChange
 from .ticket_subscriber import TicketSubscriber
 from .ticket_communication import TicketCommunication
 from .email_template import EmailTemplate
+from .saved_search import SavedSearch
+from .escalation_exclusion import EscalationExclusion
+from .blacklisted_email import BlacklistedEmail
+from .attachment import Attachment
@@ -0,0 +1,71 @@
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+from vertex import rules
+from vertex.models import AbstractDatedModel
+from vertex.rules.predicates import has_django_permission, is_staff, is_superuser
+
+
+class Attachment(AbstractDatedModel, models.Model):
+    """
+    Represents a file attached to a ticket, or to one of its updates. This could come from an
+    e-mail attachment, or it could be uploaded via the API.
+    Files are stored once per content, under their SHA-256, see service.attachments.
+    """
+
+    ticket = models.ForeignKey(
+        'service.Ticket',
+        verbose_name=_('Ticket'),
+        related_name='attachments',
+    )
+
+    update = models.ForeignKey(
+        'service.Update',
+        verbose_name=_('Update'),
+        related_name='attachments',
+        blank=True,
+        null=True,
+    )
+
+    file = models.FileField(
+        _('File'),
+        max_length=1000,
+        editable=False,
+    )
+
+    sha256 = models.CharField(
+        _('SHA-256'),
+        max_length=64,
+        db_index=True,
+        editable=False,
+    )
+
+    filename = models.CharField(
+        _('Filename'),
+        max_length=1000,
+    )
+
+    mime_type = models.CharField(
+        _('MIME Type'),
+        max_length=255,
+    )
+
+    size = models.BigIntegerField(
+        _('Size'),
+        help_text=_('Size of this file in bytes'),
+    )
+
+    def __str__(self):
+        return u'%s' % self.filename
+
+    class Meta:
+        ordering = ['created_at', ]
+        verbose_name = _('Attachment')
+        verbose_name_plural = _('Attachments')
+        app_label = 'service'
+
+
+rules.add_perm('service.view_attachment', is_superuser | is_staff)
+rules.add_perm('service.add_attachment', is_superuser | is_staff & has_django_permission('service.add_attachment'))
+rules.add_perm('service.change_attachment', is_superuser | is_staff & has_django_permission('service.change_attachment'))
+rules.add_perm('service.delete_attachment', is_superuser | is_staff & has_django_permission('service.delete_attachment'))
@@ -13,9 +13,10 @@ class BlacklistedEmail(AbstractDatedModel, models.Model):
     processing IMAP and POP3 mailboxes, eg mails from postmaster or from
     known trouble-makers.
     """
-    department = models.ManyToManyField(
-        'service.Department',
+    teams = models.ManyToManyField(
+        'service.Team',
         blank=True,
+        related_name='blacklisted_emails',
         help_text=_('Leave blank for this e-mail to be ignored on all '
                     'departments, or select those departments you wish to ignore this e-mail '
                     'for.'),
@@ -38,7 +39,7 @@ class BlacklistedEmail(AbstractDatedModel, models.Model):
     )
 
     def __str__(self):
-        return u'%s' % self.name
+        return u'%s' % self.email_address
 
     def test(self, email):
         """
@@ -50,19 +51,13 @@ class BlacklistedEmail(AbstractDatedModel, models.Model):
             5. Other (no match)
             1-4 return True, 5 returns False.
         """
+        from ..blacklist import BlacklistMatcher
 
-        own_parts = self.email_address.split("@")
-        email_parts = email.split("@")
-
-        if self.email_address == email \
-                or own_parts[0] == "*" and own_parts[1] == email_parts[1] \
-                or own_parts[1] == "*" and own_parts[0] == email_parts[0] \
-                or own_parts[0] == "*" and own_parts[1] == "*":
-            return True
-        else:
-            return False
+        matcher = BlacklistMatcher()
+        matcher.add(self.email_address, self.keep)
+        return matcher.match(email) is not None
 
     class Meta:
         verbose_name = _('Blacklisted e-mail address')
         verbose_name_plural = _('Blacklisted e-mail addresses')
-        app_label = 'service'
\ No newline at end of file
+        app_label = 'service'
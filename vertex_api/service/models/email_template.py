@@ -1,4 +1,7 @@
 import email
+from collections import namedtuple
+from functools import lru_cache
+
 from django.core.mail import EmailMultiAlternatives
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
@@ -9,6 +12,7 @@ import markdown
 import bleach
 
 from vertex.models import AbstractDatedModel
+from vertex.utils.lru import LRUCache
 
 BASE_TEMPLATE_PREFIX = 'email_templates/base_service_email'
 
@@ -18,6 +22,17 @@ MISSING_TRANSLATION_MESSAGE = ("Can't render a bilingual version of "
 
 __author__ = 'Jonathan Senecal <jonathan@zap.coop>'
 
+COMPILED_TEMPLATES_CACHE_SIZE = 256
+
+# The parts of an EmailTemplate in one language which don't depend on the context: the sanitised
+# HTML of its markdown, and the parsed Templates of that HTML and of its plain text.
+CompiledEmailTemplate = namedtuple('CompiledEmailTemplate', ('html', 'html_template',
+                                                             'plain_template'))
+
+# Keyed by (slug, language, modified_at), so that a template is parsed once per version and
+# language in each process, and the other processes pick up changes as soon as they reload it.
+compiled_templates = LRUCache(COMPILED_TEMPLATES_CACHE_SIZE)
+
 
 class EmailTemplate(AbstractDatedModel):
     """
@@ -62,15 +77,34 @@ class EmailTemplate(AbstractDatedModel):
                         'above. The markdown will be rendered as HTML in the e-mail'),
     )
 
+    def compiled(self, language=None):
+        """
+        Return the CompiledEmailTemplate of this template in `language`, the active one by
+        default, compiling it only the first time for each version of the template.
+        """
+        language = language or get_language()
+        if self.modified_at is None:  # not saved yet
+            return self._compile(language)
+        return compiled_templates.get_or_set((self.slug, language, self.modified_at),
+                                             lambda: self._compile(language))
+
+    def _compile(self, language):
+        with override(language):
+            html = sanitize_and_render_markdown(self.markdown)
+            return CompiledEmailTemplate(
+                html=html,
+                html_template=Template(html),
+                plain_template=Template(self.get_plaintext()),
+            )
+
     def render_html(self, context):
         if not get_language():  # no language set
             return self.render_html_bilingual(context)
         else:
-            inner_template = markdown.markdown(bleach.clean(self.markdown))
-            outer_template = loader.get_template('email_templates/base_service_email.md')
+            outer_template = base_template('email_templates/base_service_email.md')
             outer_context = Context({
-                'inner_template': Template(inner_template).render(context),
-                'language_code': self.language_code
+                'inner_template': self.compiled().html_template.render(context),
+                'language_code': get_language()
             })
 
         return outer_template.render(outer_context)
@@ -79,12 +113,12 @@ class EmailTemplate(AbstractDatedModel):
         if not get_language():  # no language set
             return self.render_plain_bilingual(context)
         else:
-            inner_template = Template(self.get_plaintext()).render(context)
+            inner_template = self.compiled().plain_template.render(context)
 
-            outer_template = loader.get_template('email_templates/base_service_email.txt')
+            outer_template = base_template('email_templates/base_service_email.txt')
             outer_context = Context({
                 'inner_template': inner_template,
-                'language_code': self.language_code
+                'language_code': get_language()
             })
 
         return outer_template.render(outer_context)
@@ -92,29 +126,29 @@ class EmailTemplate(AbstractDatedModel):
     def render_plain_bilingual(self, context):
 
         with override('fr'):
-            inner_template_fr = Template(self.get_plaintext()).render(context)
+            inner_template_fr = self.compiled('fr').plain_template.render(context)
 
         with override('en'):
-            inner_template_en = Template(self.get_plaintext()).render(context)
+            inner_template_en = self.compiled('en').plain_template.render(context)
 
         outer_context = Context({
             'inner_template_fr': inner_template_fr,
             'inner_template_en': inner_template_en
         })
-        outer_template = loader.get_template('email_templates/base_service_email_bilingue.txt')
+        outer_template = base_template('email_templates/base_service_email_bilingue.txt')
         return outer_template.render(outer_context)
 
     def render_html_bilingual(self, context):
 
-        inner_template_fr = sanitize_and_render_markdown(self.markdown_fr)
-        inner_template_en = sanitize_and_render_markdown(self.markdown_en)
+        inner_template_fr = self.compiled('fr').html
+        inner_template_en = self.compiled('en').html
 
         outer_context = Context({
             'inner_template_fr': inner_template_fr,
             'inner_template_en': inner_template_en
         })
 
-        outer_template = loader.get_template('email_templates/base_service_email_bilingue.md')
+        outer_template = base_template('email_templates/base_service_email_bilingue.md')
         return outer_template.render(outer_context)
 
     @property
@@ -207,3 +241,15 @@ def build_subject(subject, context):
 
 def sanitize_and_render_markdown(source):
     return markdown.markdown(bleach.clean(source))
+
+
+@lru_cache(maxsize=None)
+def base_template(template_name):
+    return loader.get_template(template_name)
+
+
+def discard_compiled_templates(slug):
+    """
+    Drop the compiled versions of the template `slug` from the cache of this process.
+    """
+    compiled_templates.discard_if(lambda key, compiled: key[0] == slug)
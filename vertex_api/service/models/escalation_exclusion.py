@@ -1,6 +1,5 @@
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
-from hvad.models import TranslatableModel, TranslatedFields
 
 from vertex.models import AbstractDatedModel
 
@@ -8,31 +7,30 @@ from vertex.models import AbstractDatedModel
 __author__ = 'Jonathan Senecal <jonathan@zap.coop>'
 
 
-class EscalationExclusion(AbstractDatedModel, TranslatableModel):
+class EscalationExclusion(AbstractDatedModel):
     """
     An 'EscalationExclusion' lets us define a date on which escalation should
     not happen, for example a weekend or public holiday.
     You may also have a Department that is only used on one day per week.
     """
 
-    departments = models.ManyToManyField(
-        'service.Department',
+    teams = models.ManyToManyField(
+        'service.Team',
         blank=True,
+        related_name='escalation_exclusions',
         help_text=_('Leave blank for this exclusion to be applied to all '
                     'departments, or select those departments you wish to exclude with this '
                     'entry.'),
     )
 
-    translations = TranslatedFields(
-        name=models.CharField(
-            _('Name'),
-            max_length=100,
-
-        )
+    name = models.CharField(
+        _('Name'),
+        max_length=100,
     )
 
     date = models.DateField(
         _('Date'),
+        db_index=True,
         help_text=_('Date on which escalation should not happen'),
     )
 
@@ -41,4 +39,5 @@ class EscalationExclusion(AbstractDatedModel, TranslatableModel):
 
     class Meta:
         verbose_name = _('Escalation exclusion')
-        verbose_name_plural = _('Escalation exclusions')
\ No newline at end of file
+        verbose_name_plural = _('Escalation exclusions')
+        app_label = 'service'
@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.contrib.postgres.fields import JSONField
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import F
+from django.utils.translation import ugettext_lazy as _
+
+from vertex.models import AbstractDatedModel
+from ..saved_searches import compile_filters, compiled_filters, shared_search_counts
+
+
+__author__ = 'Jonathan Senecal <jonathan@zap.coop>'
+
+
+class SavedSearch(AbstractDatedModel):
+    """
+    Allow a user to save a ticket search, eg their filtering and sorting
+    options, and optionally share it with other users. This lets people
+    easily create a set of commonly-used filters, such as:
+        * My tickets waiting on me
+        * My tickets waiting on submitter
+        * My tickets in 'Priority Support' queue with priority of 1
+        * All tickets containing the word 'billing'.
+         etc...
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_('User'),
+    )
+
+    title = models.CharField(
+        _('Query Name'),
+        max_length=100,
+        help_text=_('User-provided name for this query'),
+    )
+
+    shared = models.BooleanField(
+        _('Shared With Other Users?'),
+        blank=True,
+        default=False,
+        help_text=_('Should other users see this query?'),
+    )
+
+    filters = JSONField(
+        _('Filters'),
+        default=dict,
+        blank=True,
+        help_text=_('Filter specification, see service.saved_searches.'),
+    )
+
+    # incremented on every save, identifies the compiled filters and cached counts of the search
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    def __str__(self):
+        if self.shared:
+            return u'%s (*)' % self.title
+        else:
+            return u'%s' % self.title
+
+    def clean(self):
+        try:
+            compile_filters(self.filters)
+        except ValidationError as e:
+            raise ValidationError({'filters': e.messages})
+
+    def save(self, *args, **kwargs):
+        compile_filters(self.filters)
+        if self.pk is None:
+            super(SavedSearch, self).save(*args, **kwargs)
+        else:
+            self.version = F('version') + 1
+            super(SavedSearch, self).save(*args, **kwargs)
+            self.refresh_from_db(fields=['version'])
+
+    def get_q(self):
+        """
+        Return the filters of the search compiled into a Q object.
+        """
+        return compiled_filters(self.pk, self.version, self.filters)
+
+    def tickets(self, person=None):
+        """
+        Return the tickets matching the search, among those visible to `person` when given.
+        """
+        from .ticket import Ticket
+
+        tickets = Ticket.objects.all() if person is None else Ticket.objects.visible_to(person)
+        return tickets.filter(self.get_q()).distinct()
+
+    def count(self):
+        """
+        Return the number of tickets matching the search, cached for shared searches.
+        """
+        if self.shared:
+            return shared_search_counts.count(self)
+        return self.tickets().count()
+
+    class Meta:
+        verbose_name = _('Saved search')
+        verbose_name_plural = _('Saved searches')
+        app_label = 'service'
@@ -1,17 +1,20 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django_fsm import FSMIntegerField, transition
 from hashids import Hashids
 
-from contacts.rules.organization import is_object_organization_admin
 from vertex import rules
 from vertex.models import AbstractDatedModel
 from vertex.rules.predicates import has_django_permission, is_staff, is_superuser
 from tags.models import AbstractTaggedModel
+from ..querysets import TicketQuerySet
 from ..rules.department import is_ticket_team_member
 from ..rules.ticket import (has_ticket_object_view_rights, has_ticket_change_subscription,
-                            has_ticket_view_subscription, is_ticket_signaler)
+                            has_ticket_view_subscription, is_ticket_organization_admin,
+                            is_ticket_signaler)
 
 __author__ = 'Jonathan Senecal <jonathan@zap.coop>'
 
@@ -70,6 +73,8 @@ class Ticket(AbstractTaggedModel, AbstractDatedModel):
         alphabet=TICKET_ID_ALPHABET
     )
 
+    objects = TicketQuerySet.as_manager()
+
     title = models.CharField(
         _('Title'),
         max_length=200,
@@ -164,6 +169,7 @@ class Ticket(AbstractTaggedModel, AbstractDatedModel):
         max_length=255,
         default='',
         editable=False,
+        db_index=True,
     )
 
     parent = models.ForeignKey(
@@ -180,6 +186,12 @@ class Ticket(AbstractTaggedModel, AbstractDatedModel):
         editable=False
     )
 
+    # see service.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # incremented whenever the ticket is changed through an update, for caches and ETags to key on
+    version = models.PositiveIntegerField(default=1, editable=False)
+
     @property
     def assigned_person_display(self):
         """ Custom property to allow us to easily print 'Unassigned' if a
@@ -282,6 +294,10 @@ class Ticket(AbstractTaggedModel, AbstractDatedModel):
     class Meta:
         get_latest_by = "created_at"
         ordering = ('id',)
+        indexes = [
+            GinIndex(fields=['search_vector'], name='service_ticket_search_idx'),
+            models.Index(fields=['status', 'last_escalation'], name='service_ticket_escalation_idx'),
+        ]
         verbose_name = _('Ticket')
         verbose_name_plural = _('Tickets')
         app_label = 'service'
@@ -312,7 +328,7 @@ rules.add_perm('service.add_ticket',
                (is_staff & has_django_permission('service.add_ticket')))
 rules.add_perm('service.change_ticket',
                is_superuser |
-               is_object_organization_admin |
+               is_ticket_organization_admin |
                is_ticket_team_member |
                has_ticket_change_subscription |
                (is_staff & has_django_permission('service.change_ticket')))
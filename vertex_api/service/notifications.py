@@ -0,0 +1,177 @@
+# Ticket notifications
+#
+# The subscribers of a ticket who can view it are emailed its new updates, except for the authors
+# of those updates. The updates saved during a transaction are gathered per ticket, and a single
+# notify_ticket_subscribers task is queued for each ticket once the transaction commits.
+#
+# The task resolves the addresses and languages of all the subscribers with one query, renders the
+# "ticket_updated" EmailTemplate once per language (subscribers without a language get the
+# bilingual version), and sends the messages over a single connection to the email backend by
+# batches of NOTIFICATION_BATCH_SIZE, recording each batch as outgoing messages of the team
+# mailbox with a single INSERT.
+import logging
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.message import make_msgid
+from django.db import transaction
+from django.template import Context
+from django.utils.translation import override
+from django_mailbox.models import Mailbox, Message
+
+from .models import EmailTemplate, Ticket, TicketSubscriber, Update
+from .models.email_template import build_subject
+
+TEMPLATE_SLUG = 'ticket_updated'
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationReport(namedtuple('NotificationReport', ('sent', 'seconds'))):
+
+    @property
+    def rate(self):
+        """
+        Messages sent per second.
+        """
+        return self.sent / self.seconds if self.seconds else 0.0
+
+
+class PendingNotifications(object):
+    """
+    The updates saved during a transaction, per ticket.
+    """
+
+    def __init__(self):
+        self.updates = OrderedDict()
+
+    def add(self, update):
+        self.updates.setdefault(update.ticket_id, list()).append(update.pk)
+
+    def send(self):
+        from .tasks import notify_ticket_subscribers
+
+        for ticket_id, update_ids in self.updates.items():
+            notify_ticket_subscribers.delay(ticket_id, update_ids)
+
+
+def queue_notifications(updates):
+    """
+    Have the subscribers of the tickets of `updates` notified once the current transaction
+    commits, along with the other updates of the tickets saved during the transaction.
+    """
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'pending_ticket_notifications', None)
+    # the callback is gone once the transaction committed or rolled back
+    if pending is not None and any(callback == pending.send
+                                   for savepoints, callback in connection.run_on_commit):
+        for update in updates:
+            pending.add(update)
+    else:
+        pending = connection.pending_ticket_notifications = PendingNotifications()
+        for update in updates:
+            pending.add(update)
+        transaction.on_commit(pending.send)
+
+
+def queue_notification(update):
+    queue_notifications([update])
+
+
+def subscriber_languages(ticket_id, excluded_person_ids=()):
+    """
+    Return an OrderedDict mapping each language to the addresses of the subscribers of
+    `ticket_id` who can view it and read that language, None standing for the subscribers
+    without a language.
+    """
+    languages = dict(settings.LANGUAGES)
+    subscribers = TicketSubscriber.objects.filter(ticket_id=ticket_id, can_view=True).exclude(
+        email_address__person_id__in=[pk for pk in excluded_person_ids if pk is not None]
+    ).order_by('pk').values_list('email_address__email_address', 'email_address__person__language')
+
+    recipients, seen = OrderedDict(), set()
+    for address, language in subscribers:
+        if address not in seen:
+            seen.add(address)
+            recipients.setdefault(language if language in languages else None, list()).append(
+                address
+            )
+    return recipients
+
+
+def render(template, context, language):
+    """
+    Return the subject, plain text and HTML of `template` in `language`, or in every language if
+    None.
+    """
+    if language is None:
+        return (build_subject(template.bilingual_subject, context),
+                template.render_plain_bilingual(context),
+                template.render_html_bilingual(context))
+    with override(language):
+        return (build_subject(template.subject, context),
+                template.render_plain(context),
+                template.render_html(context))
+
+
+def notify_subscribers(ticket_id, update_ids, batch_size=None):
+    """
+    Email the updates `update_ids` of the ticket `ticket_id` to its subscribers, and return a
+    NotificationReport.
+    """
+    started = time.monotonic()
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    template = EmailTemplate.objects.filter(slug=TEMPLATE_SLUG).first()
+    ticket = Ticket.objects.filter(pk=ticket_id).first()
+    mailbox = Mailbox.objects.filter(team__tickets=ticket_id).order_by('team__pk').first()
+    if template is None or ticket is None or mailbox is None:
+        return NotificationReport(sent=0, seconds=time.monotonic() - started)
+
+    updates = list(Update.objects.filter(pk__in=update_ids).select_related('person'))
+    context = Context({'ticket': ticket, 'updates': updates})
+
+    messages = list()
+    recipients = subscriber_languages(ticket_id, set(update.person_id for update in updates))
+    for language, addresses in recipients.items():
+        subject, body, html = render(template, context, language)
+        for address in addresses:
+            message = EmailMultiAlternatives(
+                from_email=mailbox.from_email,
+                to=[address],
+                subject=subject,
+                body=body,
+                # set beforehand so that the sent and recorded messages agree
+                headers={'Message-ID': make_msgid()},
+            )
+            message.attach_alternative(html, 'text/html')
+            messages.append(message)
+
+    sent = 0
+    with get_connection() as connection:
+        for start in range(0, len(messages), batch_size):
+            batch = messages[start:start + batch_size]
+            sent += connection.send_messages(batch) or 0
+            Message.objects.bulk_create([outgoing_message(mailbox, message) for message in batch])
+
+    report = NotificationReport(sent=sent, seconds=time.monotonic() - started)
+    logger.info('Notified %d subscribers of ticket %s in %.3fs (%.1f messages/s)',
+                report.sent, ticket_id, report.seconds, report.rate)
+    return report
+
+
+def outgoing_message(mailbox, email_message):
+    """
+    Return the (unsaved) outgoing Message of `mailbox` recording `email_message`.
+    """
+    message = email_message.message()
+    return Message(
+        mailbox=mailbox,
+        subject=email_message.subject[:255],
+        message_id=message['Message-ID'],
+        from_header=email_message.from_email,
+        to_header=', '.join(email_message.to),
+        outgoing=True,
+        body=message.as_string(),
+    )
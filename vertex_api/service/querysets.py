@@ -0,0 +1,57 @@
+from django.apps import apps
+from django.contrib.postgres.search import SearchRank
+from django.db.models import F, Q, QuerySet
+
+from .search import Headline, language_configuration, search_query
+
+
+class TicketQuerySet(QuerySet):
+
+    def visible_to(self, person):
+        """
+        Restrict the queryset to the tickets `person` may view, following the same rules as the
+        service.view_ticket permission, with a single filter: membership of one of the ticket
+        teams, a subscription allowing to view the ticket, having created or signaled the ticket,
+        or administering the ticket organization or managing one of its departments.
+        """
+        user = person.user
+        if getattr(user, 'is_superuser', False) or getattr(user, 'is_staff', False):
+            return self.all()
+
+        Team = apps.get_model('service', 'Team')
+        TicketSubscriber = apps.get_model('service', 'TicketSubscriber')
+
+        teams = Team.objects.filter(allowed_organization_departments__people=person)
+        subscriptions = TicketSubscriber.objects.filter(email_address__person=person, can_view=True)
+
+        return self.filter(
+            Q(pk__in=self.model.teams.through.objects.filter(team__in=teams).values('ticket_id')) |
+            Q(pk__in=subscriptions.values('ticket_id')) |
+            Q(created_by=person) |
+            Q(signaled_by=person) |
+            Q(organization__in=person.managed_organizations.values('pk')) |
+            Q(organization__in=person.managed_departments.values('organization_id'))
+        )
+
+    def search(self, text):
+        """
+        Restrict the queryset to the tickets matching `text` in their title, description,
+        resolution, updates or notes, ranked by relevance in the `search_rank` annotation.
+        """
+        query = search_query(text)
+        return self.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-pk')
+
+    def highlight(self, text, language=None):
+        """
+        Annotate the tickets with the fragments of their title and description matching `text`,
+        in `title_highlight` and `description_highlight`. Headlines are costly to compute, so this
+        is best applied to a single page of results.
+        """
+        query = search_query(text)
+        configuration = language_configuration(language)
+        return self.annotate(
+            title_highlight=Headline(F('title'), query, configuration),
+            description_highlight=Headline(F('description'), query, configuration),
+        )
@@ -0,0 +1,123 @@
+from django.apps import apps
+from django.utils.functional import cached_property
+
+from vertex.rules.cache import memoize, request_memo
+from vertex.rules.permissions import permissions
+
+
+class TicketMemberships(object):
+    """
+    Everything about a person that decides which tickets they can see or change: their teams,
+    the organizations they administer, the organizations of the departments they manage and their
+    ticket subscriptions. Each set is loaded with a single query the first time it is needed, after
+    which checking a ticket only takes set lookups.
+
+    Use ticket_memberships() rather than instantiating this class, so that the memberships are
+    shared by every check made during the same request.
+    """
+
+    def __init__(self, person):
+        self.person = person
+        self._ticket_team_ids = dict()
+
+    @cached_property
+    def team_ids(self):
+        Team = apps.get_model('service', 'Team')
+        return set(Team.objects.filter(
+            allowed_organization_departments__people=self.person
+        ).values_list('pk', flat=True))
+
+    @cached_property
+    def managed_organization_ids(self):
+        return set(self.person.managed_organizations.values_list('pk', flat=True))
+
+    @cached_property
+    def managed_department_organization_ids(self):
+        return set(self.person.managed_departments.values_list('organization_id', flat=True))
+
+    @cached_property
+    def _subscriptions(self):
+        TicketSubscriber = apps.get_model('service', 'TicketSubscriber')
+        view, change = set(), set()
+        subscriptions = TicketSubscriber.objects.filter(
+            email_address__person=self.person
+        ).values_list('ticket_id', 'can_view', 'can_update')
+        for ticket_id, can_view, can_update in subscriptions:
+            if can_view:
+                view.add(ticket_id)
+            if can_update:
+                change.add(ticket_id)
+        return view, change
+
+    @property
+    def view_subscription_ids(self):
+        return self._subscriptions[0]
+
+    @property
+    def change_subscription_ids(self):
+        return self._subscriptions[1]
+
+    def load_ticket_teams(self, tickets):
+        """
+        Fetch the teams of all of `tickets` whose teams aren't known yet, in a single query.
+        """
+        Ticket = apps.get_model('service', 'Ticket')
+        missing = set(ticket.pk for ticket in tickets) - set(self._ticket_team_ids)
+        if not missing:
+            return
+        for ticket_id in missing:
+            self._ticket_team_ids[ticket_id] = set()
+        links = Ticket.teams.through.objects.filter(ticket_id__in=missing).values_list(
+            'ticket_id', 'team_id'
+        )
+        for ticket_id, team_id in links:
+            self._ticket_team_ids[ticket_id].add(team_id)
+
+    def ticket_team_ids(self, ticket):
+        if ticket.pk not in self._ticket_team_ids:
+            prefetched = getattr(ticket, '_prefetched_objects_cache', {}).get('teams')
+            if prefetched is not None:
+                self._ticket_team_ids[ticket.pk] = set(team.pk for team in prefetched)
+            else:
+                self.load_ticket_teams([ticket])
+        return self._ticket_team_ids[ticket.pk]
+
+    def is_team_member(self, ticket):
+        return not self.team_ids.isdisjoint(self.ticket_team_ids(ticket))
+
+    def is_creator_or_signaler(self, ticket):
+        return self.person.pk in (ticket.created_by_id, ticket.signaled_by_id)
+
+    def is_organization_admin(self, ticket):
+        return ticket.organization_id in self.managed_organization_ids
+
+    def manages_organization(self, ticket):
+        return (ticket.organization_id is not None and (
+            ticket.organization_id in self.managed_organization_ids or
+            ticket.organization_id in self.managed_department_organization_ids))
+
+
+def ticket_memberships(person):
+    """
+    Return the TicketMemberships of `person`, memoised for the current request (and thus
+    forgotten when memberships change), or cached on the instance outside of a request.
+    """
+    if request_memo() is not None:
+        return memoize(('ticket_memberships', person.pk), lambda: TicketMemberships(person))
+
+    memberships = getattr(person, '_ticket_memberships', None)
+    if memberships is None:
+        memberships = person._ticket_memberships = TicketMemberships(person)
+    return memberships
+
+
+def has_perm_many(person, tickets, perm='service.view_ticket'):
+    """
+    Check `perm` for `person` on many tickets at once, the teams of all the tickets being fetched
+    with a single query. Return a dict mapping the pk of each ticket to the result.
+    """
+    tickets = list(tickets)
+    ticket_memberships(person).load_ticket_teams(tickets)
+    return dict(
+        (ticket.pk, permissions.test_rule(perm, person, ticket)) for ticket in tickets
+    )
@@ -1,7 +1,7 @@
-from django.apps import apps
-from django.db.models import Count
 import rules
 
+from .memberships import ticket_memberships
+
 
 @rules.predicate
 def has_ticket_object_view_rights(person, ticket):
@@ -11,42 +11,38 @@ def has_ticket_object_view_rights(person, ticket):
     This includes the person who created or signaled the ticket and, if the ticket is associated
     with an organization, admins and department heads of that organization.
     """
-    TicketSubscriber = apps.get_model('service', 'TicketSubscriber')
-    Ticket = apps.get_model('service', 'Ticket')
+    memberships = ticket_memberships(person)
     if not ticket:
         return (person.created_tickets.exists() or person.originated_tickets.exists() or
-         TicketSubscriber.objects.filter(person=person).exists() or
-         Ticket.objects.filter(organization__in=person.managed_organizations.all()) or
-         Ticket.objects.filter(organization__departments__in=person.managed_departments.all()))
+                bool(memberships.managed_organization_ids) or
+                bool(memberships.managed_department_organization_ids))
 
-    if ticket.created_by == person or ticket.signaled_by == person:
-        return True
+    return memberships.is_creator_or_signaler(ticket) or memberships.manages_organization(ticket)
 
-    elif ticket.organization:
-        return (person.managed_organizations.filter(pk=ticket.organization.pk).exists() or
-                person.managed_departments.filter(organization=ticket.organization))
 
-    return False
+@rules.predicate
+def is_ticket_organization_admin(person, ticket):
+    if not ticket:
+        return bool(ticket_memberships(person).managed_organization_ids)
+    return ticket_memberships(person).is_organization_admin(ticket)
 
 
 @rules.predicate
 def has_ticket_view_subscription(person, ticket):
     if not ticket:
         return False
-    return apps.get_model('service', 'TicketSubscriber').objects.filter(
-        email_address__in=person.email_addresses.all()).filter(can_view=True)
+    return ticket.pk in ticket_memberships(person).view_subscription_ids
 
 
 @rules.predicate
 def has_ticket_change_subscription(person, ticket):
     if not ticket:
         return False
-    return apps.get_model('service', 'TicketSubscriber').objects.filter(
-        email_address__in=person.email_addresses.all()).filter(can_update=True)
+    return ticket.pk in ticket_memberships(person).change_subscription_ids
 
 
 @rules.predicate
 def is_ticket_signaler(person, ticket):
     if not ticket:
         return person.originated_tickets.exists()
-    return person == ticket.signaled_by
+    return person.pk == ticket.signaled_by_id
@@ -0,0 +1,303 @@
+# Saved searches
+#
+# The filters of a SavedSearch are a JSON document compiled into a Q object on the Ticket model, so
+# that running a saved search is an ordinary query. A filter is one of:
+#
+#     {"field": "priority", "op": "lte", "value": 2}
+#     {"search": "billing"}                      full-text search, see service.search
+#     {"all": [filter, ...]}                     every filter matches
+#     {"any": [filter, ...]}                     one of the filters matches
+#     {"not": filter}
+#
+# where "field" is one of FILTER_FIELDS and "op" one of FILTER_OPERATORS, restricted to those
+# making sense for the type of the field, and where values are checked against the model field
+# (relations against the pk of their model). An empty document matches every ticket.
+#
+# Compiled filters are kept per process, keyed by the id and version of the search (the version
+# being incremented on every save). The number of tickets matching each shared search is kept in
+# the Django cache, and adjusted by the signal handlers of service.signals whenever a ticket (or
+# its teams, updates or notes) changes: the shared searches a ticket matches are looked up before
+# and after the change, with a single query, and the counts of the searches it entered or left
+# are incremented or decremented once the transaction commits. Counts also expire after
+# SAVED_SEARCH_COUNT_TIMEOUT seconds, which bounds the drift caused by changes made without
+# signals (e.g. QuerySet.update()).
+import logging
+import threading
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldError, ValidationError
+from django.db import transaction
+from django.db.models import CharField, Exists, OuterRef, Q, TextField
+from django.utils.translation import ugettext as _
+
+from .search import search_query
+
+FILTER_FIELDS = {
+    'title': 'title',
+    'status': 'status',
+    'priority': 'priority',
+    'team': 'teams',
+    'tag': 'tags',
+    'organization': 'organization',
+    'assigned_to': 'assigned_to',
+    'signaled_by': 'signaled_by',
+    'created_by': 'created_by',
+    'signaled_date': 'signaled_date',
+    'due_date': 'due_date',
+    'last_escalation': 'last_escalation',
+    'created_at': 'created_at',
+    'modified_at': 'modified_at',
+}
+
+FILTER_OPERATORS = {
+    'eq': 'exact',
+    'in': 'in',
+    'lt': 'lt',
+    'lte': 'lte',
+    'gt': 'gt',
+    'gte': 'gte',
+    'isnull': 'isnull',
+    'contains': 'icontains',
+}
+
+# the operators allowed on each kind of field
+RELATION_OPERATORS = frozenset(['eq', 'in', 'isnull'])
+TEXT_OPERATORS = frozenset(['eq', 'in', 'contains', 'isnull'])
+ORDERED_OPERATORS = frozenset(['eq', 'in', 'lt', 'lte', 'gt', 'gte', 'isnull'])
+
+SCALAR_TYPES = (str, int, float, bool)
+
+COMPILED_FILTERS_CACHE_SIZE = 1024
+SHARED_SEARCHES_CACHE_KEY = 'service_shared_saved_searches'
+SEARCH_COUNT_CACHE_KEY = 'service_saved_search_count:{}:{}'
+
+logger = logging.getLogger(__name__)
+
+
+def compile_filters(filters):
+    """
+    Compile a filter document into a Q object, raising ValidationError if it isn't valid.
+    """
+    if filters in (None, {}):
+        return Q()
+    if not isinstance(filters, dict):
+        raise ValidationError(_('A filter must be an object.'))
+
+    if 'all' in filters or 'any' in filters:
+        operator = 'all' if 'all' in filters else 'any'
+        children = filters[operator]
+        if len(filters) != 1 or not isinstance(children, list) or not children:
+            raise ValidationError(_('"%s" must be the only key of its filter, and hold a list '
+                                    'of filters.') % operator)
+        q = compile_filters(children[0])
+        for child in children[1:]:
+            q = q & compile_filters(child) if operator == 'all' else q | compile_filters(child)
+        return q
+
+    if 'not' in filters:
+        if len(filters) != 1:
+            raise ValidationError(_('"not" must be the only key of its filter.'))
+        return ~compile_filters(filters['not'])
+
+    if 'search' in filters:
+        text = filters['search']
+        if len(filters) != 1 or not isinstance(text, str) or not text.strip():
+            raise ValidationError(_('"search" must be the only key of its filter, and hold '
+                                    'some text.'))
+        return Q(search_vector=search_query(text))
+
+    return _compile_condition(filters)
+
+
+def _compile_condition(filters):
+    if set(filters) != {'field', 'op', 'value'}:
+        raise ValidationError(_('Unknown filter: %s.') % ', '.join(sorted(filters)))
+
+    field, operator, value = filters['field'], filters['op'], filters['value']
+    if field not in FILTER_FIELDS:
+        raise ValidationError(_('Unknown field: %s.') % field)
+    if operator not in FILTER_OPERATORS:
+        raise ValidationError(_('Unknown operator: %s.') % operator)
+
+    if operator == 'in':
+        valid = isinstance(value, list) and all(isinstance(item, SCALAR_TYPES) for item in value)
+    elif operator == 'isnull':
+        valid = isinstance(value, bool)
+    else:
+        valid = isinstance(value, SCALAR_TYPES)
+    if not valid:
+        raise ValidationError(_('Invalid value for the "%s" operator.') % operator)
+
+    model_field = apps.get_model('service', 'Ticket')._meta.get_field(FILTER_FIELDS[field])
+    if operator not in _field_operators(model_field):
+        raise ValidationError(_('The "%(op)s" operator can\'t be used on the "%(field)s" field.') %
+                              {'op': operator, 'field': field})
+    if operator == 'in':
+        value = [_field_value(model_field, field, item) for item in value]
+    elif operator != 'isnull':
+        value = _field_value(model_field, field, value)
+
+    return Q(**{'{}__{}'.format(FILTER_FIELDS[field], FILTER_OPERATORS[operator]): value})
+
+
+def _field_operators(model_field):
+    if model_field.is_relation:
+        return RELATION_OPERATORS
+    if isinstance(model_field, (CharField, TextField)):
+        return TEXT_OPERATORS
+    return ORDERED_OPERATORS
+
+
+def _field_value(model_field, field, value):
+    """
+    Return `value` converted to the type of `model_field`, raising ValidationError if it can't be.
+    """
+    if model_field.is_relation:
+        model_field = model_field.target_field
+    # booleans are ints in Python, but no filter field is a boolean
+    if isinstance(value, bool):
+        valid = False
+    else:
+        try:
+            value = model_field.to_python(value)
+            valid = value is not None
+        except (ValidationError, TypeError, ValueError):
+            valid = False
+    if not valid:
+        raise ValidationError(_('Invalid value for the "%s" field.') % field)
+    return value
+
+
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compiled_filters(search_id, version, filters):
+    """
+    Return the compiled `filters` of the version `version` of the search `search_id`, compiling
+    them only the first time.
+    """
+    if search_id is None:
+        return compile_filters(filters)
+
+    key = (search_id, version)
+    with _compiled_lock:
+        q = _compiled.get(key)
+        if q is not None:
+            _compiled.move_to_end(key)
+            return q
+
+    q = compile_filters(filters)
+    with _compiled_lock:
+        _compiled[key] = q
+        if len(_compiled) > COMPILED_FILTERS_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return q
+
+
+class SharedSearchCounts(object):
+    """
+    The number of tickets matching each shared search, in the Django cache.
+    """
+
+    def searches(self):
+        """
+        Return the (pk, version, filters) of the shared searches.
+        """
+        searches = cache.get(SHARED_SEARCHES_CACHE_KEY)
+        if searches is None:
+            SavedSearch = apps.get_model('service', 'SavedSearch')
+            searches = list(SavedSearch.objects.filter(shared=True).values_list(
+                'pk', 'version', 'filters'
+            ))
+            cache.set(SHARED_SEARCHES_CACHE_KEY, searches, timeout=None)
+        return searches
+
+    def searches_changed(self):
+        cache.delete(SHARED_SEARCHES_CACHE_KEY)
+
+    def count(self, search):
+        key = SEARCH_COUNT_CACHE_KEY.format(search.pk, search.version)
+        count = cache.get(key)
+        if count is None:
+            count = search.tickets().count()
+            cache.set(key, count, timeout=settings.SAVED_SEARCH_COUNT_TIMEOUT)
+        return count
+
+    def invalidate(self):
+        cache.delete_many([
+            SEARCH_COUNT_CACHE_KEY.format(pk, version) for pk, version, filters in self.searches()
+        ])
+
+    def matches(self, ticket_ids):
+        """
+        Return a dict mapping each of `ticket_ids` to the set of (pk, version) of the shared
+        searches it matches, using a single query. Searches whose filters can't be compiled are
+        left out, so that they can't prevent tickets from being saved.
+        """
+        ticket_ids = [ticket_id for ticket_id in ticket_ids if ticket_id is not None]
+        if not ticket_ids:
+            return dict()
+
+        Ticket = apps.get_model('service', 'Ticket')
+        searches, annotations = list(), OrderedDict()
+        for pk, version, filters in self.searches():
+            # a subquery per search, so that filters on many-valued relations (teams, tags) have
+            # the meaning they have in tickets() and count(), "not" included
+            try:
+                matching = Ticket.objects.filter(compiled_filters(pk, version, filters),
+                                                 pk=OuterRef('pk'))
+            except (FieldError, ValidationError, ValueError):
+                logger.exception('Invalid filters of the shared search %s', pk)
+                continue
+            searches.append((pk, version, filters))
+            annotations['saved_search_{}'.format(pk)] = Exists(matching.values('pk'))
+        if not searches:
+            return dict()
+
+        rows = Ticket.objects.filter(pk__in=ticket_ids).annotate(**annotations).values_list(
+            'pk', *annotations
+        )
+
+        matches = dict()
+        for row in rows:
+            matches[row[0]] = set(
+                (pk, version) for (pk, version, filters), matched in zip(searches, row[1:])
+                if matched
+            )
+        return matches
+
+    def update(self, ticket_ids, before):
+        """
+        Adjust the counts once `ticket_ids` changed, `before` being what matches() returned for
+        them before the change.
+        """
+        after = self.matches(ticket_ids)
+        deltas = dict()
+        for ticket_id in set(before) | set(after):
+            entered = after.get(ticket_id, set())
+            left = before.get(ticket_id, set())
+            for search in entered - left:
+                deltas[search] = deltas.get(search, 0) + 1
+            for search in left - entered:
+                deltas[search] = deltas.get(search, 0) - 1
+
+        if any(deltas.values()):
+            transaction.on_commit(lambda: self._apply(deltas))
+
+    def _apply(self, deltas):
+        for (pk, version), delta in deltas.items():
+            key = SEARCH_COUNT_CACHE_KEY.format(pk, version)
+            try:
+                if delta > 0:
+                    cache.incr(key, delta)
+                elif delta < 0:
+                    cache.decr(key, -delta)
+            except ValueError:
+                pass  # not counted yet, count() will do it
+
+
+shared_search_counts = SharedSearchCounts()
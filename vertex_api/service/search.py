@@ -0,0 +1,106 @@
+# Ticket full-text search
+#
+# Every ticket holds, in its search_vector column, the text of its title (weight A), of its
+# description and resolution (weight B) and of the bodies of its updates and notes (weight C),
+# stemmed once per configured language so that a search matches whatever the language the text
+# was written in. The column is covered by a GIN index, so a search only reads the matching
+# tickets, and is updated by the signal handlers of service.signals whenever one of those texts
+# changes, with a single UPDATE per ticket.
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+from django.db.models import Func, TextField, Value
+from django.utils import translation
+
+# Text search configuration of each language of settings.LANGUAGES
+SEARCH_CONFIGURATIONS = {
+    'en': 'english',
+    'fr': 'french',
+}
+DEFAULT_SEARCH_CONFIGURATION = 'english'
+HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10'
+
+
+def search_configurations():
+    configurations = list()
+    for code, name in settings.LANGUAGES:
+        configuration = SEARCH_CONFIGURATIONS.get(code.split('-')[0])
+        if configuration is not None and configuration not in configurations:
+            configurations.append(configuration)
+    return configurations or [DEFAULT_SEARCH_CONFIGURATION]
+
+
+def search_query(text):
+    """
+    Return a SearchQuery matching `text` stemmed in any of the search configurations.
+    """
+    query = None
+    for configuration in search_configurations():
+        language_query = SearchQuery(text, config=configuration)
+        query = language_query if query is None else query | language_query
+    return query
+
+
+def language_configuration(language=None):
+    """
+    Return the search configuration of `language`, the active language by default.
+    """
+    language = language or translation.get_language() or settings.LANGUAGE_CODE
+    return SEARCH_CONFIGURATIONS.get(language.split('-')[0], DEFAULT_SEARCH_CONFIGURATION)
+
+
+class Headline(Func):
+    """
+    The fragments of `expression` matching `query`, with the matches surrounded by <mark> tags.
+    """
+    function = 'ts_headline'
+
+    def __init__(self, expression, query, configuration, options=HEADLINE_OPTIONS):
+        super(Headline, self).__init__(
+            Value(configuration), expression, query, Value(options), output_field=TextField()
+        )
+
+
+def _weighted_vector(expression, weight):
+    return ' || '.join(
+        "setweight(to_tsvector('{}', coalesce({}, '')), '{}')".format(configuration, expression,
+                                                                      weight)
+        for configuration in search_configurations()
+    )
+
+
+def update_search_vectors(ticket_ids=None):
+    """
+    Recompute the search vector of the tickets `ticket_ids`, or of every ticket when None.
+    """
+    from service.models import Note, Ticket, Update
+
+    tables = {
+        'ticket': Ticket._meta.db_table,
+        'update': Update._meta.db_table,
+        'note': Note._meta.db_table,
+    }
+    vector = ' || '.join([
+        _weighted_vector('ticket.title', 'A'),
+        # resolution is NULL until the ticket is resolved
+        _weighted_vector("coalesce(ticket.description, '') || ' ' || "
+                         "coalesce(ticket.resolution, '')", 'B'),
+        _weighted_vector('text.updates', 'C'),
+        _weighted_vector('text.notes', 'C'),
+    ])
+    sql = """
+        UPDATE {ticket} AS ticket SET search_vector = {vector}
+        FROM (
+            SELECT t.id,
+                (SELECT string_agg(u.body, ' ') FROM {update} u WHERE u.ticket_id = t.id)
+                    AS updates,
+                (SELECT string_agg(n.body, ' ') FROM {note} n
+                    JOIN {update} u ON n.update_id = u.id WHERE u.ticket_id = t.id) AS notes
+            FROM {ticket} t {where}
+        ) AS text
+        WHERE ticket.id = text.id
+    """.format(vector=vector, where='' if ticket_ids is None else 'WHERE t.id = ANY(%s)',
+               **tables)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [] if ticket_ids is None else [list(ticket_ids)])
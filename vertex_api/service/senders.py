@@ -0,0 +1,150 @@
+# Sender resolution
+#
+# Inbound mail needs, for every address it mentions, the EmailAddress it belongs to (and through
+# it the person and organization of the sender), and for unknown senders the organization owning
+# their domain. The resolver keeps both in a per-process LRU cache keyed by the lower-cased address
+# or domain, looks up what it misses with a single case-insensitive query per kind, and caches
+# misses as well since most of the mail of an unknown sender keeps coming from the same address.
+#
+# Entries are dropped by the signal handlers of service.signals when an EmailAddress or an
+# EmailDomain is saved or deleted. The other processes learn about the change through a
+# generation counter kept in the Django cache, shared between processes (see vertex.checks), and
+# drop their whole cache when it moves; entries also expire after SENDER_CACHE_TIMEOUT seconds.
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from vertex.utils.lru import LRUCache
+
+GENERATION_CACHE_KEY = 'service_sender_resolver_generation'
+
+Sender = namedtuple('Sender', ('pk', 'email_address', 'person_id', 'organization_id'))
+
+
+def normalize(address):
+    return address.strip().lower()
+
+
+class SenderResolver(object):
+
+    def __init__(self):
+        self._addresses = LRUCache(settings.SENDER_CACHE_SIZE, settings.SENDER_CACHE_TIMEOUT)
+        self._domains = LRUCache(settings.SENDER_CACHE_SIZE, settings.SENDER_CACHE_TIMEOUT)
+        self._generation = None
+
+    def _check_generation(self):
+        generation = cache.get(GENERATION_CACHE_KEY)
+        if generation != self._generation:
+            self._addresses.clear()
+            self._domains.clear()
+            self._generation = generation
+
+    def senders(self, addresses):
+        """
+        Return a dict mapping each of `addresses`, normalised, to its Sender or None.
+        """
+        from contacts.models import EmailAddress
+
+        self._check_generation()
+        senders, missing = dict(), set()
+        for address in addresses:
+            address = normalize(address)
+            sender = self._addresses.get(address)
+            if sender is LRUCache.MISSING:
+                missing.add(address)
+            else:
+                senders[address] = sender
+
+        if missing:
+            found = EmailAddress.objects.annotate(
+                normalized=Lower('email_address')
+            ).filter(normalized__in=missing).order_by('pk').values_list(
+                'normalized', 'pk', 'email_address', 'person_id', 'organization_id'
+            )
+            for row in found:
+                # addresses differing only by case are resolved to the oldest one
+                if row[0] in missing and row[0] not in senders:
+                    senders[row[0]] = Sender(*row[1:])
+            for address in missing:
+                senders.setdefault(address, None)
+                self._addresses.set(address, senders[address])
+        return senders
+
+    def sender(self, address):
+        return self.senders([address])[normalize(address)]
+
+    def domain_organizations(self, domains):
+        """
+        Return a dict mapping each of `domains`, normalised, to the pk of the organization owning
+        it, or None.
+        """
+        from contacts.models import EmailDomain
+
+        self._check_generation()
+        organizations, missing = dict(), set()
+        for domain in domains:
+            domain = normalize(domain)
+            organization_id = self._domains.get(domain)
+            if organization_id is LRUCache.MISSING:
+                missing.add(domain)
+            else:
+                organizations[domain] = organization_id
+
+        if missing:
+            found = EmailDomain.objects.annotate(
+                normalized=Lower('domain_name')
+            ).filter(normalized__in=missing).order_by('pk').values_list(
+                'normalized', 'organization_id'
+            )
+            for domain, organization_id in found:
+                organizations.setdefault(domain, organization_id)
+            for domain in missing:
+                organizations.setdefault(domain, None)
+                self._domains.set(domain, organizations[domain])
+        return organizations
+
+    def sender_organizations(self, addresses):
+        """
+        Return a dict mapping each of `addresses`, normalised, to the pk of the organization of
+        its EmailAddress or, failing that, of the organization owning its domain.
+        """
+        senders = self.senders(addresses)
+        organizations = dict(
+            (address, sender.organization_id) for address, sender in senders.items()
+            if sender is not None and sender.organization_id is not None
+        )
+        domains = dict(
+            (address, address.rpartition('@')[2]) for address in senders
+            if address not in organizations
+        )
+        if domains:
+            domain_organizations = self.domain_organizations(domains.values())
+            for address, domain in domains.items():
+                organizations[address] = domain_organizations[domain]
+        return organizations
+
+    def address_changed(self, email_address):
+        """
+        Forget what was resolved for `email_address`, an EmailAddress instance.
+        """
+        self._addresses.discard(normalize(email_address.email_address))
+        # the address itself may have changed
+        self._addresses.discard_if(lambda key, sender: getattr(sender, 'pk', None) ==
+                                   email_address.pk)
+        self._changed()
+
+    def domain_changed(self, email_domain):
+        self._domains.clear()
+        self._changed()
+
+    def _changed(self):
+        def committed():
+            cache.add(GENERATION_CACHE_KEY, 0, timeout=None)
+            cache.incr(GENERATION_CACHE_KEY)
+        transaction.on_commit(committed)
+
+
+sender_resolver = SenderResolver()
@@ -5,3 +5,7 @@ from .update import *
 from .note import *
 from .ticket_subscriber import TicketSubscriberSerializer
 from .close_ticket import CloseTicketSerializer
+from .attachment import AttachmentSerializer
+from .timeline import (TimelineUpdateSerializer, TimelineNoteSerializer,
+                       TimelineTicketChangeSerializer, TimelineCommunicationSerializer)
+from .bulk_ticket_operation import BulkTicketOperationSerializer
@@ -0,0 +1,36 @@
+from rest_framework_json_api import serializers
+from rest_framework_json_api.relations import ResourceRelatedField
+
+from ..attachments import store
+from ..models import Attachment, Update
+
+
+class AttachmentSerializer(serializers.ModelSerializer):
+    file = serializers.FileField(write_only=True)
+    ticket = ResourceRelatedField(read_only=True)
+    update = ResourceRelatedField(queryset=Update.objects, required=False, allow_null=True)
+
+    class Meta:
+        model = Attachment
+        fields = ('ticket', 'update', 'file', 'filename', 'mime_type', 'size', 'sha256',
+                  'created_at')
+        read_only_fields = ('filename', 'mime_type', 'size', 'sha256', 'created_at')
+
+    def validate_update(self, update):
+        ticket = self.context['ticket']
+        if update is not None and update.ticket_id != ticket.pk:
+            raise serializers.ValidationError('This update belongs to another ticket.')
+        return update
+
+    def create(self, validated_data):
+        upload = validated_data.pop('file')
+        stored_file = store(upload, upload.name, upload.content_type)
+        return Attachment.objects.create(
+            ticket=self.context['ticket'],
+            file=stored_file.name,
+            sha256=stored_file.sha256,
+            filename=upload.name,
+            mime_type=stored_file.mime_type,
+            size=stored_file.size,
+            **validated_data
+        )
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import serializers
+
+from contacts.models import Person
+from tags.models import Tag
+from service.bulk import OPERATIONS, bulk_update_tickets
+
+
+class BulkTicketOperationSerializer(serializers.Serializer):
+    tickets = serializers.ListField(child=serializers.IntegerField())
+    operation = serializers.ChoiceField(choices=list(OPERATIONS))
+    assigned_to = serializers.PrimaryKeyRelatedField(
+        required=False,
+        allow_null=True,
+        queryset=Person.objects.all()
+    )
+    priority = serializers.IntegerField(min_value=1, max_value=5, required=False)
+    tags = serializers.PrimaryKeyRelatedField(many=True, required=False, queryset=Tag.objects.all())
+    comment = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_tickets(self, tickets):
+        if not tickets:
+            raise serializers.ValidationError(_("No ticket was given."))
+        if len(tickets) > settings.BULK_TICKET_OPERATION_MAX_SIZE:
+            raise serializers.ValidationError(_("At most %d tickets can be changed at once.") %
+                                              settings.BULK_TICKET_OPERATION_MAX_SIZE)
+        return tickets
+
+    def validate(self, attrs):
+        argument = OPERATIONS[attrs['operation']]
+        if argument is not None and argument not in attrs:
+            raise serializers.ValidationError({
+                argument: _("This field is required by the %s operation.") % attrs['operation']
+            })
+        return attrs
+
+    def save(self, **kwargs):
+        argument = OPERATIONS[self.validated_data['operation']]
+        return bulk_update_tickets(
+            person=self.context['person'],
+            ticket_ids=self.validated_data['tickets'],
+            operation=self.validated_data['operation'],
+            value=self.validated_data.get(argument) if argument else None,
+            comment=self.validated_data.get('comment', ''),
+        )
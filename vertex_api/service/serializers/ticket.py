@@ -42,6 +42,7 @@ class TicketSerializer(FilterRelatedMixin, serializers.ModelSerializer):
     parent = ResourceRelatedField(queryset=Ticket.objects, required=False)
     duplicate_of = ResourceRelatedField(queryset=Ticket.objects, required=False)
     tags = ResourceRelatedField(queryset=Tag.objects, required=False, many=True)
+    search_highlight = serializers.SerializerMethodField()
 
     def update(self, instance, validated_data):
         changed_fields = dict()
@@ -60,14 +61,19 @@ class TicketSerializer(FilterRelatedMixin, serializers.ModelSerializer):
                     'ticket': {'type': format_relation_name('Ticket'), 'id': instance.id},
                     'changed_fields': changed_fields
                 },
-                context=self.context
+                context=dict(self.context, ticket=instance)
             )
             update_serializer.is_valid(raise_exception=True)
             update_serializer.save()
 
-        instance = Ticket.objects.get(pk=instance.pk)
         return instance
 
+    def get_search_highlight(self, instance):
+        # only set when the tickets were searched, see TicketFilterSet
+        if not hasattr(instance, 'title_highlight'):
+            return None
+        return {'title': instance.title_highlight, 'description': instance.description_highlight}
+
     def filter_tags(self, queryset):
         request = self.context.get('request')
         if request is not None:
@@ -89,4 +95,4 @@ class TicketSerializer(FilterRelatedMixin, serializers.ModelSerializer):
         fields = ('id', 'title', 'teams', 'signaled_by', 'organization', 'created_by',
                   'assigned_to', 'signaled_by', 'status', 'description', 'resolution', 'priority',
                   'signaled_date', 'due_date', 'last_escalation', 'updates', 'parent',
-                  'duplicate_of', 'tags')
+                  'duplicate_of', 'tags', 'search_highlight', 'version')
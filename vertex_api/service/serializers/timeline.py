@@ -0,0 +1,32 @@
+from rest_framework.serializers import ModelSerializer, ReadOnlyField
+
+from service.models import Note, TicketChange, TicketCommunication, Update
+
+
+class TimelineUpdateSerializer(ModelSerializer):
+    class Meta:
+        model = Update
+        fields = ('id', 'display_time', 'person', 'email_address', 'body', 'body_is_plaintext',
+                  'duration', 'billable_hours', 'created_at', 'modified_at')
+
+
+class TimelineNoteSerializer(ModelSerializer):
+    class Meta:
+        model = Note
+        fields = ('id', 'update', 'person', 'body', 'created_at', 'modified_at')
+
+
+class TimelineTicketChangeSerializer(ModelSerializer):
+    class Meta:
+        model = TicketChange
+        fields = ('id', 'update', 'field', 'old_value', 'new_value')
+
+
+class TimelineCommunicationSerializer(ModelSerializer):
+    subject = ReadOnlyField(source='message.subject')
+    from_header = ReadOnlyField(source='message.from_header')
+    outgoing = ReadOnlyField(source='message.outgoing')
+
+    class Meta:
+        model = TicketCommunication
+        fields = ('id', 'message', 'subject', 'from_header', 'outgoing')
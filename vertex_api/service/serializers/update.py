@@ -1,4 +1,5 @@
 from django.db import transaction
+from django.db.models import F
 
 from rest_framework_json_api import serializers
 from rest_framework_json_api.relations import ResourceRelatedField
@@ -83,21 +84,41 @@ class UpdateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         with transaction.atomic():
             changed_fields = validated_data.pop('changed_fields', {})
+            # the ticket being changed by TicketSerializer, so that it sees the changes
+            ticket = self.context.get('ticket')
+            if ticket is None or ticket.pk != validated_data['ticket'].pk:
+                ticket = validated_data['ticket']
+            validated_data['ticket'] = ticket
             person = self.context['request'].user.person
             update = Update.objects.create(person=person, **validated_data)
-            self._apply_ticket_changes(validated_data['ticket'], changed_fields, update)
+            self._apply_ticket_changes(ticket, changed_fields, update)
             return update
 
     def _apply_ticket_changes(self, ticket, changed_fields, update):
+        """
+        Record the changes with a single INSERT, and save only the changed columns of `ticket`
+        along with its version.
+        """
+        if not changed_fields:
+            return
+
+        columns = dict((field.name, field.attname) for field in Ticket._meta.concrete_fields)
+        ticket_changes = list()
         for field, new_value in changed_fields.items():
-            TicketChange.objects.create(
+            ticket_changes.append(TicketChange(
                 field=field,
                 update=update,
-                old_value=getattr(ticket, field),
+                old_value=getattr(ticket, field, None),
                 new_value=new_value
-            )
+            ))
             setattr(ticket, field, new_value)
-        ticket.save()
+        TicketChange.objects.bulk_create(ticket_changes)
+
+        ticket.version = F('version') + 1
+        ticket.save(update_fields=[field for field in changed_fields if field in columns] +
+                    ['version', 'modified_at'])
+        # the database holds the actual version should the ticket have been changed concurrently
+        ticket.refresh_from_db(fields=['version'])
 
     # def update(self, instance, validated_data):
     #     editable_fields_on_update = ('display_time', 'body', 'duration', 'billable_hours')
@@ -0,0 +1,136 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from contacts.models import EmailAddress, EmailDomain
+from .attachments import delete_unused_file
+from .blacklist import blacklist
+from .models.email_template import discard_compiled_templates
+from .notifications import queue_notification
+from .models import (Attachment, BlacklistedEmail, EmailTemplate, Note, SavedSearch, Team, Ticket,
+                     Update)
+from .saved_searches import shared_search_counts
+from .search import update_search_vectors
+from .senders import sender_resolver
+
+TICKET_SEARCH_FIELDS = frozenset(['title', 'description', 'resolution'])
+
+
+def reindex_tickets(ticket_ids):
+    """
+    Recompute the search vector of `ticket_ids` and the counts of the shared searches they
+    entered or left as a result.
+    """
+    before = shared_search_counts.matches(ticket_ids)
+    update_search_vectors(ticket_ids)
+    shared_search_counts.update(ticket_ids, before)
+
+
+@receiver(pre_save, sender=Ticket)
+@receiver(pre_delete, sender=Ticket)
+def remember_ticket_searches(instance, **kwargs):
+    """
+    Remember the shared searches a ticket matched before being saved or deleted.
+    """
+    instance._shared_searches = shared_search_counts.matches([instance.pk])
+
+
+@receiver(post_save, sender=Ticket)
+def index_saved_ticket(instance, update_fields=None, **kwargs):
+    """
+    Keep the search vector of saved tickets in sync with their text, and the counts of shared
+    searches with their fields.
+    """
+    if update_fields is None or TICKET_SEARCH_FIELDS.intersection(update_fields):
+        update_search_vectors([instance.pk])
+    shared_search_counts.update([instance.pk], instance.__dict__.pop('_shared_searches', {}))
+
+
+@receiver(post_delete, sender=Ticket)
+def count_deleted_ticket(instance, **kwargs):
+    shared_search_counts.update([instance.pk], instance.__dict__.pop('_shared_searches', {}))
+
+
+@receiver(m2m_changed, sender=Ticket.teams.through)
+def count_ticket_team_change(instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep the counts of shared searches in sync with the teams of tickets.
+    """
+    ticket_ids = pk_set if reverse else [instance.pk]
+    if ticket_ids is None:  # all the tickets of a team are being cleared
+        if action == 'post_clear':
+            shared_search_counts.invalidate()
+    elif action.startswith('pre_'):
+        instance._shared_searches = shared_search_counts.matches(ticket_ids)
+    else:
+        shared_search_counts.update(ticket_ids, instance.__dict__.pop('_shared_searches', {}))
+
+
+@receiver(post_save, sender=Update)
+@receiver(post_delete, sender=Update)
+def index_update_ticket(instance, **kwargs):
+    """
+    Keep the search vector of tickets in sync with the body of their updates.
+    """
+    reindex_tickets([instance.ticket_id])
+
+
+@receiver(post_save, sender=Update)
+def notify_update_subscribers(instance, created, **kwargs):
+    if created:
+        queue_notification(instance)
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def index_note_ticket(instance, **kwargs):
+    """
+    Keep the search vector of tickets in sync with the body of the notes of their updates.
+    """
+    ticket_ids = Update.objects.filter(pk=instance.update_id).values_list('ticket_id', flat=True)
+    reindex_tickets(list(ticket_ids))
+
+
+@receiver(post_save, sender=SavedSearch)
+@receiver(post_delete, sender=SavedSearch)
+def forget_shared_searches(**kwargs):
+    shared_search_counts.searches_changed()
+
+
+@receiver(post_save, sender=EmailAddress)
+@receiver(post_delete, sender=EmailAddress)
+def forget_resolved_address(instance, **kwargs):
+    sender_resolver.address_changed(instance)
+
+
+@receiver(post_save, sender=EmailDomain)
+@receiver(post_delete, sender=EmailDomain)
+def forget_resolved_domains(instance, **kwargs):
+    sender_resolver.domain_changed(instance)
+
+
+@receiver(post_save, sender=BlacklistedEmail)
+@receiver(post_delete, sender=BlacklistedEmail)
+@receiver(m2m_changed, sender=BlacklistedEmail.teams.through)
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def rebuild_blacklist(**kwargs):
+    """
+    Rebuild the compiled blacklists once a pattern, or the mailbox of a team, changes.
+    """
+    if kwargs.get('action', 'post_').startswith('post_'):
+        blacklist.changed()
+
+
+@receiver(post_save, sender=EmailTemplate)
+@receiver(post_delete, sender=EmailTemplate)
+def discard_email_template(instance, **kwargs):
+    """
+    Free the compiled versions of a changed template, which won't be used anymore since they are
+    keyed by its modification time.
+    """
+    discard_compiled_templates(instance.slug)
+
+
+@receiver(post_delete, sender=Attachment)
+def delete_attachment_file(instance, **kwargs):
+    delete_unused_file(instance)
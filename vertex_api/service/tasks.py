@@ -1,55 +1,95 @@
 import email
+import logging
+import re
+from functools import partial
+
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.template import Context
 from django.db import transaction
-from django_mailbox.models import Message
+from django.utils import timezone
+from django_mailbox.models import Message, MessageAttachment
 import html2text
 
 from vertex.celery import app
 import vertex.rules
-from service.models import Ticket, TicketSubscriber, Update, EmailTemplate
-from contacts.models import EmailAddress, EmailDomain
+import service.attachments
+import service.escalation
+import service.notifications
+from service.blacklist import blacklist
+from service.models import Ticket, TicketSubscriber, Team, Update, EmailTemplate, TICKET_ID_ALPHABET
+from service.saved_searches import shared_search_counts
+from service.search import update_search_vectors
+from service.senders import normalize, sender_resolver
+from contacts.models import EmailAddress, Person
+
+# Subject of replies to a ticket, see Ticket.ticket_id
+TICKET_SUBJECT_PATTERN = re.compile(r'\[Ticket:([{}]+)\]'.format(TICKET_ID_ALPHABET))
+
+logger = logging.getLogger(__name__)
 
 
 @app.task(routing_key='vertex', ignore_result=True)
-def create_ticket_from_email_message(message_pk):
+def ingest_email_messages(batch_size=None):
+    """
+    Claim a batch of the unread messages of the team mailboxes, drop those from blacklisted
+    senders (deleting them unless the blacklist says to keep them), create tickets from new
+    messages in bulk and hand replies over to update_ticket_from_email_message. Messages without
+    a sender are marked as read and left alone, so that they can't hold the batch up. The task
+    queues itself again as long as it finds full batches, so that a backlog is worked through
+    batch by batch, possibly by several workers at once since claimed messages are skipped by the
+    others.
+    """
+    batch_size = batch_size or settings.EMAIL_INGESTION_BATCH_SIZE
     with transaction.atomic():
-        message = Message.objects.get(pk=message_pk)
-        sender = EmailAddress.objects.filter(email_address=message.from_address[0]).first()
-        team = message.mailbox.team
-
-        ticket = Ticket(
-            title=message.subject,
-            priority=5,
-            message_id=message.message_id
-        )
+        messages = list(Message.objects.select_for_update(skip_locked=True).filter(
+            mailbox__team__isnull=False,
+            outgoing=False,
+            read__isnull=True
+        ).order_by('pk')[:batch_size])
+
+        new_messages, blacklisted = list(), list()
+        for message in messages:
+            if not message.from_address:
+                logger.warning('Skipping message %s of mailbox %s, which has no sender',
+                               message.pk, message.mailbox_id)
+                continue
 
-        if not message.html:
-            ticket.description = message.text
-            ticket.description_is_plain = True
-        else:
-            text_maker = html2text.HTML2Text()
-            text_maker.escape_snob = True
-            ticket.description = text_maker.handle(message.html)
+            keep = blacklist.match(message)
+            if keep is not None:
+                if not keep:
+                    blacklisted.append(message)
+                continue
 
-        if sender and sender.person:
-            ticket.created_by = sender.person
-            ticket.signaled_by = sender.person
+            hash_id = _ticket_hash_id(message.subject)
+            if hash_id is None:
+                new_messages.append(message)
+            else:
+                transaction.on_commit(
+                    partial(update_ticket_from_email_message.delay, message.pk, hash_id)
+                )
 
-        if sender and sender.organization:
-            ticket.organization = sender.organization
-        else:
-            ticket.organization = _organization_from_domain(message.from_address[0].split('@')[1])
+        create_tickets_from_email_messages(new_messages)
+        Message.objects.filter(pk__in=[message.pk for message in messages]).update(
+            read=timezone.now()
+        )
+        for message in blacklisted:
+            message.delete()
 
-        ticket.save()  # TODO: send a confirmation email
-        ticket.teams.add(team)
-        add_subscribers_from_email(message, ticket)
+    if len(messages) == batch_size:
+        ingest_email_messages.delay(batch_size)
+
+
+@app.task(routing_key='vertex', ignore_result=True)
+def create_ticket_from_email_message(message_pk):
+    with transaction.atomic():
+        create_tickets_from_email_messages(list(Message.objects.filter(pk=message_pk)))
 
 
 @app.task(routing_key='vertex', ignore_result=True)
 def update_ticket_from_email_message(message_pk, hash_id):
     message = Message.objects.get(pk=message_pk)
-    sender = EmailAddress.objects.filter(email_address=message.from_address[0]).first()
+    sender = sender_resolver.sender(message.from_address[0])
     pk, = Ticket.HASHIDS.decode(hash_id)
     ticket = Ticket.objects.filter(pk=pk).first()
 
@@ -69,22 +109,26 @@ def update_ticket_from_email_message(message_pk, hash_id):
                 text_maker = html2text.HTML2Text()
                 text_maker.escape_snob = True
                 body = text_maker.handle(message.html)
-                Update.objects.create(
+                update = Update.objects.create(
                     ticket=ticket,
-                    person=sender.person,
+                    person_id=sender.person_id,
                     body=body,
                     body_is_plaintext=False,
                     message_id=message.message_id
                 )
             else:
-                Update.objects.create(
+                update = Update.objects.create(
                     ticket=ticket,
-                    person=sender.person,
+                    person_id=sender.person_id,
                     body=message.text,
                     body_is_plaintext=True,
                     message_id=message.message_id
                 )
             add_subscribers_from_email(message, ticket)
+            if message.attachments.exists():
+                transaction.on_commit(
+                    partial(store_email_attachments.delay, message.pk, ticket.pk, update.pk)
+                )
 
     elif has_view_permission(sender, ticket):
         template = EmailTemplate.objects.get(slug='insufficient_permissions')
@@ -107,65 +151,190 @@ def update_ticket_from_email_message(message_pk, hash_id):
         )
 
 
+@app.task(routing_key='vertex', ignore_result=True)
+def escalate_tickets():
+    service.escalation.escalate_tickets()
+
+
+@app.task(routing_key='vertex', ignore_result=True)
+def notify_ticket_subscribers(ticket_pk, update_pks):
+    service.notifications.notify_subscribers(ticket_pk, update_pks)
+
+
+@app.task(routing_key='vertex', ignore_result=True)
+def store_email_attachments(message_pk, ticket_pk, update_pk=None):
+    message = Message.objects.filter(pk=message_pk).first()
+    if message is not None:
+        service.attachments.store_email_attachments(message, ticket_pk, update_pk)
+
+
+def create_tickets_from_email_messages(messages):
+    """
+    Create a ticket from each of `messages`, along with its team link and subscribers, with a
+    constant number of queries (at most two of them to resolve senders, see service.senders).
+    Messages whose message_id already created a ticket are skipped, so that processing a message
+    twice creates a single ticket, and so are messages without a sender.
+    """
+    messages = [message for message in messages if message.from_address]
+    message_ids = set(message.message_id for message in messages if message.message_id)
+    seen = set(Ticket.objects.filter(message_id__in=message_ids).values_list('message_id',
+                                                                            flat=True))
+    new_messages = list()
+    for message in messages:
+        if message.message_id:
+            if message.message_id in seen:
+                continue
+            seen.add(message.message_id)
+        new_messages.append(message)
+    if not new_messages:
+        return []
+
+    addresses = list()
+    for message in new_messages:
+        addresses.extend(message.from_address + get_cc_addresses(message))
+    senders = sender_resolver.senders(addresses)
+    organizations = sender_resolver.sender_organizations(
+        message.from_address[0] for message in new_messages
+    )
+
+    teams = dict(Team.objects.filter(
+        mailbox__in=set(message.mailbox_id for message in new_messages)
+    ).values_list('mailbox_id', 'pk'))
+
+    tickets = list()
+    for message in new_messages:
+        sender_address = normalize(message.from_address[0])
+        sender = senders[sender_address]
+        ticket = Ticket(title=message.subject, priority=5, message_id=message.message_id)
+        ticket.description, ticket.description_is_plain = _message_body(message)
+
+        if sender and sender.person_id:
+            ticket.created_by_id = sender.person_id
+            ticket.signaled_by_id = sender.person_id
+
+        ticket.organization_id = organizations[sender_address]
+        tickets.append(ticket)
+
+    # TODO: send confirmation emails
+    tickets = Ticket.objects.bulk_create(tickets)
+
+    team_links, subscribers = list(), list()
+    for message, ticket in zip(new_messages, tickets):
+        if message.mailbox_id in teams:
+            team_links.append(Ticket.teams.through(ticket_id=ticket.pk,
+                                                   team_id=teams[message.mailbox_id]))
+        subscribers.extend(_subscribers(message, ticket, senders))
+    Ticket.teams.through.objects.bulk_create(team_links)
+    TicketSubscriber.objects.bulk_create(subscribers)
+
+    # attachments are copied to the attachment storage in the background
+    with_attachments = set(MessageAttachment.objects.filter(
+        message__in=[message.pk for message in new_messages]
+    ).values_list('message_id', flat=True))
+    for message, ticket in zip(new_messages, tickets):
+        if message.pk in with_attachments:
+            transaction.on_commit(partial(store_email_attachments.delay, message.pk, ticket.pk))
+
+    # bulk_create() doesn't send the signals which index saved tickets
+    ticket_pks = [ticket.pk for ticket in tickets]
+    update_search_vectors(ticket_pks)
+    shared_search_counts.update(ticket_pks, dict())
+    return tickets
+
+
+def _ticket_hash_id(subject):
+    """
+    Return the hash id of the ticket a message subject refers to, or None.
+    """
+    match = TICKET_SUBJECT_PATTERN.search(subject or '')
+    if match is None or not Ticket.HASHIDS.decode(match.group(1)):
+        return None
+    return match.group(1)
+
+
+def _message_body(message):
+    """
+    Return the body of `message` as text, and whether it is plain text.
+    """
+    if not message.html:
+        return message.text, True
+    text_maker = html2text.HTML2Text()
+    text_maker.escape_snob = True
+    return text_maker.handle(message.html), False
+
+
 def has_update_permission(sender, ticket):
+    """
+    Whether `sender`, a Sender or an EmailAddress, may update `ticket` by email.
+    """
     try:
-        subscription = TicketSubscriber.objects.get(email_address=sender, ticket=ticket)
+        subscription = TicketSubscriber.objects.get(email_address_id=sender.pk, ticket=ticket)
     except TicketSubscriber.DoesNotExist:
         pass
     else:
         return subscription.can_update
 
-    if sender.person:
+    if sender.person_id:
         try:
-            return vertex.rules.has_perm('service.change_ticket', sender.person, ticket)
+            return vertex.rules.has_perm('service.change_ticket',
+                                         Person.objects.get(pk=sender.person_id), ticket)
         except PermissionDenied:
             return False
 
-    elif sender.organization:
-        return ticket.organization == sender.organization
+    elif sender.organization_id:
+        return ticket.organization_id == sender.organization_id
 
     return False
 
 
 def has_view_permission(sender, ticket):
+    """
+    Whether `sender`, a Sender or an EmailAddress, may view `ticket`.
+    """
     try:
-        subscription = TicketSubscriber.objects.get(email_address=sender, ticket=ticket)
+        subscription = TicketSubscriber.objects.get(email_address_id=sender.pk, ticket=ticket)
     except TicketSubscriber.DoesNotExist:
         pass
     else:
         return subscription.can_view
 
-    if sender.person:
+    if sender.person_id:
         try:
-            return vertex.rules.has_perm('service.view_ticket', sender.person, ticket)
+            return vertex.rules.has_perm('service.view_ticket',
+                                         Person.objects.get(pk=sender.person_id), ticket)
         except PermissionDenied:
             return False
-    elif sender.organization:
-        return ticket.organization == sender.organization
+    elif sender.organization_id:
+        return ticket.organization_id == sender.organization_id
 
     return False
 
 
-def _organization_from_domain(domain_name):
-    try:
-        domain = EmailDomain.objects.get(domain_name__iexact=domain_name)
-        return domain.organization
-    except EmailDomain.DoesNotExist:
-        return None
+def add_subscribers_from_email(message, ticket):
+    senders = sender_resolver.senders(message.from_address + get_cc_addresses(message))
+    TicketSubscriber.objects.bulk_create(_subscribers(message, ticket, senders))
 
 
-def add_subscribers_from_email(message, ticket):
-    subscriber_emails = subscribers_specified_in_message(message)
-    ticket_subscribers = list()
-    for email_address in subscriber_emails:
-        ticket_subscribers.append(
-            TicketSubscriber(email_address=email_address, ticket=ticket, can_view=True)
-        )
-    TicketSubscriber.objects.bulk_create(ticket_subscribers)
+def _subscribers(message, ticket, senders):
+    """
+    Return the (unsaved) subscribers of `ticket` for the known senders and cc addresses of
+    `message`, `senders` being what the sender resolver returned for them.
+    """
+    subscribers, email_address_ids = list(), set()
+    for address in message.from_address + get_cc_addresses(message):
+        sender = senders[normalize(address)]
+        if sender is not None and sender.pk not in email_address_ids:
+            email_address_ids.add(sender.pk)
+            subscribers.append(TicketSubscriber(email_address_id=sender.pk, ticket=ticket,
+                                                can_view=True))
+    return subscribers
 
 
-def subscribers_specified_in_message(msg):  # TODO make this case-insensitive
-    return EmailAddress.objects.filter(email_address__in=(msg.from_address + get_cc_addresses(msg)))
+def subscribers_specified_in_message(msg):
+    senders = sender_resolver.senders(msg.from_address + get_cc_addresses(msg))
+    return EmailAddress.objects.filter(
+        pk__in=[sender.pk for sender in senders.values() if sender is not None]
+    )
 
 
 def get_cc_addresses(msg):
@@ -0,0 +1,170 @@
+# Ticket timeline
+#
+# The timeline of a ticket merges its updates, the notes and ticket changes of those updates, and
+# its email communications into a single chronological stream. A UNION ALL of one SELECT per kind
+# of entry yields the (occurred_at, kind, id) of the entries in order, a page at a time: pages are
+# keyset paginated on those three columns, so that the pages of a ticket with thousands of entries
+# cost the same whatever their position. The entries of a page are then loaded with one query per
+# kind, whatever the size of the page.
+#
+# Responses carry an ETag derived from a fingerprint of the whole timeline (its number of entries,
+# their latest modification and a checksum of their ids) computed with a single aggregate query,
+# so that a client polling an unchanged timeline gets a 304 without the page being loaded.
+import hashlib
+import json
+from collections import OrderedDict, namedtuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.http import HttpResponseNotModified
+from django.utils.dateparse import parse_datetime
+from django_mailbox.models import Message
+from rest_framework.exceptions import NotFound
+
+from vertex.pagination import KeysetPagination
+from .models import Note, TicketChange, TicketCommunication, Update
+from .serializers import (TimelineCommunicationSerializer, TimelineNoteSerializer,
+                          TimelineTicketChangeSerializer, TimelineUpdateSerializer)
+
+TimelineKind = namedtuple('TimelineKind', ('name', 'queryset', 'serializer_class'))
+
+# in the order of the `kind` column, which also orders entries occurring at the same time
+KINDS = (
+    TimelineKind('update', Update.objects.all(), TimelineUpdateSerializer),
+    TimelineKind('note', Note.objects.all(), TimelineNoteSerializer),
+    TimelineKind('ticket_change', TicketChange.objects.all(), TimelineTicketChangeSerializer),
+    TimelineKind('communication', TicketCommunication.objects.select_related('message'),
+                 TimelineCommunicationSerializer),
+)
+
+
+def timeline_sql():
+    """
+    Return the UNION ALL of the (occurred_at, kind, id, modified_at) of the timeline entries of
+    the ticket given as the `ticket` parameter.
+    """
+    tables = dict(
+        (name, connection.ops.quote_name(model._meta.db_table)) for name, model in (
+            ('update', Update), ('note', Note), ('ticket_change', TicketChange),
+            ('communication', TicketCommunication), ('message', Message),
+        )
+    )
+    return """
+        SELECT u.display_time AS occurred_at, 0 AS kind, u.id, u.modified_at
+        FROM {update} u WHERE u.ticket_id = %(ticket)s
+        UNION ALL
+        SELECT n.created_at, 1, n.id, n.modified_at
+        FROM {note} n JOIN {update} u ON u.id = n.update_id WHERE u.ticket_id = %(ticket)s
+        UNION ALL
+        SELECT u.display_time, 2, c.id, u.modified_at
+        FROM {ticket_change} c JOIN {update} u ON u.id = c.update_id WHERE u.ticket_id = %(ticket)s
+        UNION ALL
+        SELECT m.processed, 3, c.id, m.processed
+        FROM {communication} c JOIN {message} m ON m.id = c.message_id
+        WHERE c.ticket_id = %(ticket)s
+    """.format(**tables)
+
+
+def timeline_fingerprint(ticket_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT count(*), max(modified_at), sum(id * {} + kind) FROM ({}) timeline'.format(
+                len(KINDS), timeline_sql()
+            ),
+            {'ticket': ticket_id}
+        )
+        return cursor.fetchone()
+
+
+def timeline_rows(ticket_id, position, limit):
+    """
+    Return the (occurred_at, kind, id) of at most `limit` timeline entries of `ticket_id`, in
+    order, starting after `position` unless it's None.
+    """
+    params = {'ticket': ticket_id, 'limit': limit}
+    where = ''
+    if position is not None:
+        where = 'WHERE (occurred_at, kind, id) > (%(occurred_at)s, %(kind)s, %(id)s)'
+        params.update(zip(('occurred_at', 'kind', 'id'), position))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT occurred_at, kind, id FROM ({}) timeline {} '
+            'ORDER BY occurred_at, kind, id LIMIT %(limit)s'.format(timeline_sql(), where),
+            params
+        )
+        return cursor.fetchall()
+
+
+def timeline_entries(rows):
+    """
+    Return the serialised timeline entries of `rows`, loading them with one query per kind.
+    """
+    ids = dict()
+    for occurred_at, kind, pk in rows:
+        ids.setdefault(kind, list()).append(pk)
+    objects = dict()
+    for kind, pks in ids.items():
+        objects[kind] = KINDS[kind].queryset.in_bulk(pks)
+
+    entries = list()
+    for occurred_at, kind, pk in rows:
+        obj = objects[kind].get(pk)
+        if obj is None:  # deleted in between
+            continue
+        entries.append(OrderedDict([
+            ('type', KINDS[kind].name),
+            ('id', pk),
+            ('occurred_at', occurred_at),
+            ('attributes', KINDS[kind].serializer_class(obj).data),
+        ]))
+    return entries
+
+
+class TimelinePagination(KeysetPagination):
+    """
+    Keyset pagination of a ticket timeline on (occurred_at, kind, id).
+    """
+    ordering = ('occurred_at', 'kind', 'id')
+
+    def decode_cursor(self, request):
+        position = super(TimelinePagination, self).decode_cursor(request)
+        if position is None:
+            return None
+        try:
+            occurred_at = parse_datetime(position[0])
+            kind, pk = int(position[1]), int(position[2])
+        except (TypeError, ValueError):
+            raise NotFound("Invalid cursor")
+        if occurred_at is None:
+            raise NotFound("Invalid cursor")
+        return occurred_at, kind, pk
+
+    def paginate_timeline(self, ticket_id, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        rows = timeline_rows(ticket_id, self.decode_cursor(request), self.page_size + 1)
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.has_next:
+            occurred_at, kind, pk = rows[-1]
+            self.next_position = [occurred_at.isoformat(), kind, pk]
+        return timeline_entries(rows)
+
+
+def timeline_response(request, ticket_id):
+    """
+    Return the response holding the requested page of the timeline of `ticket_id`, or a 304 if
+    the client already has it.
+    """
+    paginator = TimelinePagination()
+    etag = '"{}"'.format(hashlib.md5(json.dumps([
+        timeline_fingerprint(ticket_id),
+        request.query_params.get(paginator.cursor_query_param),
+        paginator.get_page_size(request),
+    ], cls=DjangoJSONEncoder).encode('utf-8')).hexdigest())
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = paginator.get_paginated_response(paginator.paginate_timeline(ticket_id, request))
+    response['ETag'] = etag
+    return response
@@ -1,6 +1,6 @@
 from modeltranslation.translator import TranslationOptions, translator
 
-from .models import Team, EmailTemplate
+from .models import Team, EmailTemplate, SavedSearch, EscalationExclusion
 
 
 class TeamTranslationOptions(TranslationOptions):
@@ -11,5 +11,15 @@ class EmailTemplateTranslationOptions(TranslationOptions):
     fields = ('template_name', 'subject', 'heading', 'plain_text', 'markdown',)
 
 
+class SavedSearchTranslationOptions(TranslationOptions):
+    fields = ('title',)
+
+
+class EscalationExclusionTranslationOptions(TranslationOptions):
+    fields = ('name',)
+
+
 translator.register(Team, TeamTranslationOptions)
 translator.register(EmailTemplate, EmailTemplateTranslationOptions)
+translator.register(SavedSearch, SavedSearchTranslationOptions)
+translator.register(EscalationExclusion, EscalationExclusionTranslationOptions)
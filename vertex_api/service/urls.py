@@ -9,7 +9,8 @@ from .viewsets import (
     UpdateViewSet,
     NoteViewSet,
     TeamViewSet,
-    TicketSubscriberViewSet
+    TicketSubscriberViewSet,
+    AttachmentViewSet
 )
 
 from .views import CloseTicketView, UpdateRelationshipView, TicketRelationshipView, TeamRelationshipView
@@ -21,9 +22,11 @@ router.register(r'updates', UpdateViewSet)
 router.register(r'notes', NoteViewSet)
 router.register(r'teams', TeamViewSet)
 router.register(r'subscribers', TicketSubscriberViewSet)
+router.register(r'attachments', AttachmentViewSet)
 
 ticket_update_router = NestedSimpleRouter(router, r'tickets', lookup='ticket', trailing_slash=False)
 ticket_update_router.register(r'updates', UpdateViewSet, base_name='ticket-updates')
+ticket_update_router.register(r'attachments', AttachmentViewSet, base_name='ticket-attachments')
 
 update_note_router = NestedSimpleRouter(router, r'updates', lookup='update', trailing_slash=False)
 update_note_router.register(r'notes', NoteViewSet, base_name='update-notes')
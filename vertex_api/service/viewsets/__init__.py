@@ -3,3 +3,4 @@ from .team import *
 from .update import *
 from .note import *
 from .ticket_subscriber import *
+from .attachment import *
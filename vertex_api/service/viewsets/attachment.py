@@ -0,0 +1,49 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import detail_route
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.parsers import FormParser, MultiPartParser
+
+from vertex.api.permissions import RestrictedObjectLevelPermissions
+from ..attachments import download_response
+from ..models import Attachment, Ticket
+from ..serializers import AttachmentSerializer
+
+
+class AttachmentViewSet(mixins.CreateModelMixin,
+                        mixins.RetrieveModelMixin,
+                        mixins.ListModelMixin,
+                        mixins.DestroyModelMixin,
+                        viewsets.GenericViewSet):
+    """
+    Attachments of the tickets visible to the user. Files are uploaded as multipart form data
+    to the attachments of a ticket, and downloaded from the `download` route of an attachment.
+    """
+    queryset = Attachment.objects
+    serializer_class = AttachmentSerializer
+    permission_classes = (RestrictedObjectLevelPermissions,)
+    parser_classes = (MultiPartParser, FormParser)
+
+    def get_tickets(self):
+        tickets = Ticket.objects.visible_to(self.request.user.person)
+        if 'ticket_pk' in self.kwargs:
+            tickets = tickets.filter(pk=self.kwargs['ticket_pk'])
+        return tickets
+
+    def get_queryset(self):
+        return self.queryset.filter(ticket__in=self.get_tickets().values('pk'))
+
+    def get_serializer_context(self):
+        context = super(AttachmentViewSet, self).get_serializer_context()
+        if self.action == 'create':
+            context['ticket'] = get_object_or_404(self.get_tickets())
+        return context
+
+    def create(self, request, *args, **kwargs):
+        if 'ticket_pk' not in self.kwargs:
+            raise MethodNotAllowed(request.method)
+        return super(AttachmentViewSet, self).create(request, *args, **kwargs)
+
+    @detail_route(methods=['get'])
+    def download(self, request, *args, **kwargs):
+        return download_response(request, self.get_object())
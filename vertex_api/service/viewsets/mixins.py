@@ -0,0 +1,95 @@
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework_json_api.utils import get_resource_type_from_model
+
+
+class IncludedQueryPlanMixin(object):
+    """
+    Plan the select_related/prefetch_related of the queryset from the `include` parameter and the
+    sparse fieldsets (`fields[type]` parameters) of the request, so that serialising a page costs
+    the same number of queries whatever its size.
+
+    `rendered_lookups` maps the dotted path of a many-valued relation to the lookups needed to
+    render its identifiers, which happens whenever the object holding it is serialised and the
+    relation is part of its fieldset. `included_lookups` maps an include path to the lookups
+    needed to serialise the included objects. Lookups made only of foreign keys are passed to
+    select_related(), the others to prefetch_related().
+    """
+    rendered_lookups = {}
+    included_lookups = {}
+
+    def get_queryset(self):
+        return self.plan_queryset(super(IncludedQueryPlanMixin, self).get_queryset())
+
+    def plan_queryset(self, queryset):
+        select, prefetch = list(), list()
+        for lookup in self.get_related_lookups(queryset.model):
+            if self._is_single_valued(queryset.model, lookup):
+                select.append(lookup)
+            else:
+                prefetch.append(lookup)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def get_included_paths(self):
+        """
+        Return the include paths of the request, along with all of their prefixes.
+        """
+        paths = set()
+        for include in self.request.query_params.get('include', '').split(','):
+            parts = include.strip().split('.')
+            for position in range(1, len(parts) + 1):
+                if parts[position - 1]:
+                    paths.add('.'.join(parts[:position]))
+        return paths
+
+    def get_fieldset(self, resource_type):
+        """
+        Return the sparse fieldset requested for `resource_type`, or None to render every field.
+        """
+        fields = self.request.query_params.get('fields[{}]'.format(resource_type))
+        if fields is None:
+            return None
+        return set(field.strip() for field in fields.split(','))
+
+    def get_related_lookups(self, model):
+        included = self.get_included_paths()
+        lookups = list()
+
+        for path, path_lookups in sorted(self.rendered_lookups.items()):
+            parent, _, field = path.rpartition('.')
+            if parent and parent not in included:
+                continue
+            fieldset = self.get_fieldset(
+                get_resource_type_from_model(self._model_at(model, parent))
+            )
+            if fieldset is None or field in fieldset:
+                lookups.extend(path_lookups)
+
+        for path, path_lookups in sorted(self.included_lookups.items()):
+            if path in included:
+                lookups.extend(path_lookups)
+
+        return list(OrderedDict.fromkeys(lookups))
+
+    @staticmethod
+    def _model_at(model, path):
+        for name in path.split('.') if path else ():
+            model = model._meta.get_field(name).related_model
+        return model
+
+    @staticmethod
+    def _is_single_valued(model, lookup):
+        for name in lookup.split('__'):
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return False
+            if not (field.many_to_one or field.one_to_one) or field.auto_created:
+                return False
+            model = field.related_model
+        return True
@@ -1,14 +1,18 @@
-from django.db.models import QuerySet
-
+from django.shortcuts import get_object_or_404
 from rest_framework import viewsets
+from rest_framework.decorators import detail_route, list_route
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
 from vertex.api.permissions import RestrictedObjectLevelPermissions
 from service.models import Ticket
-from service.serializers import TicketSerializer
+from service.serializers import BulkTicketOperationSerializer, TicketSerializer
 from ..filters import TicketFilterSet
+from ..timeline import timeline_response
+from .mixins import IncludedQueryPlanMixin
 
 
-class TicketViewSet(viewsets.ModelViewSet):
+class TicketViewSet(IncludedQueryPlanMixin, viewsets.ModelViewSet):
 
     queryset = Ticket.objects
     serializer_class = TicketSerializer
@@ -16,17 +20,58 @@ class TicketViewSet(viewsets.ModelViewSet):
     filter_class = TicketFilterSet
     filter_fields = ('id',)
 
+    rendered_lookups = {
+        'teams': ('teams', ),
+        'tags': ('tags', ),
+        'updates': ('updates', ),
+        'updates.notes': ('updates__notes', ),
+        'updates.ticket_changes': ('updates__ticketchange_set', ),
+        'parent.teams': ('parent__teams', ),
+        'parent.tags': ('parent__tags', ),
+        'parent.updates': ('parent__updates', ),
+        'duplicate_of.teams': ('duplicate_of__teams', ),
+        'duplicate_of.tags': ('duplicate_of__tags', ),
+        'duplicate_of.updates': ('duplicate_of__updates', ),
+    }
+    included_lookups = {
+        'organization': ('organization', ),
+        'assigned_to': ('assigned_to', ),
+        'signaled_by': ('signaled_by', ),
+        'created_by': ('created_by', ),
+        'parent': ('parent', ),
+        'duplicate_of': ('duplicate_of', ),
+        'updates.person': ('updates__person', ),
+        'updates.notes': ('updates__notes', ),
+    }
+
     def get_queryset(self):
-        if self.request.user.is_superuser:
-            queryset = Ticket.objects
-        elif self.request.user.is_staff:
-            queryset = Ticket.objects
-        else:
-            queryset = Ticket.objects.filter(organization__in=self.request.user.person.organizations.all())
-        if isinstance(queryset, QuerySet):
-            # Ensure queryset is re-evaluated on each request.
-            queryset = queryset.all()
-        return queryset.distinct()
+        return self.plan_queryset(Ticket.objects.visible_to(self.request.user.person))
 
     def perform_create(self, serializer):  # TODO: tickets can be created by email...
         serializer.save(created_by=self.request.user.person)
+
+    @detail_route(methods=['get'])
+    def timeline(self, request, *args, **kwargs):
+        """
+        The updates, notes, ticket changes and communications of the ticket in chronological
+        order, see service.timeline.
+        """
+        ticket = get_object_or_404(Ticket.objects.visible_to(request.user.person).only('pk'),
+                                   pk=kwargs['pk'])
+        self.check_object_permissions(request, ticket)
+        return timeline_response(request, ticket.pk)
+
+    @list_route(methods=['post'], permission_classes=(IsAuthenticated, ))
+    def bulk(self, request, *args, **kwargs):
+        """
+        Assign, retag, re-prioritise or close many tickets at once, see service.bulk. The change
+        permission is checked for each ticket, and reported along with the outcome of each one.
+        """
+        serializer = BulkTicketOperationSerializer(data=request.data,
+                                                   context={'person': request.user.person})
+        serializer.is_valid(raise_exception=True)
+        outcomes = serializer.save()
+        return Response({
+            'results': [outcome._asdict() for outcome in outcomes],
+            'meta': {'changed': sum(1 for outcome in outcomes if outcome.update is not None)},
+        })
@@ -0,0 +1,29 @@
+# System checks
+#
+# Several per-process caches (the IPAM indexes, the permission cache, the service blacklist and
+# sender resolver...) learn about changes made by other processes through counters kept in the
+# Django cache. A cache local to each process, such as the default LocMemCache, would leave the web
+# and Celery processes with stale copies, so it is reported as an error.
+from django.conf import settings
+from django.core.checks import Error, register
+from django.utils.module_loading import import_string
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    local = any(issubclass(import_string(backend), import_string(cls))
+                for cls in PROCESS_LOCAL_CACHES) if backend else True
+    if not local:
+        return []
+    return [Error(
+        "The default cache ({}) isn't shared between processes.".format(backend or 'none'),
+        hint="Configure CACHES with a backend shared by every web and Celery process, e.g. "
+             "DatabaseCache (run `manage.py createcachetable`), Memcached or Redis.",
+        id='vertex.E001',
+    )]
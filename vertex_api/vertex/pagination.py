@@ -0,0 +1,144 @@
+# Keyset pagination
+#
+# Offset pagination makes the database walk over every row before the requested page, which gets
+# slower the further one goes into a large table. Keyset pagination instead remembers the ordering
+# values of the last row of a page and asks for the rows which come after it, which an index on the
+# ordering columns answers directly whatever the position in the table.
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def keyset_filter(queryset, ordering, position):
+    """
+    Restrict `queryset` to the rows which come after `position`, a list of values of the `ordering`
+    fields, using a single row comparison.
+    """
+    opts = queryset.model._meta
+    columns = ', '.join(
+        '"{}"."{}"'.format(opts.db_table, opts.get_field(field).column) for field in ordering
+    )
+    placeholders = ', '.join(['%s'] * len(ordering))
+    return queryset.extra(
+        where=['({}) > ({})'.format(columns, placeholders)],
+        params=list(position)
+    )
+
+
+def keyset_position(obj, ordering):
+    return [str(getattr(obj, obj._meta.get_field(field).attname)) for field in ordering]
+
+
+def keyset_batches(queryset, ordering, batch_size=1000):
+    """
+    Yield the rows of `queryset` as lists of at most `batch_size` instances, fetching each batch
+    with its own keyset query so that select_related/prefetch_related keep working and memory use
+    doesn't grow with the table.
+    """
+    queryset = queryset.order_by(*ordering)
+    position = None
+    while True:
+        batch_queryset = queryset
+        if position is not None:
+            batch_queryset = keyset_filter(queryset, ordering, position)
+        batch = list(batch_queryset[:batch_size])
+        if not batch:
+            break
+        yield batch
+        if len(batch) < batch_size:
+            break
+        position = keyset_position(batch[-1], ordering)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate on the `keyset_ordering` fields of the view, which must identify rows uniquely. The
+    opaque `cursor` query parameter holds the position of the last row of the previous page.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = view.keyset_ordering
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            position = self.position_values(queryset.model, position)
+            queryset = keyset_filter(queryset, self.ordering, position)
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = keyset_position(rows[-1], self.ordering) if self.has_next else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound("Invalid cursor")
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound("Invalid cursor")
+        return position
+
+    def position_values(self, model, position):
+        """
+        Return the values of `position` as query parameters of the ordering fields of `model`,
+        raising NotFound if they aren't valid values of those fields.
+        """
+        opts = model._meta
+        values = list()
+        try:
+            for field, value in zip(self.ordering, position):
+                field = opts.get_field(field)
+                field.to_python(value)
+                # to_python() may return objects the database adapter can't handle (e.g. the
+                # ipaddress objects of netfields), which the cursor's strings are fine for
+                values.append(value if isinstance(value, str) else field.get_prep_value(value))
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound("Invalid cursor")
+        return values
+
+    def encode_cursor(self, position):
+        return urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(self.next_position))
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('results', data),
+            ('meta', {'pagination': OrderedDict([('page_size', self.page_size)])}),
+            ('links', OrderedDict([
+                ('first', self.get_first_link()),
+                ('next', self.get_next_link()),
+            ])),
+        ]))
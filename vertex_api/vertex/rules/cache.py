@@ -0,0 +1,170 @@
+# Permission caches
+#
+# Evaluating a rule runs its whole predicate tree, and a single API response can check the same
+# permission on the same object hundreds of times. Two caches avoid that:
+#
+# - a request-scoped memo of rule results (and of anything else worth keeping for the duration of
+#   a request), active while PermissionCacheMiddleware handles a request. Outside of a request,
+#   e.g. in tasks, nothing is memoised;
+# - a cross-request cache, in the Django cache, of the model permissions each user gets from the
+#   ModelBackends. Invalidations must reach every web and Celery process, hence the shared cache
+#   required by vertex.checks.
+#
+# The memo is cleared whenever a model instance or a many-to-many relation is written, since
+# memberships decide the outcome of most rules; the model permissions are invalidated when a
+# user's groups or permissions, or a group's permissions, change. Both keep hit and miss counts,
+# see cache_stats().
+import threading
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+DJANGO_PERMISSIONS_GENERATION_KEY = 'vertex_django_permissions_generation'
+DJANGO_PERMISSIONS_KEY = 'vertex_django_permissions:{generation}:{user}'
+
+_local = threading.local()
+
+
+class CacheStats(object):
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+rule_stats = CacheStats()
+django_permission_stats = CacheStats()
+
+
+def cache_stats():
+    return {
+        'rules': rule_stats.as_dict(),
+        'django_permissions': django_permission_stats.as_dict(),
+    }
+
+
+# Request-scoped memo
+
+def start_request_memo():
+    _local.memo = dict()
+
+
+def end_request_memo():
+    _local.memo = None
+
+
+def request_memo():
+    """
+    Return the memo of the current request, or None outside of a request.
+    """
+    return getattr(_local, 'memo', None)
+
+
+def invalidate_request_memo():
+    memo = request_memo()
+    if memo is not None:
+        memo.clear()
+
+
+def memoize(key, compute, stats=rule_stats):
+    """
+    Return the value memoised under `key` for the current request, calling `compute` to get it
+    the first time. Outside of a request, `compute` is always called.
+    """
+    memo = request_memo()
+    if memo is None:
+        return compute()
+    try:
+        value = memo[key]
+    except KeyError:
+        stats.misses += 1
+        value = memo[key] = compute()
+    else:
+        stats.hits += 1
+    return value
+
+
+# Cross-request cache of Django model permissions
+
+def _django_permissions_key(user_pk):
+    cache.add(DJANGO_PERMISSIONS_GENERATION_KEY, 0, timeout=None)
+    return DJANGO_PERMISSIONS_KEY.format(
+        generation=cache.get(DJANGO_PERMISSIONS_GENERATION_KEY), user=user_pk
+    )
+
+
+def _load_django_permissions(user):
+    key = _django_permissions_key(user.pk)
+    permissions = cache.get(key)
+    if permissions is None:
+        django_permission_stats.misses += 1
+        permissions = set()
+        for backend in auth.get_backends():
+            if isinstance(backend, ModelBackend):
+                permissions |= backend.get_all_permissions(user)
+        cache.set(key, permissions, timeout=settings.VERTEX_PERMISSION_CACHE_TIMEOUT)
+    else:
+        django_permission_stats.hits += 1
+    return permissions
+
+
+def django_permissions(user):
+    """
+    Return the set of permissions `user` gets from the ModelBackends, as "app_label.codename"
+    strings, from the cache.
+    """
+    return memoize(('django_permissions', user.pk), lambda: _load_django_permissions(user),
+                   stats=django_permission_stats)
+
+
+def invalidate_django_permissions(user_pk=None):
+    """
+    Forget the cached model permissions of a user, or of every user when `user_pk` is None.
+    """
+    if user_pk is None:
+        cache.add(DJANGO_PERMISSIONS_GENERATION_KEY, 0, timeout=None)
+        cache.incr(DJANGO_PERMISSIONS_GENERATION_KEY)
+    else:
+        cache.delete(_django_permissions_key(user_pk))
+    invalidate_request_memo()
+
+
+# Invalidation hooks
+
+@receiver(m2m_changed)
+def invalidate_on_m2m_change(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    invalidate_request_memo()
+
+    User = auth.get_user_model()
+    if sender in (User.groups.through, User.user_permissions.through):
+        if isinstance(instance, User):
+            invalidate_django_permissions(instance.pk)
+        else:
+            invalidate_django_permissions()
+    elif sender is Group.permissions.through:
+        invalidate_django_permissions()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_on_write(sender, instance, **kwargs):
+    invalidate_request_memo()
+    if sender in (Group, Permission):
+        invalidate_django_permissions()
+    elif sender is auth.get_user_model():
+        # superusers get every permission, and inactive users none
+        invalidate_django_permissions(instance.pk)
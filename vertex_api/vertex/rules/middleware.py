@@ -0,0 +1,17 @@
+from .cache import end_request_memo, start_request_memo
+
+
+class PermissionCacheMiddleware(object):
+    """
+    Memoise permission checks for the duration of each request, see vertex.rules.cache.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start_request_memo()
+        try:
+            return self.get_response(request)
+        finally:
+            end_request_memo()
@@ -3,6 +3,8 @@ from rules.rulesets import RuleSet
 from django.contrib.auth.models import User
 from django.apps import apps
 
+from .cache import memoize
+
 
 permissions = RuleSet()
 
@@ -35,11 +37,26 @@ class ObjectPermissionBackend(object):
         Person = apps.get_model('contacts', 'Person')
 
         if isinstance(user_or_person, Person):
-            return has_perm(perm, user_or_person, *args, **kwargs)
+            return self._memoized_has_perm(perm, user_or_person, *args, **kwargs)
         elif isinstance(user_or_person, User):
             if user_or_person.person:
-                return has_perm(perm, user_or_person.person, *args, **kwargs)
+                return self._memoized_has_perm(perm, user_or_person.person, *args, **kwargs)
+
+        raise PermissionDenied
 
+    def _memoized_has_perm(self, perm, person, *args, **kwargs):
+        """
+        Like has_perm(), with the result memoised for the current request when the permission is
+        checked on nothing or on a saved model instance.
+        """
+        obj = args[0] if args else None
+        if kwargs or len(args) > 1 or (obj is not None and getattr(obj, 'pk', None) is None):
+            return has_perm(perm, person, *args, **kwargs)
+
+        obj_key = None if obj is None else (obj._meta.label, obj.pk)
+        if memoize(('rule', person.pk, perm, obj_key),
+                   lambda: permissions.test_rule(perm, person, *args)):
+            return True
         raise PermissionDenied
 
     def has_module_perms(self, user, app_label):
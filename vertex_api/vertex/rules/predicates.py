@@ -1,24 +1,18 @@
 __author__ = 'infinity'
-from django.contrib import auth
-from django.contrib.auth.backends import ModelBackend
-from django.core.exceptions import PermissionDenied
 from rules import predicate
 
+from .cache import django_permissions
+
 
 def has_django_permission(permission, obj=None):
     name = 'has_django_permission:%s' % permission
 
     @predicate(name)
     def fn(person):
-        for backend in auth.get_backends():
-            if not isinstance(backend, ModelBackend):
-                continue
-            try:
-                if backend.has_perm(person.user, permission, obj):
-                    return True
-            except PermissionDenied:
-                return False
-        return False
+        # ModelBackend doesn't grant object permissions
+        if obj is not None or not person.user.is_active:
+            return False
+        return permission in django_permissions(person.user)
 
     return fn
 
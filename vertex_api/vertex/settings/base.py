@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/1.11/ref/settings/
 """
 
 import os
+from datetime import timedelta
+
 from django.utils.translation import ugettext_lazy as _
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -56,6 +58,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'vertex.rules.middleware.PermissionCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,6 +93,19 @@ DATABASES = {
     }
 }
 
+# Cache
+# Must be shared by every web and Celery process, see vertex.checks. The cache table is created
+# with `manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'vertex_cache',
+        # culling could drop the generation counters along with the cached values
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -113,6 +129,9 @@ AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',
 )
 
+# How long, in seconds, the model permissions of a user are cached for
+VERTEX_PERMISSION_CACHE_TIMEOUT = 300
+
 # Internationalization
 # https://docs.djangoproject.com/en/1.11/topics/i18n/
 
@@ -151,7 +170,45 @@ GMAPS_ALLOWED_LOCATION_TYPES = [
     'subpremise'
 ]
 
+# IPAM
+# When True, processes share a generation counter through the cache so that each in-memory IPAM
+# index (subnets, ranges) is reloaded when another process changes what it indexes, through the
+# shared cache of CACHES. Only disable it when a single process writes to and reads from the IPAM
+# tables, e.g. a development server without workers, to save the cache lookup of each index access.
+IPAM_SUBNET_INDEX_SHARED = True
+# Prevent duplicate IP addresses in the global table (subnets without a VRF). Run
+# `manage.py find_duplicate_ips --sync-scopes` after changing it.
+ENFORCE_GLOBAL_UNIQUE = False
+
 VERTEX_TAG_CHARS = 'ABCDEFGHJKMNPQRTUVWXYZ0123456789'
 VERTEX_TAG_LEN = 6
 
-
+# Service
+# How long, in seconds, the number of tickets matching a shared saved search is cached for
+SAVED_SEARCH_COUNT_TIMEOUT = 600
+# Number of email messages turned into tickets per transaction by service.tasks.ingest_email_messages
+EMAIL_INGESTION_BATCH_SIZE = 200
+# Number of email addresses (and domains) whose sender is cached per process, and for how long
+SENDER_CACHE_SIZE = 10000
+SENDER_CACHE_TIMEOUT = 300
+# Number of ticket notifications sent per batch over a connection to the email backend
+NOTIFICATION_BATCH_SIZE = 100
+# Header handing attachment downloads over to the web server: 'X-Sendfile' (Apache, uWSGI) or
+# 'X-Accel-Redirect' (nginx, which then needs an internal location at ATTACHMENT_SENDFILE_URL
+# serving MEDIA_ROOT). Downloads are streamed by Django when None.
+ATTACHMENT_SENDFILE_HEADER = None
+ATTACHMENT_SENDFILE_URL = '/protected-media/'
+# Number of tickets a bulk operation (see service.bulk) may change at once
+BULK_TICKET_OPERATION_MAX_SIZE = 1000
+
+# Celery beat
+CELERYBEAT_SCHEDULE = {
+    'escalate-tickets': {
+        'task': 'service.tasks.escalate_tickets',
+        'schedule': timedelta(minutes=5),
+    },
+    'ingest-email-messages': {
+        'task': 'service.tasks.ingest_email_messages',
+        'schedule': timedelta(minutes=1),
+    },
+}
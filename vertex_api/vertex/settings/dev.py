@@ -26,3 +26,12 @@ DATABASES = {
         'HOST': '127.0.0.1',
     },
 }
+
+# The development server and the test runner use a single process, which a local cache serves
+# fine and without the queries of DatabaseCache. Run Celery workers against a shared cache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+SILENCED_SYSTEM_CHECKS = ['vertex.E001']